@@ -0,0 +1,150 @@
+"""
+Búsqueda por nombre (typeahead) de centros poblados, colegios y
+establecimientos de salud.
+
+Cada tipo guarda sus nombres normalizados (sin tildes, en mayúsculas) y un
+vocabulario ordenado de palabras con la lista de nombres de cada palabra
+en formato CSR. Como el vocabulario está ordenado, las palabras que empiezan
+con un prefijo forman un tramo contiguo: buscar es una bisección por
+palabra del texto y la intersección de sus listas. Para ordenar, la
+posición de cada nombre en el orden alfabético permite saber sin comparar
+texto si un nombre es igual al buscado o empieza con él.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+
+from indice_espacial import haversine_vectorizado
+from serializacion import COLUMNAS_POR_TIPO
+from ubicaciones import codigos_categoricos, normalizar_texto
+
+TIPOS_BUSCABLES = ['poblacion', 'educacion', 'salud']
+PALABRA = re.compile(r"[A-Z0-9]+")
+FIN_PREFIJO = "\uffff"  # Mayor que cualquier carácter de un texto normalizado
+
+# Clase de coincidencia (menor = mejor)
+EXACTA = 0
+PREFIJO = 1
+PALABRAS = 2
+NOMBRES_COINCIDENCIA = {EXACTA: 'exacta', PREFIJO: 'prefijo', PALABRAS: 'palabras'}
+
+
+def palabras(texto):
+    """Palabras de un texto normalizado"""
+    return PALABRA.findall(texto)
+
+
+class IndiceNombres:
+    """Nombres de un dataset indexados por prefijo de palabra"""
+
+    def __init__(self, tipo, df):
+        self.tipo = tipo
+        columna = COLUMNAS_POR_TIPO[tipo]['nombre'][0]
+        if df.empty or columna not in df.columns:
+            codigos, valores = np.empty(0, dtype=np.int32), []
+        else:
+            codigos, valores = codigos_categoricos(df[columna])
+
+        self.originales = [str(v) for v in valores]
+        self.lats = df['latitud'].to_numpy(dtype=np.float64) if not df.empty else np.empty(0)
+        self.lngs = df['longitud'].to_numpy(dtype=np.float64) if not df.empty else np.empty(0)
+        self.nombres = [normalizar_texto(v) for v in self.originales]
+        self.largos = np.array([len(n) for n in self.nombres], dtype=np.int32)
+
+        # Filas de cada nombre (CSR): filas[inicios_filas[k]:inicios_filas[k+1]]
+        validas = np.flatnonzero(codigos >= 0)
+        self.filas = validas[np.argsort(codigos[validas], kind='stable')]
+        self.inicios_filas = np.zeros(len(valores) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codigos[validas], minlength=len(valores)), out=self.inicios_filas[1:])
+
+        # Orden alfabético de los nombres completos y posición de cada uno
+        self.alfabetico = sorted(range(len(self.nombres)), key=self.nombres.__getitem__)
+        self.nombres_ordenados = [self.nombres[k] for k in self.alfabetico]
+        self.posicion = np.empty(len(self.nombres), dtype=np.int64)
+        self.posicion[self.alfabetico] = np.arange(len(self.nombres))
+
+        # Vocabulario ordenado y nombres de cada palabra (CSR en orden de vocabulario)
+        por_palabra = defaultdict(list)
+        con_filas = np.diff(self.inicios_filas) > 0
+        for k, nombre in enumerate(self.nombres):
+            if not con_filas[k]:  # Categoría sin filas (p. ej. descartadas por coordenadas)
+                continue
+            for palabra in set(palabras(nombre)):
+                por_palabra[palabra].append(k)
+        self.vocabulario = sorted(por_palabra)
+        largos = [len(por_palabra[p]) for p in self.vocabulario]
+        self.inicios = np.zeros(len(self.vocabulario) + 1, dtype=np.int64)
+        np.cumsum(largos, out=self.inicios[1:])
+        self.ids = np.fromiter(chain.from_iterable(por_palabra[p] for p in self.vocabulario),
+                               dtype=np.int32, count=int(self.inicios[-1]))
+
+    def _con_prefijo(self, prefijo):
+        """Nombres con alguna palabra que empieza con el prefijo"""
+        desde = bisect_left(self.vocabulario, prefijo)
+        hasta = bisect_left(self.vocabulario, prefijo + FIN_PREFIJO)
+        return np.unique(self.ids[self.inicios[desde]:self.inicios[hasta]])
+
+    def buscar(self, texto, limite, centro=None):
+        """
+        Mejores filas para un texto normalizado
+
+        Args:
+            texto (str): Texto ya normalizado (normalizar_texto)
+            limite (int): Filas devueltas como máximo
+            centro (tuple): (lat, lng) para ordenar por cercanía dentro de cada clase
+
+        Returns:
+            (resultados, total): lista de (clase, criterio, fila, distancia_km)
+            y cantidad de nombres que coinciden
+        """
+        candidatos = None
+        for palabra in palabras(texto):
+            ids = self._con_prefijo(palabra)
+            candidatos = ids if candidatos is None else np.intersect1d(candidatos, ids, assume_unique=True)
+            if len(candidatos) == 0:
+                break
+        if candidatos is None or len(candidatos) == 0:
+            return [], 0
+
+        # Clase por posición alfabética: [exacta) dentro de [prefijo)
+        posiciones = self.posicion[candidatos]
+        desde = bisect_left(self.nombres_ordenados, texto)
+        hasta_exacta = bisect_right(self.nombres_ordenados, texto)
+        hasta_prefijo = bisect_left(self.nombres_ordenados, texto + FIN_PREFIJO)
+        clases = np.full(len(candidatos), PALABRAS)
+        clases[(posiciones >= desde) & (posiciones < hasta_prefijo)] = PREFIJO
+        clases[(posiciones >= desde) & (posiciones < hasta_exacta)] = EXACTA
+
+        if centro is not None:
+            # Distancia a la fila más cercana de cada nombre (tramos CSR concatenados)
+            inicios = self.inicios_filas[candidatos]
+            largos = self.inicios_filas[candidatos + 1] - inicios
+            cortes = np.cumsum(largos) - largos
+            filas = self.filas[np.arange(int(largos.sum())) + np.repeat(inicios - cortes, largos)]
+            distancias = haversine_vectorizado(centro[0], centro[1], self.lats[filas], self.lngs[filas])
+            criterio = np.minimum.reduceat(distancias, cortes)
+        else:
+            criterio = self.largos[candidatos].astype(np.float64)
+        orden = np.lexsort((posiciones, criterio, clases))
+
+        resultados = []
+        for i in orden[:limite]:
+            k = candidatos[i]
+            filas = self.filas[self.inicios_filas[k]:self.inicios_filas[k + 1]]
+            distancias = None
+            if centro is not None:
+                distancias = haversine_vectorizado(centro[0], centro[1], self.lats[filas], self.lngs[filas])
+                cercanas = np.argsort(distancias, kind='stable')
+                filas, distancias = filas[cercanas], distancias[cercanas]
+            for j, fila in enumerate(filas[:limite - len(resultados)].tolist()):
+                distancia = float(distancias[j]) if distancias is not None else None
+                # Criterio para mezclar tipos: distancia de la fila o largo del nombre
+                resultados.append((int(clases[i]), distancia if distancia is not None else float(criterio[i]),
+                                   fila, distancia))
+            if len(resultados) >= limite:
+                break
+        return resultados, len(candidatos)
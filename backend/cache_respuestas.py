@@ -0,0 +1,85 @@
+"""
+Cache LRU con TTL para respuestas de consultas del mapa.
+
+El frontend consulta /api/mapa/puntos en cada movimiento del slider o del
+mapa, y muchas consultas son casi idénticas. Las claves se normalizan
+(tipos ordenados, centro redondeado a una grilla configurable) y cada entrada
+guarda el JSON ya serializado.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAPA_TAMANO = int(os.getenv("CACHE_MAPA_TAMANO", "256"))
+CACHE_MAPA_TTL = float(os.getenv("CACHE_MAPA_TTL", "300"))  # segundos
+CACHE_MAPA_PASO = float(os.getenv("CACHE_MAPA_PASO", "0.001"))  # grados (~100 m)
+
+
+def cuantizar(valor, paso=CACHE_MAPA_PASO):
+    """Redondear una coordenada a la grilla de la cache"""
+    if paso <= 0:
+        return valor
+    return round(round(valor / paso) * paso, 6)
+
+
+class CacheLRU:
+    """Cache en memoria acotada por tamaño, con expiración por antigüedad (ttl=None: sin expiración)"""
+
+    def __init__(self, tamano_maximo=CACHE_MAPA_TAMANO, ttl=CACHE_MAPA_TTL):
+        self.tamano_maximo = tamano_maximo
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.desalojadas = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        """Valor guardado o None (cuenta hit/miss)"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                creada, valor = entrada
+                if self.ttl is None or time.monotonic() - creada <= self.ttl:
+                    self._entradas.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self._entradas[clave]
+                self.expiradas += 1
+            self.misses += 1
+            return None
+
+    def guardar(self, clave, valor):
+        if self.tamano_maximo <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = (time.monotonic(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano_maximo:
+                self._entradas.popitem(last=False)
+                self.desalojadas += 1
+
+    def invalidar(self):
+        """Vaciar la cache (p. ej. al recargar datasets)"""
+        with self._lock:
+            self._entradas.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "tamano_maximo": self.tamano_maximo,
+                "ttl_segundos": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+                "expiradas": self.expiradas,
+                "desalojadas": self.desalojadas,
+                "invalidaciones": self.invalidaciones,
+            }
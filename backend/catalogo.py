@@ -0,0 +1,127 @@
+"""
+Catálogo precalculado de opciones de filtros.
+
+Cada tipo de dataset aporta un catálogo parcial (jerarquía de ubicaciones,
+valores de tipo_oefa y PARAMETRO, rango de años, conteo) que se calcula una
+sola vez cuando ese tipo se carga o recarga. El catálogo global solo combina
+los parciales, y se sirve con ETag/Last-Modified para que el dashboard pueda
+revalidar con un 304.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+import pandas as pd
+
+COLUMNAS_UBICACION = ['departamento', 'provincia', 'distrito']
+
+
+def _valores_unicos(df, columna):
+    if columna not in df.columns:
+        return []
+    return sorted({str(v) for v in df[columna].dropna().unique()})
+
+
+def _rango_anios(df):
+    """Rango de años de los registros (ANHO o, en las filas sin ANHO, FECHA_MUESTRA ISO)"""
+    if 'ANHO' not in df.columns and 'FECHA_MUESTRA' not in df.columns:
+        return None
+    anios = pd.Series(float('nan'), index=df.index)
+    if 'ANHO' in df.columns:
+        anios = pd.to_numeric(df['ANHO'], errors='coerce').astype(float)
+    if 'FECHA_MUESTRA' in df.columns:
+        fechas = pd.to_datetime(df['FECHA_MUESTRA'], format='%Y-%m-%d', errors='coerce')
+        anios = anios.fillna(fechas.dt.year.astype(float))
+    anios = anios.dropna()
+    if anios.empty:
+        return None
+    return {"desde": int(anios.min()), "hasta": int(anios.max())}
+
+
+def _jerarquia(df):
+    """departamento -> provincia -> [distritos] con las columnas disponibles"""
+    columnas = [c for c in COLUMNAS_UBICACION if c in df.columns]
+    if not columnas or columnas[0] != 'departamento':
+        return {}
+
+    jerarquia = {}
+    combinaciones = df[columnas].dropna(subset=['departamento']).drop_duplicates()
+    for fila in combinaciones.astype(object).itertuples(index=False):
+        departamento = str(fila[0])
+        provincias = jerarquia.setdefault(departamento, {})
+        if len(fila) > 1 and pd.notna(fila[1]):
+            distritos = provincias.setdefault(str(fila[1]), set())
+            if len(fila) > 2 and pd.notna(fila[2]):
+                distritos.add(str(fila[2]))
+    return jerarquia
+
+
+def catalogo_dataset(df):
+    """Catálogo parcial de un tipo de dataset"""
+    return {
+        "registros": len(df),
+        "jerarquia": _jerarquia(df),
+        "tipos_oefa": _valores_unicos(df, 'tipo_oefa'),
+        "parametros": _valores_unicos(df, 'PARAMETRO'),
+        "anios": _rango_anios(df),
+        "actualizado": datetime.now(timezone.utc),
+    }
+
+
+def no_modificado_desde(last_modified, if_modified_since):
+    """
+    El catálogo no cambió desde la fecha del encabezado If-Modified-Since
+
+    Las fechas HTTP se comparan como fechas (un cliente puede reenviarla en
+    otro formato válido); un encabezado que no se puede interpretar se ignora.
+    """
+    try:
+        desde = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= desde
+
+
+def combinar_catalogos(parciales, tipos):
+    """
+    Catálogo global a partir de los parciales por tipo
+
+    Returns:
+        Dict con 'contenido' (JSON serializable), 'etag' y 'last_modified'
+    """
+    jerarquia = {}
+    for parcial in parciales.values():
+        for departamento, provincias in parcial["jerarquia"].items():
+            destino = jerarquia.setdefault(departamento, {})
+            for provincia, distritos in provincias.items():
+                destino.setdefault(provincia, set()).update(distritos)
+
+    anios = [p["anios"] for p in parciales.values() if p["anios"]]
+    contenido = {
+        "ubicaciones": sorted(jerarquia),
+        "jerarquia": {
+            departamento: {provincia: sorted(distritos) for provincia, distritos in sorted(provincias.items())}
+            for departamento, provincias in sorted(jerarquia.items())
+        },
+        "tipos": tipos,
+        "tipos_oefa": sorted({v for p in parciales.values() for v in p["tipos_oefa"]}),
+        "parametros": sorted({v for p in parciales.values() for v in p["parametros"]}),
+        "anios": {
+            "desde": min(a["desde"] for a in anios),
+            "hasta": max(a["hasta"] for a in anios),
+        } if anios else None,
+        "conteos": {tipo: parcial["registros"] for tipo, parcial in parciales.items()},
+        "total_registros": sum(parcial["registros"] for parcial in parciales.values()),
+    }
+
+    serializado = json.dumps(contenido, sort_keys=True, ensure_ascii=False).encode()
+    actualizado = max((p["actualizado"] for p in parciales.values()), default=datetime.now(timezone.utc))
+    return {
+        "contenido": contenido,
+        "etag": f'"{hashlib.sha1(serializado).hexdigest()}"',
+        "last_modified": format_datetime(actualizado.replace(microsecond=0), usegmt=True),
+    }
@@ -0,0 +1,107 @@
+"""
+Agregación de puntos en clusters por nivel de zoom.
+
+Cada nivel de zoom usa una grilla lat/lon de DIVISIONES_POR_TESELA celdas por
+lado de tesela (una tesela de zoom z cubre 360/2^z grados). Para cada dataset
+se precalculan, en los niveles de zoom bajos, los conteos y las sumas de
+coordenadas de todas las celdas, que responden directamente las vistas que
+cubren todo el dataset. Las vistas parciales agregan solo los puntos dentro
+del radio.
+"""
+
+import os
+
+import numpy as np
+
+ZOOM_PUNTOS = int(os.getenv("ZOOM_PUNTOS", "14"))  # Desde este zoom se devuelven puntos
+ZOOM_MAX_PRECALCULO = 10  # Niveles con agregados precalculados (celdas de ~10 km o más)
+DIVISIONES_POR_TESELA = 4
+
+
+def tamano_celda_zoom(zoom):
+    """Tamaño de celda (grados) de la grilla de clusters para un zoom"""
+    return 360.0 / (2 ** zoom) / DIVISIONES_POR_TESELA
+
+
+def claves_celda(lats, lngs, zoom):
+    """Clave entera de la celda de cada punto en la grilla del zoom"""
+    tamano = tamano_celda_zoom(zoom)
+    columnas = int(np.ceil(360.0 / tamano))
+    fila = np.floor((np.asarray(lats) + 90.0) / tamano).astype(np.int64)
+    col = np.floor((np.asarray(lngs) + 180.0) / tamano).astype(np.int64)
+    return fila * columnas + col
+
+
+def agregar(lats, lngs, zoom):
+    """
+    Agrupar puntos por celda
+
+    Returns:
+        (claves, conteos, suma_lat, suma_lng) ordenados por clave
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if len(lats) == 0:
+        vacio = np.empty(0)
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), vacio, vacio
+
+    claves, inversa = np.unique(claves_celda(lats, lngs, zoom), return_inverse=True)
+    conteos = np.bincount(inversa)
+    suma_lat = np.bincount(inversa, weights=lats)
+    suma_lng = np.bincount(inversa, weights=lngs)
+    return claves, conteos, suma_lat, suma_lng
+
+
+class IndiceClusters:
+    """Agregados precalculados por nivel de zoom para un dataset"""
+
+    def __init__(self, lats, lngs, zoom_max=min(ZOOM_MAX_PRECALCULO, ZOOM_PUNTOS - 1)):
+        self.total = len(lats)
+        self.niveles = [agregar(lats, lngs, zoom) for zoom in range(zoom_max + 1)]
+
+    def nivel(self, zoom):
+        """Agregados de todo el dataset en el zoom pedido (None si no se precalculó)"""
+        if 0 <= zoom < len(self.niveles):
+            return self.niveles[zoom]
+        return None
+
+
+def combinar_clusters(agregados_por_tipo):
+    """
+    Unir los clusters de varios tipos que caen en la misma celda
+
+    Args:
+        agregados_por_tipo: {tipo: (claves, conteos, suma_lat, suma_lng)}
+
+    Returns:
+        Lista de clusters con centroide, total y conteo por tipo
+    """
+    tipos = [t for t, agregado in agregados_por_tipo.items() if len(agregado[0])]
+    if not tipos:
+        return []
+
+    claves = np.concatenate([agregados_por_tipo[t][0] for t in tipos])
+    conteos = np.concatenate([agregados_por_tipo[t][1] for t in tipos])
+    suma_lat = np.concatenate([agregados_por_tipo[t][2] for t in tipos])
+    suma_lng = np.concatenate([agregados_por_tipo[t][3] for t in tipos])
+    origen = np.repeat(np.arange(len(tipos)), [len(agregados_por_tipo[t][0]) for t in tipos])
+
+    unicas, inversa = np.unique(claves, return_inverse=True)
+    totales = np.bincount(inversa, weights=conteos).astype(np.int64)
+    latitudes = np.bincount(inversa, weights=suma_lat) / totales
+    longitudes = np.bincount(inversa, weights=suma_lng) / totales
+    por_tipo = {
+        tipo: np.bincount(inversa[origen == i], weights=conteos[origen == i],
+                          minlength=len(unicas)).astype(np.int64).tolist()
+        for i, tipo in enumerate(tipos)
+    }
+
+    return [
+        {
+            "latitud": round(lat, 6),
+            "longitud": round(lng, 6),
+            "total": total,
+            "tipos_count": {tipo: por_tipo[tipo][i] for tipo in tipos if por_tipo[tipo][i]},
+        }
+        for i, (lat, lng, total) in enumerate(zip(latitudes.tolist(), longitudes.tolist(), totales.tolist()))
+    ]
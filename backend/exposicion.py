@@ -0,0 +1,144 @@
+"""
+Exposición de población, colegios y establecimientos de salud alrededor de
+los puntos de muestreo OEFA.
+
+Para cada ubicación única de muestreo se buscan los centros poblados,
+instituciones educativas y establecimientos de salud a menos de un radio,
+usando el índice espacial del dataset de destino. IndiceEspacial.consultar_radio_lote
+resuelve las ubicaciones por celda con matrices de distancias acotadas, dentro
+del mismo proceso.
+
+Con muchas ubicaciones y un índice abierto desde memory-map (DATASETS_MMAP=1),
+las ubicaciones se reparten en bloques contiguos por celda y se procesan en un
+pool de procesos iniciados con "spawn": cada worker reabre el índice por su
+ruta, en lugar de recibirlo serializado, y no hereda por fork los hilos (ni
+los locks tomados) de la API. El worker compara la huella de los CSV guardada
+en meta.json con la del índice del proceso principal; si una recarga cambió
+la exportación, el cálculo vuelve al proceso principal.
+
+El resultado de cada (destino, radio) queda en formato CSR: inicios[k]:inicios[k+1]
+son los vecinos de la ubicación k en posiciones/distancias.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from indice_espacial import IndiceEspacial
+from memoria_compartida import huella_exportacion
+
+EXPOSICION_PROCESOS = int(os.getenv("EXPOSICION_PROCESOS", "0"))  # 0 = un proceso por CPU
+EXPOSICION_MIN_PARALELO = 5000  # Ubicaciones desde las que conviene usar el pool
+EXPOSICION_BLOQUE = 2000  # Ubicaciones por tarea del pool
+RADIO_EXPOSICION_KM = float(os.getenv("RADIO_EXPOSICION_KM", "5"))
+TIPOS_EXPUESTOS = ['poblacion', 'educacion', 'salud']
+
+_indice_worker = None  # Índice de destino en cada proceso del pool (memory-map)
+
+
+class PuntosMuestreo:
+    """Ubicaciones únicas de muestreo OEFA y las filas que agrupa cada una"""
+
+    def __init__(self, df):
+        coordenadas = np.column_stack((df['latitud'].to_numpy(dtype=np.float64),
+                                       df['longitud'].to_numpy(dtype=np.float64)))
+        unicas, primeras, inversa, registros = np.unique(
+            coordenadas, axis=0, return_index=True, return_inverse=True, return_counts=True
+        )
+        self.lats = unicas[:, 0]
+        self.lngs = unicas[:, 1]
+        self.primeras = primeras  # Primera fila del DataFrame en cada ubicación
+        self.registros = registros
+        self.ubicacion_fila = inversa.ravel()  # Ubicación de cada fila del DataFrame
+        self.total = len(unicas)
+
+
+class Exposicion:
+    """Vecinos de cada ubicación de muestreo en un dataset de destino (CSR)"""
+
+    def __init__(self, total_fuentes, fuentes, posiciones, distancias):
+        self.inicios = np.zeros(total_fuentes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(fuentes, minlength=total_fuentes), out=self.inicios[1:])
+        self.posiciones = posiciones
+        self.distancias = distancias
+
+    @property
+    def conteos(self):
+        return np.diff(self.inicios)
+
+    def vecinos(self, k):
+        """Posiciones y distancias de los puntos cercanos a la ubicación k"""
+        tramo = slice(self.inicios[k], self.inicios[k + 1])
+        return self.posiciones[tramo], self.distancias[tramo]
+
+    def destinos_expuestos(self):
+        """Cantidad de puntos de destino distintos con al menos una ubicación cerca"""
+        return len(np.unique(self.posiciones))
+
+
+def _inicializar_worker(directorio, huella):
+    global _indice_worker
+    # Huella antes y después de abrir: una recarga a mitad de camino también se detecta
+    antes = huella_exportacion(directorio)
+    _indice_worker = IndiceEspacial.cargar(directorio)
+    if antes != huella or huella_exportacion(directorio) != huella:
+        _indice_worker = None  # Una recarga reemplazó la exportación
+
+
+def _pares_bloque(lats, lngs, radio_km):
+    if _indice_worker is None:
+        raise RuntimeError("El índice en disco ya no corresponde a esta versión")
+    return _indice_worker.consultar_radio_lote(lats, lngs, radio_km)
+
+
+def calcular_exposicion(indice, lats, lngs, radio_km, procesos=EXPOSICION_PROCESOS):
+    """
+    Vecinos a menos de radio_km de cada ubicación, en el índice de destino
+
+    Args:
+        indice (IndiceEspacial): Índice del dataset de destino
+        lats, lngs: Ubicaciones de origen
+        radio_km (float): Radio de exposición
+        procesos (int): Procesos del pool (0 = uno por CPU, 1 = sin pool); el
+            pool solo se usa si el índice se abrió desde memory-map (adjuntar_mmap)
+
+    Returns:
+        Exposicion
+    """
+    total = len(lats)
+    procesos = procesos or os.cpu_count() or 1
+    if indice is None:
+        vacio = np.empty(0, dtype=np.int64)
+        return Exposicion(total, vacio, vacio, np.empty(0, dtype=np.float64))
+
+    directorio = getattr(indice, 'directorio', None)
+    huella = getattr(indice, 'huella', None)
+    if procesos <= 1 or total < EXPOSICION_MIN_PARALELO or directorio is None or huella is None:
+        return Exposicion(total, *indice.consultar_radio_lote(lats, lngs, radio_km))
+
+    # Bloques espacialmente contiguos: cada tarea toca pocas celdas del índice
+    orden = np.lexsort((lngs, np.floor(np.asarray(lats) / indice.tamano_celda)))
+    bloques = [orden[i:i + EXPOSICION_BLOQUE] for i in range(0, total, EXPOSICION_BLOQUE)]
+
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_inicializar_worker,
+                                 initargs=(str(directorio), huella)) as pool:
+            resultados = pool.map(_pares_bloque, [lats[b] for b in bloques], [lngs[b] for b in bloques],
+                                  [radio_km] * len(bloques))
+            fuentes, posiciones, distancias = [], [], []
+            for bloque, (locales, pos, dist) in zip(bloques, resultados):
+                fuentes.append(bloque[locales])
+                posiciones.append(pos)
+                distancias.append(dist)
+    except RuntimeError as e:
+        print(f"⚠️ Exposición sin pool de procesos: {e}")
+        return Exposicion(total, *indice.consultar_radio_lote(lats, lngs, radio_km))
+
+    fuentes = np.concatenate(fuentes)
+    posiciones = np.concatenate(posiciones)
+    distancias = np.concatenate(distancias)
+    orden = np.lexsort((distancias, fuentes))
+    return Exposicion(total, fuentes[orden], posiciones[orden], distancias[orden])
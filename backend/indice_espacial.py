@@ -0,0 +1,297 @@
+"""
+Índice espacial por grilla lat/lon para consultas de radio.
+
+Los puntos se agrupan en celdas de tamaño fijo (en grados) y se ordenan por
+celda, de modo que cada fila de la grilla ocupa un tramo contiguo de los
+arreglos. Una consulta de radio solo toca las celdas candidatas y luego
+refina con la distancia haversine exacta.
+
+Si se construye con los días de muestreo, dentro de cada celda las filas
+quedan ordenadas por día y la clave (celda, día) es creciente en todo el
+arreglo: una ventana de tiempo se resuelve con búsquedas binarias por celda
+en lugar de revisar la fecha de cada candidato.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from indice_temporal import SIN_FECHA
+
+ARREGLOS_INDICE = ('orden', 'lats', 'lngs', 'inicios')
+ARREGLOS_FECHA = ('claves_fecha',)  # Solo en índices construidos con fechas
+
+RADIO_TIERRA_KM = 6371
+KM_POR_GRADO = 2 * np.pi * RADIO_TIERRA_KM / 360
+
+
+def haversine_vectorizado(lat1, lng1, lats, lngs):
+    """Distancia haversine en km desde (lat1, lng1) hacia arreglos de puntos"""
+    lat1_rad = np.radians(lat1)
+    lng1_rad = np.radians(lng1)
+    lat2_rad = np.radians(lats)
+    lng2_rad = np.radians(lngs)
+
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+    a = np.sin(dlat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng/2)**2
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return c * RADIO_TIERRA_KM
+
+
+class IndiceEspacial:
+    """Grilla de celdas lat/lon sobre las posiciones de un DataFrame"""
+
+    def __init__(self, lats, lngs, tamano_celda=0.1, dias=None):
+        """
+        Args:
+            lats, lngs: Coordenadas de cada fila
+            tamano_celda (float): Lado de la celda en grados
+            dias: Día de muestreo de cada fila (int64, SIN_FECHA si falta), opcional
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        self.tamano_celda = tamano_celda
+        self.total = len(lats)
+
+        if self.total == 0:
+            self.lat_min = self.lng_min = 0.0
+            self.filas = self.columnas = 1
+        else:
+            self.lat_min = float(lats.min())
+            self.lng_min = float(lngs.min())
+            self.filas = int((lats.max() - self.lat_min) // tamano_celda) + 1
+            self.columnas = int((lngs.max() - self.lng_min) // tamano_celda) + 1
+
+        fila = ((lats - self.lat_min) // tamano_celda).astype(np.int64)
+        col = ((lngs - self.lng_min) // tamano_celda).astype(np.int64)
+        celda = fila * self.columnas + col
+
+        # Orden estable por celda (y por día dentro de cada celda): posiciones originales agrupadas
+        if dias is None:
+            self.orden = np.argsort(celda, kind='stable')
+        else:
+            self.orden = np.lexsort((dias, celda))
+            self._claves_fecha(celda[self.orden], np.asarray(dias, dtype=np.int64)[self.orden])
+        self.lats = lats[self.orden]
+        self.lngs = lngs[self.orden]
+
+        # inicios[k]:inicios[k+1] es el tramo de la celda k en los arreglos ordenados
+        conteo = np.bincount(celda, minlength=self.filas * self.columnas)
+        self.inicios = np.zeros(len(conteo) + 1, dtype=np.int64)
+        np.cumsum(conteo, out=self.inicios[1:])
+
+    def _claves_fecha(self, celdas, dias):
+        """Clave creciente celda * periodo + día relativo (0 = sin fecha)"""
+        con_fecha = dias != SIN_FECHA
+        self.dia_min = int(dias[con_fecha].min()) if con_fecha.any() else 0
+        dia_max = int(dias[con_fecha].max()) if con_fecha.any() else 0
+        self.periodo = dia_max - self.dia_min + 2
+        self.claves_fecha = celdas * self.periodo + np.where(con_fecha, dias - self.dia_min + 1, 0)
+
+    @property
+    def con_fechas(self):
+        return getattr(self, 'claves_fecha', None) is not None
+
+    def guardar(self, directorio):
+        """Guardar los arreglos del índice como .npy (para memory-map)"""
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        arreglos = ARREGLOS_INDICE + (ARREGLOS_FECHA if self.con_fechas else ())
+        for nombre in arreglos:
+            np.save(directorio / f"{nombre}.npy", getattr(self, nombre))
+        meta = {
+            'arreglos': list(arreglos),
+            'tamano_celda': self.tamano_celda,
+            'total': self.total,
+            'lat_min': self.lat_min,
+            'lng_min': self.lng_min,
+            'filas': self.filas,
+            'columnas': self.columnas,
+        }
+        if self.con_fechas:
+            meta.update(dia_min=self.dia_min, periodo=self.periodo)
+        (directorio / "indice.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def cargar(cls, directorio, mmap_mode='r'):
+        """Reconstruir un índice guardado sin copiar sus arreglos a memoria"""
+        directorio = Path(directorio)
+        indice = cls.__new__(cls)
+        meta = json.loads((directorio / "indice.json").read_text())
+        for nombre in meta.pop('arreglos', ARREGLOS_INDICE):
+            setattr(indice, nombre, np.load(directorio / f"{nombre}.npy", mmap_mode=mmap_mode))
+        for clave, valor in meta.items():
+            setattr(indice, clave, valor)
+        indice.directorio = directorio  # Otros procesos pueden reabrirlo desde aquí
+        return indice
+
+    def _rango(self, valor_min, valor_max, origen, limite):
+        """Rango de celdas [desde, hasta] recortado a la grilla"""
+        desde = int(max((valor_min - origen) // self.tamano_celda, 0))
+        hasta = int(min((valor_max - origen) // self.tamano_celda, limite - 1))
+        return desde, hasta
+
+    def candidatos(self, centro_lat, centro_lng, radio_km, ventana=None):
+        """
+        Índices (en orden de celda) de los puntos en celdas que tocan el radio
+
+        Con ventana=(desde, hasta) en días (None = sin límite) y un índice con
+        fechas, solo los puntos con día de muestreo dentro de la ventana.
+        """
+        if self.total == 0:
+            return np.empty(0, dtype=np.int64)
+
+        dlat = radio_km / KM_POR_GRADO
+        lat_lejana = min(abs(centro_lat) + dlat, 90.0)
+        cos_lat = np.cos(np.radians(lat_lejana))
+        if cos_lat < 1e-6 or radio_km / (KM_POR_GRADO * cos_lat) >= 180:
+            lng_desde, lng_hasta = 0, self.columnas - 1
+        else:
+            dlng = radio_km / (KM_POR_GRADO * cos_lat)
+            lng_desde, lng_hasta = self._rango(
+                centro_lng - dlng, centro_lng + dlng, self.lng_min, self.columnas
+            )
+        lat_desde, lat_hasta = self._rango(
+            centro_lat - dlat, centro_lat + dlat, self.lat_min, self.filas
+        )
+        if ventana is not None and self.con_fechas:
+            return self._tramos_ventana(lat_desde, lat_hasta, lng_desde, lng_hasta, *ventana)
+        return self._tramos(lat_desde, lat_hasta, lng_desde, lng_hasta)
+
+    def _tramos(self, lat_desde, lat_hasta, lng_desde, lng_hasta):
+        """Índices ordenados de las celdas en el rectángulo de filas/columnas"""
+        if lat_desde > lat_hasta or lng_desde > lng_hasta:
+            return np.empty(0, dtype=np.int64)
+
+        # Cada fila de la grilla es un tramo contiguo entre las columnas pedidas
+        tramos = []
+        for fila in range(lat_desde, lat_hasta + 1):
+            base = fila * self.columnas
+            inicio = self.inicios[base + lng_desde]
+            fin = self.inicios[base + lng_hasta + 1]
+            if fin > inicio:
+                tramos.append(np.arange(inicio, fin))
+
+        if not tramos:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(tramos)
+
+    def _tramos_ventana(self, lat_desde, lat_hasta, lng_desde, lng_hasta, desde, hasta):
+        """Índices de las celdas del rectángulo con día en [desde, hasta] (dos búsquedas binarias por celda)"""
+        vacio = np.empty(0, dtype=np.int64)
+        if lat_desde > lat_hasta or lng_desde > lng_hasta:
+            return vacio
+
+        # Días relativos recortados al periodo del índice; 0 (sin fecha) nunca entra
+        rel_desde = 1 if desde is None else min(max(desde - self.dia_min + 1, 1), self.periodo)
+        rel_hasta = self.periodo - 1 if hasta is None else min(max(hasta - self.dia_min + 1, 0), self.periodo - 1)
+        if rel_desde > rel_hasta:
+            return vacio
+
+        celdas = (np.arange(lat_desde, lat_hasta + 1)[:, np.newaxis] * self.columnas
+                  + np.arange(lng_desde, lng_hasta + 1)).ravel()
+        inicios = np.searchsorted(self.claves_fecha, celdas * self.periodo + rel_desde, side='left')
+        fines = np.searchsorted(self.claves_fecha, celdas * self.periodo + rel_hasta, side='right')
+        largos = fines - inicios
+        total = int(largos.sum())
+        if total == 0:
+            return vacio
+        # Concatenar los tramos [inicio, fin) de todas las celdas sin recorrerlas
+        return np.arange(total) + np.repeat(inicios - (np.cumsum(largos) - largos), largos)
+
+    def consultar_radio(self, centro_lat, centro_lng, radio_km, ventana=None):
+        """
+        Puntos dentro del radio (y de la ventana de días, ver candidatos)
+
+        Returns:
+            (posiciones, distancias): posiciones en el DataFrame original
+            y distancias exactas en km
+        """
+        idx = self.candidatos(centro_lat, centro_lng, radio_km, ventana)
+        if len(idx) == 0:
+            return idx, np.empty(0, dtype=np.float64)
+
+        distancias = haversine_vectorizado(
+            centro_lat, centro_lng, self.lats[idx], self.lngs[idx]
+        )
+        dentro = distancias <= radio_km
+        return self.orden[idx[dentro]], distancias[dentro]
+
+    def consultar_caja(self, lat_min, lat_max, lng_min, lng_max):
+        """Posiciones en el DataFrame original de los puntos dentro del rectángulo"""
+        if self.total == 0:
+            return np.empty(0, dtype=np.int64)
+
+        lat_desde, lat_hasta = self._rango(lat_min, lat_max, self.lat_min, self.filas)
+        lng_desde, lng_hasta = self._rango(lng_min, lng_max, self.lng_min, self.columnas)
+        idx = self._tramos(lat_desde, lat_hasta, lng_desde, lng_hasta)
+
+        lats = self.lats[idx]
+        lngs = self.lngs[idx]
+        dentro = (lats >= lat_min) & (lats <= lat_max) & (lngs >= lng_min) & (lngs <= lng_max)
+        return self.orden[idx[dentro]]
+
+    def consultar_radio_lote(self, lats, lngs, radio_km, max_elementos=2_000_000):
+        """
+        Pares (fuente, punto) a menos de radio_km para muchos centros a la vez
+
+        Las fuentes se agrupan por celda de la grilla; cada grupo comparte los
+        candidatos de las celdas vecinas y se resuelve con una sola matriz de
+        distancias (partida en bloques de hasta max_elementos).
+
+        Returns:
+            (fuentes, posiciones, distancias): índice de la fuente en lats/lngs,
+            posición en el DataFrame original y distancia en km, ordenados por fuente
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        if self.total == 0 or len(lats) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        fila = np.floor((lats - self.lat_min) / self.tamano_celda).astype(np.int64)
+        col = np.floor((lngs - self.lng_min) / self.tamano_celda).astype(np.int64)
+        celdas, inversa = np.unique(np.column_stack((fila, col)), axis=0, return_inverse=True)
+        inversa = inversa.ravel()
+        por_celda = np.argsort(inversa, kind='stable')
+        limites = np.searchsorted(inversa[por_celda], np.arange(len(celdas) + 1))
+
+        dlat = radio_km / KM_POR_GRADO
+        fuentes, posiciones, distancias = [], [], []
+        for k, (f, c) in enumerate(celdas.tolist()):
+            lat_desde = self.lat_min + f * self.tamano_celda - dlat
+            lat_hasta = self.lat_min + (f + 1) * self.tamano_celda + dlat
+            cos_lat = np.cos(np.radians(min(max(abs(lat_desde), abs(lat_hasta)), 90.0)))
+            if cos_lat < 1e-6 or radio_km / (KM_POR_GRADO * cos_lat) >= 180:
+                lng_rango = (0, self.columnas - 1)
+            else:
+                dlng = radio_km / (KM_POR_GRADO * cos_lat)
+                lng_rango = self._rango(self.lng_min + c * self.tamano_celda - dlng,
+                                        self.lng_min + (c + 1) * self.tamano_celda + dlng,
+                                        self.lng_min, self.columnas)
+            idx = self._tramos(*self._rango(lat_desde, lat_hasta, self.lat_min, self.filas), *lng_rango)
+            if len(idx) == 0:
+                continue
+
+            cand_lats = self.lats[idx][np.newaxis, :]
+            cand_lngs = self.lngs[idx][np.newaxis, :]
+            grupo = por_celda[limites[k]:limites[k + 1]]
+            paso = max(1, max_elementos // len(idx))
+            for inicio in range(0, len(grupo), paso):
+                bloque = grupo[inicio:inicio + paso]
+                matriz = haversine_vectorizado(lats[bloque, np.newaxis], lngs[bloque, np.newaxis],
+                                               cand_lats, cand_lngs)
+                i, j = np.nonzero(matriz <= radio_km)
+                fuentes.append(bloque[i])
+                posiciones.append(self.orden[idx[j]])
+                distancias.append(matriz[i, j])
+
+        if not fuentes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        fuentes = np.concatenate(fuentes)
+        posiciones = np.concatenate(posiciones)
+        distancias = np.concatenate(distancias)
+        orden = np.lexsort((distancias, fuentes))
+        return fuentes[orden], posiciones[orden], distancias[orden]
@@ -0,0 +1,144 @@
+"""
+Fechas de muestreo como enteros e índice ordenado para ventanas de tiempo.
+
+FECHA_MUESTRA (evaluaciones) o FECHA_PTO (INAF), y si faltan ANHO/MES, se
+convierten una sola vez al cargar en un arreglo int64 de días desde
+1970-01-01; como se repiten mucho entre muestras, solo se interpretan los
+valores únicos. IndiceTemporal guarda las
+filas ordenadas por día, así contar o listar las filas de una ventana
+[desde, hasta] son dos búsquedas binarias. Dentro de cada celda del índice
+espacial las filas también se ordenan por día (IndiceEspacial con fechas).
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+SIN_FECHA = np.iinfo(np.int64).min  # Día de las filas sin fecha conocida
+
+
+# Columnas de fecha completa, en orden de preferencia: evaluaciones e INAF
+COLUMNAS_FECHA = ['FECHA_MUESTRA', 'FECHA_PTO']
+
+# MES viene como nombre en español en los CSV de INAF ('ABRIL', 'SETIEMBRE')
+MESES = {
+    nombre: numero for numero, nombres in enumerate([
+        ['ENERO'], ['FEBRERO'], ['MARZO'], ['ABRIL'], ['MAYO'], ['JUNIO'], ['JULIO'], ['AGOSTO'],
+        ['SETIEMBRE', 'SEPTIEMBRE'], ['OCTUBRE'], ['NOVIEMBRE'], ['DICIEMBRE'],
+    ], start=1) for nombre in nombres
+}
+
+
+def _codigos_unicos(serie):
+    """(códigos por fila, valores distintos); el código -1 es faltante"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories.to_numpy()
+    return pd.factorize(serie)
+
+
+def _por_fila(serie, interpretar, faltante):
+    """Interpretar solo los valores distintos de una columna y repartirlos por fila"""
+    codigos, unicas = _codigos_unicos(serie)
+    # El código -1 (faltante) toma el último elemento
+    por_codigo = np.append(interpretar(unicas), faltante)
+    return por_codigo[codigos]
+
+
+def _dias_valores(valores):
+    """Días desde 1970 de un arreglo de fechas en texto (SIN_FECHA si no se interpreta)"""
+    fechas = pd.to_datetime(pd.Series(valores, dtype=object), errors='coerce').to_numpy(dtype='datetime64[D]')
+    dias = fechas.astype(np.int64)
+    dias[np.isnat(fechas)] = SIN_FECHA
+    return dias
+
+
+def numero_mes(valor):
+    """Mes 1-12 de un nombre en español o un número en texto (0 si no se interpreta)"""
+    texto = str(valor).strip().upper()
+    if texto in MESES:
+        return MESES[texto]
+    try:
+        numero = float(texto)
+    except ValueError:
+        return 0
+    return int(numero) if numero.is_integer() and 1 <= numero <= 12 else 0
+
+
+def _numeros_mes(valores):
+    return np.array([numero_mes(valor) for valor in valores], dtype=np.int64)
+
+
+def dias_epoch(df):
+    """
+    Día de muestreo de cada fila en días desde 1970-01-01
+
+    Cada fila toma la primera fecha que se pueda interpretar: FECHA_MUESTRA,
+    FECHA_PTO y por último el primer día de ANHO/MES. Las filas sin ninguna
+    (año o mes ilegibles incluidos) quedan como SIN_FECHA.
+
+    Returns:
+        Arreglo int64 (SIN_FECHA donde no hay fecha) o None si el dataset
+        no tiene columnas de fecha
+    """
+    columnas = [col for col in COLUMNAS_FECHA if col in df.columns]
+    if not columnas and 'ANHO' not in df.columns:
+        return None
+
+    dias = np.full(len(df), SIN_FECHA, dtype=np.int64)
+    for col in columnas:
+        faltan = dias == SIN_FECHA
+        if not faltan.any():
+            return dias
+        dias[faltan] = _por_fila(df[col], _dias_valores, SIN_FECHA)[faltan]
+
+    if 'ANHO' in df.columns and 'MES' in df.columns:
+        faltan = dias == SIN_FECHA
+        anios = pd.to_numeric(df['ANHO'], errors='coerce').to_numpy(dtype=np.float64)
+        meses = _por_fila(df['MES'], _numeros_mes, 0)
+        validos = faltan & np.isfinite(anios) & (anios >= 1900) & (anios <= 2200) & (meses >= 1)
+        primeros = (anios[validos].astype(np.int64) - 1970) * 12 + meses[validos] - 1
+        dias[validos] = primeros.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+    return dias
+
+
+def dia_de_fecha(texto):
+    """Día desde 1970 de una fecha 'AAAA-MM-DD' (ValueError si no es válida)"""
+    return (date.fromisoformat(texto) - date(1970, 1, 1)).days
+
+
+def fecha_de_dia(dia):
+    """'AAAA-MM-DD' de un día desde 1970 (None si no hay día)"""
+    return None if dia is None else str(np.datetime64(int(dia), 'D'))
+
+
+class IndiceTemporal:
+    """Posiciones de fila ordenadas por día de muestreo"""
+
+    def __init__(self, dias):
+        self.orden = np.argsort(dias, kind='stable')
+        self.dias = dias[self.orden]
+        self.con_fecha = int(np.searchsorted(self.dias, SIN_FECHA, side='right'))  # Inicio de las filas con fecha
+
+    def _tramo(self, desde=None, hasta=None):
+        inicio = self.con_fecha if desde is None else max(
+            int(np.searchsorted(self.dias, desde, side='left')), self.con_fecha)
+        fin = len(self.dias) if hasta is None else int(np.searchsorted(self.dias, hasta, side='right'))
+        return inicio, max(fin, inicio)
+
+    def contar(self, desde=None, hasta=None):
+        """Filas con fecha dentro de [desde, hasta] (días, extremos incluidos)"""
+        inicio, fin = self._tramo(desde, hasta)
+        return fin - inicio
+
+    def posiciones(self, desde=None, hasta=None):
+        """Posiciones de fila (ordenadas por día) dentro de [desde, hasta]"""
+        inicio, fin = self._tramo(desde, hasta)
+        return self.orden[inicio:fin]
+
+    def rango(self):
+        """(primer día, último día) con fecha conocida, o None"""
+        if self.con_fecha >= len(self.dias):
+            return None
+        return int(self.dias[self.con_fecha]), int(self.dias[-1])
@@ -0,0 +1,327 @@
+"""
+Ingesta por bloques de los CSV de OEFA con memoria acotada.
+
+Cada archivo se lee en bloques de FILAS_POR_BLOQUE filas, con todas sus
+columnas; ESQUEMA_OEFA indica el tipo de las conocidas. Las coordenadas UTM
+se convierten por bloque, la ubicación (departamento, provincia, distrito)
+se toma del texto de TXUBIGEO y las filas válidas se copian a búferes
+columnares preasignados (el total de filas se estima contando líneas antes
+de leer). Las columnas categóricas se guardan como códigos enteros contra un
+diccionario que crece con cada bloque, así el pico de memoria queda cerca
+del tamaño final del dataset.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+FILAS_POR_BLOQUE = int(os.getenv("INGESTA_FILAS_POR_BLOQUE", "200000"))
+
+TEXTO = 'texto'
+CATEGORIA = 'categoria'
+NUMERO = 'numero'
+ENTERO = 'entero'  # Numérica que queda como int64 si no tiene faltantes
+
+# Tipos de las columnas conocidas de los CSV de OEFA. Es solo una guía para
+# leerlas: las columnas que no están aquí también se conservan, como texto. Informes, puntos, fechas y ubigeos se
+# repiten entre muestras: como categóricas ocupan un código por fila en vez
+# de un str de Python (int32 en el búfer; Categorical.from_codes lo reduce a
+# int8/int16 según la cantidad de categorías).
+ESQUEMA_OEFA = {
+    # Agua residual, subterránea, superficial y suelo/sedimento (INAF)
+    'TXORIGEN': CATEGORIA,
+    'ANHO': ENTERO,
+    'MES': CATEGORIA,  # Nombre del mes en español ('ABRIL')
+    'EXPEDIENTE': CATEGORIA,
+    'CUC': CATEGORIA,
+    'COORDINACION': CATEGORIA,
+    'FECHAINI': CATEGORIA,
+    'FECHAFIN': CATEGORIA,
+    'TXUBIGEO': CATEGORIA,
+    'TXZONA': CATEGORIA,
+    'COORD_ESTE': NUMERO,
+    'COORD_NORTE': NUMERO,
+    'PUNTO_MUESTREO': CATEGORIA,
+    'TIPO_PUNT': CATEGORIA,
+    'TIPO_PUNTO': CATEGORIA,
+    'FECHA_PTO': CATEGORIA,
+    'HORA_PTO': CATEGORIA,
+    'LABORATORIO_ANONIMIZADO': CATEGORIA,
+    'LABORATORIO.ANONIMIZADO': CATEGORIA,
+    'TAREA_TDR': CATEGORIA,
+    'MATRIZ': CATEGORIA,
+    'PARAMETRO': CATEGORIA,
+    # Evaluaciones de causalidad y temprana
+    'ID_INFORME': CATEGORIA,
+    'NOMBRE_EVALUACION': CATEGORIA,
+    'ETAPA': CATEGORIA,
+    'COMPONENTE_AMBIENTAL': CATEGORIA,
+    'PROCEDENCIA_MUESTRA': CATEGORIA,
+    'PROCEDENCIA_ESPECIFICA_MUESTRA': CATEGORIA,
+    'NOMBRE_PUNTO': CATEGORIA,
+    'FECHA_MUESTRA': CATEGORIA,
+    'HORA_MUESTRA': CATEGORIA,
+    'ESTE': NUMERO,
+    'NORTE': NUMERO,
+    'ALTITUD': NUMERO,
+    'ZONA': CATEGORIA,
+    'DATUM': CATEGORIA,
+    'DESCRIPCION_UBICACION': CATEGORIA,
+    'TIPO_MUESTRA': CATEGORIA,
+    'Fecha_corte': CATEGORIA,
+    # Derivadas al leer
+    'departamento': CATEGORIA,
+    'provincia': CATEGORIA,
+    'distrito': CATEGORIA,
+    'latitud': NUMERO,
+    'longitud': NUMERO,
+}
+
+# Coordenadas UTM (este, norte, zona): evaluaciones e INAF las nombran distinto
+COLUMNAS_UTM = [('ESTE', 'NORTE', 'ZONA'), ('COORD_ESTE', 'COORD_NORTE', 'TXZONA')]
+
+# Columnas de resultado por familia de ensayo (nombres tal cual en los CSV).
+# Cada fila trae su valor medido en una sola de ellas; las demás vienen vacías.
+COLUMNAS_VALOR_OEFA = [
+    # Agua residual, subterránea y superficial
+    'RS', 'OTROS', 'BTEX', 'Hidrocarburos.Aromáticos.Policíclicos.PAH', 'Metales.Disueltos',
+    'Metales.Disueltos.por.ICP.MS.incluido.Hg', 'Metales.Totales', 'Metales.Totales.por.ICP.MS.incluido.Hg',
+    # Suelo y sedimento
+    'ABA', 'Aniones', 'Análisis.granulométrico', 'BTEX..Benceno..Tolueno..Etilbenceno..Xilenos.',
+    'Metales.Totales.y.Mercurio', 'PAHs', 'Shake.Flash.en.aniones..mg.L.',
+    'Shake.Flask.en.metales..mg.L..o.Shake.Flask.Test..Solubity.Testing..SFT.',
+    # Evaluaciones de causalidad y temprana
+    'Físico.Químicos', 'Ensayo', 'Hidrocarburos.Aromáticos.Policíclicos..HAP.s.', 'Metales.totales',
+    'Parámetros.analíticos', 'Hidrocarburos.Totales.del.Petróleo...Fracción.Aromática',
+    'Parámetros.Inorgánicos', 'Hidrocarburos.Totales.de.Petróleo', 'Resultados.in.situ', 'Resultado.in.situ',
+    'Metales.disuelto', 'Metales.disueltos', 'Alcanilidad', 'Metales...Especiación', 'Ensayos.microbiológicos',
+    'Ensayos.Microbiológicos', 'Parámetros.Orgánicos', 'Ensayo.por.cromatografía...HTP',
+    'Ensayo.por.cromatografía...PAHS', 'Aniones.por.Cromatografía.Iónica', 'PCB..Policloruros.Bifenilos.',
+    'Ensayos.Tercerizados', 'Ensayos.por.Cromatografía...Pesticidas.Organofosforados',
+    'Ensayos.por.Cromatografía', 'Ensayos.por.Cromatografía...Bifenilos.Policlorados..Pcbs.',
+    'Ensayos.por.Cromatografía...Pesticidas.Organoclorados', 'Formas.Nitrogenadas.Fosforadas',
+    'Pesticidas.organoclorados', 'Pesticidas.Organofosforados', 'Plaguicidas.Carbamatos',
+]
+COLUMNAS_SIGNO = ['SIGNO_PARAMETRO', 'SIGNO']  # '<': por debajo del límite de detección
+COLUMNAS_UNIDAD = ['UNIDAD_MEDIDA_PARAMETRO', 'UNIDAD_MEDIDA']
+
+ESQUEMA_OEFA.update({col: NUMERO for col in COLUMNAS_VALOR_OEFA})
+ESQUEMA_OEFA.update({col: CATEGORIA for col in COLUMNAS_SIGNO + COLUMNAS_UNIDAD})
+
+
+def valores_medidos(df):
+    """
+    Valor medido de cada fila, desde la columna de familia que lo trae
+
+    Returns:
+        (valores, familias): arreglo float (NaN si la fila no tiene
+        resultado numérico) y nombre de la columna de origen (None si no hay)
+    """
+    valores = np.full(len(df), np.nan)
+    familias = np.full(len(df), None, dtype=object)
+    for col in COLUMNAS_VALOR_OEFA:
+        if col not in df.columns:
+            continue
+        datos = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+        nuevos = np.isnan(valores) & ~np.isnan(datos)
+        valores[nuevos] = datos[nuevos]
+        familias[nuevos] = col
+    return valores, familias
+
+
+def texto_coalescido(df, columnas):
+    """Primer valor no vacío de cada fila entre columnas equivalentes de distintos archivos ('' si no hay)"""
+    resultado = pd.Series("", index=df.index, dtype=object)
+    for col in reversed([c for c in columnas if c in df.columns]):
+        valores = df[col].astype(object)
+        presentes = valores.notna() & (valores.astype(str).str.strip() != "")
+        resultado = resultado.where(~presentes, valores.astype(str).str.strip())
+    return resultado.to_numpy(dtype=object)
+
+
+def dividir_txubigeo(valores):
+    """
+    Departamento, provincia y distrito del texto de TXUBIGEO
+
+    TXUBIGEO trae 'DEPARTAMENTO, PROVINCIA, DISTRITO' y, si la unidad
+    fiscalizada abarca varios distritos, varios ubigeos separados por ' / ';
+    se toma el primero. Se interpreta una vez por valor distinto.
+
+    Returns:
+        Tres arreglos object ('' donde falta el dato)
+    """
+    categorias = pd.Categorical(pd.Series(valores).astype(object))
+    primeros = pd.Series(categorias.categories.astype(str)).str.split(' / ', n=1).str[0]
+    partes = primeros.str.split(',', n=2, expand=True).reindex(columns=range(3))
+    niveles = []
+    for k in range(3):
+        nombres = partes[k].astype(object).fillna("").astype(str).str.strip().to_numpy(dtype=object)
+        nivel = np.full(len(categorias), "", dtype=object)
+        conocidos = categorias.codes >= 0
+        nivel[conocidos] = nombres[categorias.codes[conocidos]]
+        niveles.append(nivel)
+    return tuple(niveles)
+
+
+def contar_filas(ruta, tamano_lectura=1 << 20):
+    """Cota superior de filas de datos de un CSV (líneas menos el encabezado)"""
+    lineas = 0
+    with open(ruta, 'rb') as f:
+        while True:
+            datos = f.read(tamano_lectura)
+            if not datos:
+                break
+            lineas += datos.count(b'\n')
+            ultimo = datos[-1:]
+    if lineas and ultimo != b'\n':
+        lineas += 1  # Última línea sin salto final
+    return max(lineas - 1, 0)
+
+
+class BuferColumnar:
+    """Columnas preasignadas que se llenan bloque a bloque"""
+
+    def __init__(self, capacidad, esquema):
+        self.capacidad = capacidad
+        self.esquema = dict(esquema)  # Las columnas no declaradas se agregan como TEXTO
+        self.filas = 0
+        self.columnas = {}  # nombre -> arreglo preasignado
+        self.categorias = {}  # nombre -> {valor: código}
+
+    def _columna(self, nombre):
+        if nombre not in self.columnas:
+            clase = self.esquema[nombre]
+            if clase in (NUMERO, ENTERO):
+                self.columnas[nombre] = np.full(self.capacidad, np.nan)
+            elif clase == CATEGORIA:
+                self.columnas[nombre] = np.full(self.capacidad, -1, dtype=np.int32)
+                self.categorias[nombre] = {}
+            else:
+                self.columnas[nombre] = np.full(self.capacidad, None, dtype=object)
+        return self.columnas[nombre]
+
+    def _codigos(self, nombre, valores):
+        """Códigos globales de una columna categórica para los valores del bloque"""
+        locales = pd.Categorical(valores)
+        diccionario = self.categorias[nombre]
+        mapeo = np.array([diccionario.setdefault(v, len(diccionario)) for v in locales.categories],
+                         dtype=np.int32)
+        if len(mapeo) == 0:
+            return np.full(len(valores), -1, dtype=np.int32)
+        return np.where(locales.codes >= 0, mapeo[locales.codes], -1)
+
+    def agregar(self, bloque, constantes=None):
+        """Copiar las filas de un bloque (y columnas constantes {nombre: valor})"""
+        n = len(bloque)
+        if self.filas + n > self.capacidad:
+            raise ValueError("Más filas que las estimadas para el búfer")
+        tramo = slice(self.filas, self.filas + n)
+
+        for col in bloque.columns:
+            self.esquema.setdefault(col, TEXTO)
+            destino = self._columna(col)
+            serie = bloque[col]
+            clase = self.esquema[col]
+            if clase in (NUMERO, ENTERO):
+                destino[tramo] = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=np.float64)
+            elif clase == CATEGORIA:
+                destino[tramo] = self._codigos(col, serie)
+            else:
+                destino[tramo] = serie.astype(object).where(serie.notna(), None).to_numpy()
+
+        for col, valor in (constantes or {}).items():
+            destino = self._columna(col)
+            if self.esquema[col] == CATEGORIA:
+                diccionario = self.categorias[col]
+                destino[tramo] = diccionario.setdefault(valor, len(diccionario))
+            else:
+                destino[tramo] = valor
+        self.filas += n
+
+    def a_dataframe(self):
+        """DataFrame con las filas escritas (sin copiar los búferes numéricos)"""
+        datos = {}
+        for col, arreglo in self.columnas.items():
+            valores = arreglo[:self.filas]
+            clase = self.esquema[col]
+            if clase == CATEGORIA:
+                datos[col] = pd.Categorical.from_codes(valores, categories=list(self.categorias[col]))
+            elif clase == ENTERO and not np.isnan(valores).any():
+                datos[col] = valores.astype(np.int64)
+            else:
+                datos[col] = valores
+        return pd.DataFrame(datos, copy=False)
+
+
+def reportar_progreso(archivo, leidas, estimadas):
+    porcentaje = 100 * leidas / estimadas if estimadas else 100
+    print(f"   ⏳ {archivo}: {leidas:,}/{estimadas:,} filas ({porcentaje:.0f}%)")
+
+
+def ingerir_oefa(data_path, archivos, convertir_utm, filas_por_bloque=FILAS_POR_BLOQUE,
+                 progreso=reportar_progreso):
+    """
+    Leer los CSV de OEFA por bloques y combinarlos en un solo DataFrame
+
+    Args:
+        data_path (Path): Carpeta DATAFINAL
+        archivos (list): CSV de OEFA
+        convertir_utm (callable): (este, norte, zona) -> (lats, lngs, errores)
+        filas_por_bloque (int): Filas por bloque de lectura
+        progreso (callable): Recibe (archivo, filas_leidas, filas_estimadas) tras cada bloque
+
+    Returns:
+        DataFrame con latitud/longitud válidas y columna tipo_oefa
+    """
+    esquema = {**ESQUEMA_OEFA, 'tipo_oefa': CATEGORIA}
+    rutas = [(archivo, data_path / archivo) for archivo in archivos if (data_path / archivo).exists()]
+    estimadas = {archivo: contar_filas(ruta) for archivo, ruta in rutas}
+    bufer = BuferColumnar(sum(estimadas.values()), esquema)
+    dtypes = {col: str for col, clase in ESQUEMA_OEFA.items() if clase in (TEXTO, CATEGORIA)}
+
+    for archivo, ruta in rutas:
+        inicio_archivo = bufer.filas
+        try:
+            print(f"🔄 Procesando {archivo} por bloques ({estimadas[archivo]:,} filas estimadas)...")
+            tipo_oefa = archivo.replace('.csv', '').replace('oefa_', '')
+            leidas = validas = errores = 0
+            bloques = pd.read_csv(ruta, dtype=dtypes, chunksize=filas_por_bloque)
+            for bloque in bloques:
+                leidas += len(bloque)
+                utm = next((cols for cols in COLUMNAS_UTM if set(cols) <= set(bloque.columns)), None)
+                if utm is not None:
+                    lats, lngs, fallidos = convertir_utm(*(bloque[col] for col in utm))
+                    bloque = bloque.assign(latitud=lats, longitud=lngs)
+                    errores += fallidos
+                elif not {'latitud', 'longitud'} <= set(bloque.columns):
+                    print(f"   ⚠️ No se encontraron coordenadas válidas en {archivo}")
+                    break
+                if 'TXUBIGEO' in bloque.columns and 'departamento' not in bloque.columns:
+                    niveles = dividir_txubigeo(bloque['TXUBIGEO'])
+                    bloque = bloque.assign(**{
+                        col: np.where(valores == "", None, valores)
+                        for col, valores in zip(('departamento', 'provincia', 'distrito'), niveles)
+                    })
+
+                bloque = bloque[bloque['latitud'].notna() & bloque['longitud'].notna()]
+                bufer.agregar(bloque, {'tipo_oefa': tipo_oefa})
+                validas += len(bloque)
+                if progreso:
+                    progreso(archivo, leidas, estimadas[archivo])
+
+            if errores:
+                print(f"   ⚠️ Errores de conversión: {errores}")
+            if validas:
+                print(f"   ✅ {archivo}: {validas:,} registros con coordenadas válidas")
+            else:
+                print(f"   ⚠️ {archivo}: Sin registros con coordenadas válidas")
+        except Exception as e:
+            bufer.filas = inicio_archivo  # Se descartan las filas parciales del archivo
+            print(f"❌ Error cargando {archivo}: {e}")
+
+    if bufer.filas == 0:
+        return pd.DataFrame()
+    df = bufer.a_dataframe()
+    print(f"✅ OEFA Total: {len(df):,} registros")
+    return df
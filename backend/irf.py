@@ -0,0 +1,432 @@
+"""
+Índice de Riesgo de Fiscalización (IRF) materializado por punto OEFA y por
+distrito.
+
+El IRF (0-100) combina cuatro componentes entre 0 y 1:
+
+- magnitud: exceso medio sobre el límite de las muestras que lo superan
+  (escala logarítmica, saturada en MAGNITUD_REFERENCIA veces el límite)
+- frecuencia: fracción de las muestras evaluadas que superan el límite
+- recencia: decaimiento exponencial desde la última excedencia
+- exposición: centros poblados, colegios y establecimientos de salud cerca
+
+El valor de cada muestra está en la columna de su familia de ensayo
+(ingesta.valores_medidos). Los CSV no traen el ECA/LMP aplicable: los límites
+se leen de la tabla LIMITES_ARCHIVO en DATAFINAL (columnas PARAMETRO y
+LIMITE, y opcionalmente UNIDAD y tipo_oefa para límites por unidad o por
+archivo). Una muestra se evalúa solo si su PARAMETRO tiene límite, y las
+reportadas bajo el límite de detección ('<') nunca exceden. Las ubicaciones
+y distritos sin muestras evaluadas (todas, si falta la tabla) no tienen
+magnitud, frecuencia ni recencia: su IRF se calcula solo con la exposición,
+con los pesos renormalizados, y quedan con excedencias_evaluadas = False.
+
+Cada archivo OEFA aporta agregados parciales (muestras, evaluadas,
+excedencias, suma de excesos, última excedencia) por ubicación y por
+distrito, que se guardan en DATAFINAL/snapshot/irf/parciales/ con la huella
+del CSV tomada al leerlo y la de la tabla de límites. Al cambiar un solo
+archivo se recalcula solo su parcial; la combinación final es barata. Para
+materializar la tabla fuera de la API:
+
+    cd backend
+    python irf.py
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indice_temporal import SIN_FECHA, dias_epoch
+from ingesta import COLUMNAS_SIGNO, COLUMNAS_UNIDAD, dividir_txubigeo, texto_coalescido, valores_medidos
+from snapshot import SNAPSHOT_DIR, huella_fuentes
+from ubicaciones import normalizar_texto
+
+IRF_DIR = "irf"
+LIMITES_ARCHIVO = os.getenv("IRF_LIMITES", "limites_eca.csv")  # En DATAFINAL
+PESOS_IRF = {'magnitud': 0.4, 'frecuencia': 0.2, 'recencia': 0.2, 'exposicion': 0.2}
+MAGNITUD_REFERENCIA = 10.0  # Exceso (veces el límite) que satura la magnitud
+VIDA_MEDIA_RECENCIA_DIAS = 730
+EXPOSICION_REFERENCIA = 50  # Puntos expuestos que saturan la exposición
+CATEGORIAS_IRF = [(25, 'BAJO'), (50, 'MEDIO'), (75, 'ALTO'), (100, 'CRÍTICO')]
+
+SUMAS = ['muestras', 'evaluadas', 'excedencias', 'suma_exceso']
+COMPONENTES_EXCEDENCIA = ['magnitud', 'frecuencia', 'recencia']
+
+
+def directorio_irf(data_path):
+    return Path(data_path) / SNAPSHOT_DIR / IRF_DIR
+
+
+def leer_limites(data_path):
+    """
+    Tabla de límites ECA/LMP por parámetro
+
+    Returns:
+        {(tipo_oefa, PARAMETRO, UNIDAD): límite} con textos normalizados ('' =
+        cualquiera), o None si la tabla no existe
+    """
+    ruta = Path(data_path) / LIMITES_ARCHIVO
+    if not ruta.exists():
+        return None
+    tabla = pd.read_csv(ruta, dtype=str)
+    limites = {}
+    for fila in tabla.to_dict('records'):
+        limite = pd.to_numeric(fila.get('LIMITE'), errors='coerce')
+        if pd.isna(limite) or limite <= 0 or pd.isna(fila.get('PARAMETRO')):
+            continue
+        clave = tuple(
+            normalizar_texto(fila[col]) if pd.notna(fila.get(col)) else ""
+            for col in ('tipo_oefa', 'PARAMETRO', 'UNIDAD')
+        )
+        limites[clave] = float(limite)
+    return limites
+
+
+def limites_filas(df, limites):
+    """Límite aplicable a cada fila (NaN si su parámetro no tiene límite)"""
+    if not limites or 'PARAMETRO' not in df.columns:
+        return np.full(len(df), np.nan)
+    tipos = df['tipo_oefa'].astype(object) if 'tipo_oefa' in df.columns else pd.Series("", index=df.index)
+    claves = pd.DataFrame({
+        'tipo': tipos.fillna("").astype(str).to_numpy(),
+        'parametro': df['PARAMETRO'].astype(object).fillna("").astype(str).to_numpy(),
+        'unidad': texto_coalescido(df, COLUMNAS_UNIDAD),
+    })
+    # Pocas combinaciones distintas: se resuelven una vez y se expanden
+    codigos, unicas = pd.MultiIndex.from_frame(claves).factorize()
+    resueltos = np.full(len(unicas), np.nan)
+    for k, (tipo, parametro, unidad) in enumerate(unicas):
+        tipo, parametro, unidad = normalizar_texto(tipo), normalizar_texto(parametro), normalizar_texto(unidad)
+        for clave in ((tipo, parametro, unidad), (tipo, parametro, ""), ("", parametro, unidad), ("", parametro, "")):
+            if clave in limites:
+                resueltos[k] = limites[clave]
+                break
+    return resueltos[codigos]
+
+
+def excesos(df, limites):
+    """
+    Evaluación, excedencia y exceso relativo (valor / límite - 1) de cada muestra
+
+    Returns:
+        (evaluada, excede, exceso): arreglos bool, bool y float (0 donde no excede)
+    """
+    valores, _ = valores_medidos(df)
+    limite = limites_filas(df, limites)
+    bajo_deteccion = pd.Series(texto_coalescido(df, COLUMNAS_SIGNO)).str.startswith('<').to_numpy()
+    evaluada = ~np.isnan(valores) & ~np.isnan(limite)
+    excede = evaluada & ~bajo_deteccion & (valores > limite)
+    exceso = np.zeros(len(df))
+    exceso[excede] = valores[excede] / limite[excede] - 1
+    return evaluada, excede, exceso
+
+
+def dias_muestra(df):
+    """Fecha de cada muestra en días desde 1970 (NaN si no se conoce)"""
+    dias = dias_epoch(df)
+    if dias is None:
+        return np.full(len(df), np.nan)
+    resultado = dias.astype(np.float64)
+    resultado[dias == SIN_FECHA] = np.nan
+    return resultado
+
+
+def ubicacion_filas(df):
+    """
+    Departamento, provincia y distrito de cada fila
+
+    Del texto de TXUBIGEO donde la fila lo trae; si no, de las columnas
+    departamento/provincia/distrito.
+    """
+    niveles = [
+        df[c].astype(object).fillna("").astype(str).to_numpy(dtype=object) if c in df.columns
+        else np.full(len(df), "", dtype=object)
+        for c in ('departamento', 'provincia', 'distrito')
+    ]
+    if 'TXUBIGEO' in df.columns:
+        desde_ubigeo = dividir_txubigeo(df['TXUBIGEO'].to_numpy(dtype=object))
+        con_ubigeo = desde_ubigeo[0] != ""
+        for nivel, valores in zip(niveles, desde_ubigeo):
+            nivel[con_ubigeo] = valores[con_ubigeo]
+    return niveles
+
+
+def clave_ubigeo(texto):
+    """Clave normalizada de distrito ('Loreto|Datem del Marañón|Andoas' -> 'LORETO|DATEM DEL MARANON|ANDOAS')"""
+    return "|".join(normalizar_texto(parte) for parte in str(texto).split("|"))
+
+
+def claves_distrito(df):
+    """Clave 'DEPARTAMENTO|PROVINCIA|DISTRITO' normalizada de cada fila ('' si no se conoce)"""
+    departamento, provincia, distrito = ubicacion_filas(df)
+    combinaciones = pd.Series(departamento + "|" + provincia + "|" + distrito)
+    codigos, unicas = pd.factorize(combinaciones)
+    # Sin provincia ni distrito (p. ej. un código de ubigeo de 6 dígitos) la clave es el primer nivel
+    claves = np.array([clave_ubigeo(u).rstrip("|") for u in unicas], dtype=object)
+    return claves[codigos]
+
+
+def parcial_archivo(df, limites):
+    """
+    Agregados de un archivo OEFA por ubicación y por distrito
+
+    Returns:
+        (por_ubicacion, por_distrito): DataFrames con muestras, evaluadas,
+        excedencias, suma_exceso y ultima_excedencia (días desde 1970)
+    """
+    evaluada, excede, exceso = excesos(df, limites)
+    dias = dias_muestra(df)
+    base = pd.DataFrame({
+        'latitud': df['latitud'].to_numpy(dtype=np.float64),
+        'longitud': df['longitud'].to_numpy(dtype=np.float64),
+        'ubigeo': claves_distrito(df),
+        'muestras': 1,
+        'evaluadas': evaluada.astype(np.int64),
+        'excedencias': excede.astype(np.int64),
+        'suma_exceso': exceso,
+        'ultima_excedencia': np.where(excede, dias, np.nan),
+    })
+    for col, valores in zip(('departamento', 'provincia', 'distrito'), ubicacion_filas(df)):
+        base[col] = valores
+
+    agregaciones = {**{c: 'sum' for c in SUMAS}, 'ultima_excedencia': 'max'}
+    por_ubicacion = base.groupby(['latitud', 'longitud'], sort=False).agg(agregaciones).reset_index()
+    por_distrito = base.groupby('ubigeo', sort=False).agg(
+        {**agregaciones, 'departamento': 'first', 'provincia': 'first', 'distrito': 'first'}
+    ).reset_index()
+    return por_ubicacion, por_distrito
+
+
+class ParcialesIRF:
+    """Parciales por archivo OEFA, persistidos y recalculados solo si cambia el CSV o la tabla de límites"""
+
+    def __init__(self, data_path):
+        self.data_path = Path(data_path)
+        self.directorio = directorio_irf(data_path) / "parciales"
+        self.parciales = {}  # archivo -> (huella, por_ubicacion, por_distrito)
+        self.limites = None  # Tabla de límites vigente (None si no existe)
+        self.huella_limites = None
+
+    def _actualizar_limites(self):
+        huella = huella_fuentes(self.data_path, [LIMITES_ARCHIVO])
+        if huella == self.huella_limites:
+            return
+        self.limites = leer_limites(self.data_path)
+        self.huella_limites = huella
+        if self.limites is None:
+            print(f"⚠️ IRF sin tabla de límites ECA/LMP ({self.data_path / LIMITES_ARCHIVO}): "
+                  f"no se evalúan excedencias, el índice usa solo la exposición")
+        else:
+            print(f"📏 IRF: {len(self.limites):,} límites ECA/LMP desde {LIMITES_ARCHIVO}")
+
+    def _leer(self, archivo, huella):
+        meta = self.directorio / f"{archivo}.json"
+        if not meta.exists() or json.loads(meta.read_text()) != {'huella': huella, 'limites': self.huella_limites}:
+            return None
+        try:
+            return (pd.read_parquet(self.directorio / f"{archivo}.ubicacion.parquet"),
+                    pd.read_parquet(self.directorio / f"{archivo}.distrito.parquet"))
+        except Exception as e:
+            print(f"⚠️ Parcial IRF de {archivo} ilegible, se recalcula: {e}")
+            return None
+
+    def _guardar(self, archivo, huella, por_ubicacion, por_distrito):
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            por_ubicacion.to_parquet(self.directorio / f"{archivo}.ubicacion.parquet", index=False)
+            por_distrito.to_parquet(self.directorio / f"{archivo}.distrito.parquet", index=False)
+            meta = {'huella': huella, 'limites': self.huella_limites}
+            (self.directorio / f"{archivo}.json").write_text(json.dumps(meta))
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el parcial IRF de {archivo}: {e}")
+
+    def actualizar(self, df_oefa, huellas):
+        """
+        Recalcular los parciales de los archivos cuyo CSV cambió
+
+        Args:
+            df_oefa (DataFrame): Dataset OEFA combinado (con tipo_oefa)
+            huellas (dict): {archivo: huella} de los CSV que se leyeron para
+                armar df_oefa, tomadas antes de leerlos (los archivos que no
+                existían no aparecen)
+
+        Returns:
+            Lista de archivos recalculados
+        """
+        self._actualizar_limites()
+        recalculados = []
+        tipos_fila = df_oefa['tipo_oefa'].astype(str) if 'tipo_oefa' in df_oefa.columns else None
+        for archivo, huella in huellas.items():
+            clave = (huella, self.huella_limites)
+            actual = self.parciales.get(archivo)
+            if actual is not None and actual[0] == clave:
+                continue
+            guardado = self._leer(archivo, huella)
+            if guardado is None:
+                tipo_oefa = archivo.replace('.csv', '').replace('oefa_', '')
+                filas = df_oefa[tipos_fila == tipo_oefa] if tipos_fila is not None else df_oefa.iloc[:0]
+                guardado = parcial_archivo(filas, self.limites)
+                self._guardar(archivo, huella, *guardado)
+                recalculados.append(archivo)
+            self.parciales[archivo] = (clave, *guardado)
+
+        for archivo in set(self.parciales) - set(huellas):
+            del self.parciales[archivo]
+        return recalculados
+
+    def combinados(self):
+        """Parciales de todos los archivos sumados por ubicación y por distrito"""
+        agregaciones = {**{c: 'sum' for c in SUMAS}, 'ultima_excedencia': 'max'}
+        ubicaciones = pd.concat([p[1] for p in self.parciales.values()], ignore_index=True)
+        distritos = pd.concat([p[2] for p in self.parciales.values()], ignore_index=True)
+        por_ubicacion = ubicaciones.groupby(['latitud', 'longitud']).agg(agregaciones).reset_index()
+        por_distrito = distritos.groupby('ubigeo').agg(
+            {**agregaciones, 'departamento': 'first', 'provincia': 'first', 'distrito': 'first'}
+        ).reset_index()
+        return por_ubicacion, por_distrito
+
+
+def _saturar(valores, referencia):
+    return np.minimum(np.log1p(valores) / np.log1p(referencia), 1.0)
+
+
+def puntuar(tabla, hoy_dias):
+    """
+    Agregar los componentes, el IRF y su categoría a una tabla de agregados
+
+    Sin muestras evaluadas contra un límite, magnitud, frecuencia y recencia
+    quedan en None y el IRF se calcula con los componentes disponibles.
+    """
+    evaluadas = tabla['evaluadas'].to_numpy(dtype=np.float64)
+    excedencias = tabla['excedencias'].to_numpy(dtype=np.float64)
+    exceso_medio = np.divide(tabla['suma_exceso'].to_numpy(dtype=np.float64), excedencias,
+                             out=np.zeros(len(tabla)), where=excedencias > 0)
+    antiguedad = hoy_dias - tabla['ultima_excedencia'].to_numpy(dtype=np.float64)
+    evaluada = evaluadas > 0
+
+    componentes = {
+        'magnitud': _saturar(exceso_medio, MAGNITUD_REFERENCIA),
+        'frecuencia': np.divide(excedencias, evaluadas, out=np.zeros(len(tabla)), where=evaluada),
+        'recencia': np.nan_to_num(0.5 ** (np.maximum(antiguedad, 0) / VIDA_MEDIA_RECENCIA_DIAS)),
+        'exposicion': _saturar(tabla['expuestos'].to_numpy(dtype=np.float64), EXPOSICION_REFERENCIA),
+    }
+    for nombre in COMPONENTES_EXCEDENCIA:
+        componentes[nombre] = np.where(evaluada, componentes[nombre], np.nan)
+
+    # Pesos renormalizados sobre los componentes disponibles en cada fila
+    suma = sum(PESOS_IRF[nombre] * np.nan_to_num(valores) for nombre, valores in componentes.items())
+    pesos = sum(PESOS_IRF[nombre] * ~np.isnan(valores) for nombre, valores in componentes.items())
+    irf = suma / pesos * 100
+    for nombre, valores in componentes.items():
+        redondeados = pd.Series(np.round(valores, 4), index=tabla.index)
+        tabla[nombre] = redondeados.astype(object).where(redondeados.notna(), None)
+    tabla['excedencias_evaluadas'] = evaluada
+    tabla['irf'] = np.round(irf, 2)
+    ultima = pd.to_datetime(tabla['ultima_excedencia'], unit='D').dt.strftime('%Y-%m-%d')
+    tabla['ultima_excedencia'] = ultima.astype(object).where(ultima.notna(), None)
+    tabla['categoria'] = pd.cut(tabla['irf'], bins=[-1] + [b for b, _ in CATEGORIAS_IRF],
+                                labels=[c for _, c in CATEGORIAS_IRF]).astype(str)
+    return tabla.sort_values('irf', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def clave_punto(lat, lng):
+    return f"{lat:.6f},{lng:.6f}"
+
+
+class TablaIRF:
+    """IRF materializado con índices para consultas O(1)"""
+
+    def __init__(self, puntos, distritos, calculado):
+        self.puntos = puntos
+        self.distritos = distritos
+        self.calculado = calculado
+        self._indice_puntos = {
+            clave_punto(lat, lng): i
+            for i, (lat, lng) in enumerate(zip(puntos['latitud'].tolist(), puntos['longitud'].tolist()))
+        }
+        self._indice_distritos = {u: i for i, u in enumerate(distritos['ubigeo'].tolist())}
+        self._registros_puntos = puntos.to_dict('records')
+        self._registros_distritos = distritos.to_dict('records')
+
+    def punto(self, lat, lng):
+        i = self._indice_puntos.get(clave_punto(lat, lng))
+        return None if i is None else {**self._registros_puntos[i], 'ranking': i + 1}
+
+    def distrito(self, ubigeo):
+        i = self._indice_distritos.get(clave_ubigeo(ubigeo))
+        return None if i is None else {**self._registros_distritos[i], 'ranking': i + 1}
+
+    def ranking(self, nivel, offset=0, limit=100):
+        registros = self._registros_puntos if nivel == 'puntos' else self._registros_distritos
+        return registros[offset:offset + limit]
+
+    def guardar(self, data_path):
+        directorio = directorio_irf(data_path)
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.puntos.to_parquet(directorio / "puntos.parquet", index=False)
+        self.distritos.to_parquet(directorio / "distritos.parquet", index=False)
+        (directorio / "irf.json").write_text(json.dumps({'calculado': self.calculado}))
+
+
+def materializar_irf(parciales, df_oefa, huellas, puntos_muestreo, exposiciones):
+    """
+    Recalcular los parciales cambiados y armar la tabla IRF
+
+    Args:
+        parciales (ParcialesIRF): Parciales persistidos por archivo
+        df_oefa (DataFrame): Dataset OEFA combinado (con tipo_oefa)
+        huellas (dict): {archivo: huella} de los CSV leídos, tomadas antes de leerlos
+        puntos_muestreo (PuntosMuestreo): Ubicaciones únicas de muestreo
+        exposiciones (dict): {tipo: Exposicion} alrededor de esas ubicaciones
+
+    Returns:
+        (TablaIRF, archivos recalculados)
+    """
+    recalculados = parciales.actualizar(df_oefa, huellas)
+    por_ubicacion, por_distrito = parciales.combinados()
+
+    # Exposición por ubicación y, sin contar dos veces, por distrito
+    ubigeo_ubicacion = claves_distrito(df_oefa.iloc[puntos_muestreo.primeras])
+    distritos_codigos, ubicacion_distrito = np.unique(ubigeo_ubicacion.astype(str), return_inverse=True)
+    expuestos = np.zeros(puntos_muestreo.total, dtype=np.int64)
+    expuestos_distrito = np.zeros(len(distritos_codigos), dtype=np.int64)
+    for tipo, exposicion in exposiciones.items():
+        conteos = exposicion.conteos
+        expuestos += conteos
+        fuentes = np.repeat(np.arange(puntos_muestreo.total), conteos)
+        pares = np.unique(np.column_stack((ubicacion_distrito[fuentes], exposicion.posiciones)), axis=0)
+        expuestos_distrito += np.bincount(pares[:, 0], minlength=len(distritos_codigos)) if len(pares) else 0
+
+    exposicion_ubicacion = pd.DataFrame({
+        'latitud': puntos_muestreo.lats, 'longitud': puntos_muestreo.lngs, 'expuestos': expuestos,
+        'ubigeo': ubigeo_ubicacion,
+    })
+    puntos = por_ubicacion.merge(exposicion_ubicacion, on=['latitud', 'longitud'], how='left')
+    puntos['expuestos'] = puntos['expuestos'].fillna(0).astype(np.int64)
+    distritos = por_distrito.merge(
+        pd.DataFrame({'ubigeo': distritos_codigos, 'expuestos': expuestos_distrito}), on='ubigeo', how='left'
+    )
+    distritos['expuestos'] = distritos['expuestos'].fillna(0).astype(np.int64)
+
+    hoy = float(np.datetime64('today', 'D').astype(np.int64))
+    tabla = TablaIRF(puntuar(puntos, hoy), puntuar(distritos, hoy), time.strftime('%Y-%m-%dT%H:%M:%S'))
+    return tabla, recalculados
+
+
+def main():
+    # Importar aquí: main.py importa este módulo al cargar la API
+    import main as api
+
+    api.load_datasets()
+    inicio = time.perf_counter()
+    tabla, recalculados = api.calcular_irf(api.datasets_cache)
+    tabla.guardar(api.DATA_PATH)
+    print(f"🚨 IRF: {len(tabla.puntos):,} puntos y {len(tabla.distritos):,} distritos "
+          f"en {time.perf_counter() - inicio:.1f}s (parciales recalculados: {len(recalculados)})")
+
+
+if __name__ == "__main__":
+    main()
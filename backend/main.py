@@ -1,13 +1,44 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 import pandas as pd
 import numpy as np
 from math import radians, cos, sin, asin, sqrt
 import pyproj
 from pathlib import Path
+import hmac
 import os
+import threading
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from indice_espacial import IndiceEspacial
+from indice_temporal import IndiceTemporal, dia_de_fecha, dias_epoch, fecha_de_dia
+from cache_respuestas import CACHE_MAPA_PASO, CacheLRU, cuantizar
+from clusters import ZOOM_PUNTOS, IndiceClusters, agregar, combinar_clusters
+from teselas import CacheTeselas, generar_tesela, tesela_valida
+from exposicion import RADIO_EXPOSICION_KM, TIPOS_EXPUESTOS, PuntosMuestreo, calcular_exposicion
+from ingesta import ingerir_oefa
+from irf import ParcialesIRF, leer_limites, materializar_irf
+from series import DIMENSIONES, PERIODOS, CuboSeries
+from ubicaciones import IndiceUbicaciones, normalizar_texto
+from busqueda import NOMBRES_COINCIDENCIA, TIPOS_BUSCABLES, IndiceNombres
+from recarga import VigilanteFuentes
+from metricas import Indicador, MiddlewareMetricas, etapa, registro
+from reportes_ia import (
+    SinMediciones, cache_reportes, cerrar_cliente_reportes, cliente_reportes, datos_reporte, eventos_reporte,
+    metricas_reportes
+)
+from catalogo import catalogo_dataset, combinar_catalogos, no_modificado_desde
+from serializacion import COLUMNAS_POR_TIPO, columna_str, columnas_punto, serializar_puntos
+from snapshot import cargar_snapshot, huella_fuentes, huellas_archivos, snapshot_vigente, tipar_columnas
+from memoria_compartida import (
+    MMAP_HABILITADO, adjuntar_mmap, bloqueo_exportacion, exportar_mmap, memoria_dataset, mmap_vigente
+)
 
 # Configuración de la app
 app = FastAPI(
@@ -24,10 +55,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Tiempos por ruta y etapa en /metrics; ?profile=1 devuelve el desglose de la solicitud
+app.add_middleware(MiddlewareMetricas)
 
 # Cache global para datasets
-datasets_cache = {}
+datasets_cache = {}  # tipo -> DatasetCargado publicado (una recarga lo reemplaza entero)
 stats_cache = {}
+estado_datasets = {}  # tipo -> 'pendiente' | 'cargando' | 'listo' | 'error'
+recargas_en_curso = set()  # Tipos listos que se reconstruyen en segundo plano
+catalogo_cache = {}  # Catálogo combinado con su ETag/Last-Modified
+cache_mapa = CacheLRU()  # Respuestas serializadas de /api/mapa/puntos
+cache_exposicion = CacheLRU(tamano_maximo=32, ttl=None)  # Por (destino, radio, versiones)
+irf_cache = {}  # Tabla IRF materializada ('tabla')
 
 def haversine(lon1, lat1, lon2, lat2):
     """Calcular distancia en km entre dos puntos lat/lng"""
@@ -42,15 +81,44 @@ def haversine(lon1, lat1, lon2, lat2):
     r = 6371  # Radio de la Tierra en km
     return c * r
 
-def utm_to_latlon(este, norte, zona):
+@lru_cache(maxsize=None)
+def transformer_utm(zona, hemisferio="S"):
+    """Transformer UTM WGS84 -> lat/lon reutilizable por zona y hemisferio"""
+    # EPSG:326xx = UTM Norte, EPSG:327xx = UTM Sur (Perú está en el hemisferio sur)
+    prefijo = "326" if hemisferio == "N" else "327"
+    return pyproj.Transformer.from_crs(
+        f"EPSG:{prefijo}{int(zona):02d}",
+        "EPSG:4326",  # WGS84 lat/lon
+        always_xy=True
+    )
+
+def normalizar_zonas(zonas, hemisferio="S"):
+    """
+    Separar número de zona y hemisferio ('18', 18.0, '18S', '17 N')
+    
+    Returns:
+        (numeros, hemisferios): arreglo float de zonas (NaN si no es válida)
+        y arreglo de 'N'/'S'
+    """
+    zonas = pd.Series(zonas).reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(zonas):
+        numeros = zonas.to_numpy(dtype=np.float64)
+        hemisferios = np.full(len(zonas), hemisferio)
+    else:
+        # Pocas zonas distintas: se interpretan los valores únicos y se expanden
+        inversa, unicas = pd.factorize(zonas, use_na_sentinel=False)
+        partes = pd.Series(unicas.astype(str)).str.strip().str.upper().str.extract(r"^(\d+(?:\.0+)?)\s*([NS])?$")
+        numeros = pd.to_numeric(partes[0], errors="coerce").to_numpy(dtype=np.float64)[inversa]
+        hemisferios = partes[1].fillna(hemisferio).to_numpy(dtype=object)[inversa]
+    
+    numeros[(numeros < 1) | (numeros > 60)] = np.nan
+    return numeros, hemisferios
+
+def utm_to_latlon(este, norte, zona, hemisferio="S"):
     """Convertir coordenadas UTM a lat/lon usando método moderno"""
     try:
         # Método moderno de pyproj para evitar deprecation warning
-        transformer = pyproj.Transformer.from_crs(
-            f"EPSG:326{int(zona):02d}",  # UTM WGS84 Norte
-            "EPSG:4326",  # WGS84 lat/lon
-            always_xy=True
-        )
+        transformer = transformer_utm(int(zona), hemisferio)
         
         # Convertir (retorna lon, lat)
         lon, lat = transformer.transform(este, norte)
@@ -59,29 +127,152 @@ def utm_to_latlon(este, norte, zona):
         print(f"Error convirtiendo UTM: {e}")
         return None, None
 
-def load_datasets():
-    """Cargar y procesar todos los datasets"""
-    global datasets_cache, stats_cache
+def utm_a_latlon_lote(este, norte, zona, hemisferio="S"):
+    """
+    Convertir arreglos UTM a lat/lon agrupando por zona
     
-    if datasets_cache:  # Ya están cargados
-        return
+    Usa un transformer cacheado por zona/hemisferio y transforma todos los
+    puntos de cada grupo en una sola llamada.
     
-    data_path = Path(__file__).parent.parent / "DATAFINAL"
+    Returns:
+        (latitudes, longitudes, errores): arreglos float (NaN donde la
+        conversión falló) y número de registros no convertidos
+    """
+    este = pd.to_numeric(pd.Series(este), errors="coerce").to_numpy(dtype=np.float64)
+    norte = pd.to_numeric(pd.Series(norte), errors="coerce").to_numpy(dtype=np.float64)
+    numeros, hemisferios = normalizar_zonas(zona, hemisferio)
     
-    print("🔄 Cargando datasets...")
+    latitudes = np.full(len(este), np.nan)
+    longitudes = np.full(len(este), np.nan)
+    validos = np.isfinite(este) & np.isfinite(norte) & np.isfinite(numeros)
     
-    # 1. DATOS DE EDUCACIÓN
+    grupos = pd.DataFrame({"zona": numeros, "hemisferio": hemisferios})[validos]
+    for (zona_num, hem), filas in grupos.groupby(["zona", "hemisferio"]).indices.items():
+        posiciones = grupos.index.to_numpy()[filas]
+        try:
+            lon, lat = transformer_utm(int(zona_num), hem).transform(
+                este[posiciones], norte[posiciones]
+            )
+            latitudes[posiciones] = lat
+            longitudes[posiciones] = lon
+        except Exception as e:
+            print(f"Error convirtiendo UTM zona {int(zona_num)}{hem}: {e}")
+    
+    fallidos = ~(np.isfinite(latitudes) & np.isfinite(longitudes))
+    latitudes[fallidos] = np.nan
+    longitudes[fallidos] = np.nan
+    return latitudes, longitudes, int(fallidos.sum())
+
+DATA_PATH = Path(__file__).parent.parent / "DATAFINAL"
+
+OEFA_FILES = [
+    "oefa_agua_residual_efluentes.csv",
+    "oefa_agua_subterranea.csv", 
+    "oefa_agua_superficial.csv",
+    "oefa_evaluacion_causalidad.csv",
+    "oefa_evaluacion_temprana.csv",
+    "oefa_suelo_sedimento.csv"
+]
+
+# Archivos de origen de cada tipo (para validar el snapshot)
+FUENTES_DATASETS = {
+    'educacion': ["educacion_procesado.csv"],
+    'salud': ["salud_procesado.csv"],
+    'poblacion': ["poblacion_procesado.csv"],
+    'oefa': OEFA_FILES,
+}
+
+cache_teselas = CacheTeselas(DATA_PATH)  # Teselas MVT ya codificadas, en disco
+parciales_irf = ParcialesIRF(DATA_PATH)  # Agregados IRF por archivo OEFA
+
+class DatasetCargado:
+    """
+    Versión publicada de un tipo: el DataFrame y todas sus estructuras derivadas
+    
+    Se arma completa antes de publicarse y no se modifica después. Una
+    recarga publica otra instancia (copy-on-write), así una consulta que ya
+    tomó esta versión la usa entera aunque la recarga termine en el medio.
+    """
+    
+    def __init__(self, tipo, df, indice, ids, clusters, catalogo, huella, version, dias=None, series=None,
+                 ubicaciones=None, nombres=None, huellas=None):
+        self.tipo = tipo
+        self.df = df
+        self.indice = indice  # Índice espacial (None si el dataset está vacío)
+        self.dias = dias  # Día de muestreo por fila, int64 desde 1970 (None si no tiene fechas)
+        self.temporal = IndiceTemporal(dias) if dias is not None else None
+        self.series = series  # Cubos de series de tiempo (solo tipos con fechas)
+        self.ubicaciones = ubicaciones  # Nombres de ubicación normalizados -> códigos por nivel
+        self.nombres = nombres  # Índice de búsqueda por nombre (typeahead)
+        self.ids = ids  # id (str) -> posición de fila
+        self.clusters = clusters  # Agregados por zoom precalculados
+        self.catalogo = catalogo  # Catálogo parcial de filtros
+        self.huella = huella  # Huella de los CSV de origen (carpeta de teselas en disco)
+        self.huellas = huellas or {}  # Huella de cada CSV leído, tomada antes de leerlo (parciales IRF)
+        self.version = version  # Se incrementa en cada recarga (claves de las caches)
+
+def construir_indice_espacial(tipo, df, dias=None):
+    """Construir el índice espacial de un dataset ya leído (ordenado por día dentro de cada celda)"""
+    if df.empty:
+        return None
+    indice = IndiceEspacial(df['latitud'].values, df['longitud'].values, dias=dias)
+    print(f"🗂️ Índice espacial {tipo}: {indice.filas}x{indice.columnas} celdas")
+    return indice
+
+def construir_indice_ids(tipo, df):
+    """Mapa id -> posición de fila para búsquedas O(1) de detalle"""
+    columna = COLUMNAS_POR_TIPO.get(tipo, {}).get('id', (None,))[0]
+    if df.empty or columna not in df.columns:
+        return {}
+    claves = columna_str(df, columna)
+    # Recorrido inverso: ante ids repetidos queda la primera fila, como iloc[0]
+    return dict(zip(reversed(claves), range(len(claves) - 1, -1, -1)))
+
+def construir_dataset(tipo, df, indice, huella, dias=None, huellas=None):
+    """Construir todas las estructuras derivadas de un dataset recién leído"""
+    if dias is None and not df.empty:
+        dias = dias_epoch(df)
+    # En modo compartido el índice ya viene mapeado (salvo exportaciones previas sin fechas)
+    if indice is None or (dias is not None and not indice.con_fechas):
+        indice = construir_indice_espacial(tipo, df, dias)
+    clusters = None if df.empty else IndiceClusters(df['latitud'].values, df['longitud'].values)
+    anterior = datasets_cache.get(tipo)
+    return DatasetCargado(
+        tipo, df, indice, construir_indice_ids(tipo, df), clusters, catalogo_dataset(df), huella,
+        version=anterior.version + 1 if anterior else 1, dias=dias,
+        series=CuboSeries(df, dias, leer_limites(DATA_PATH)) if dias is not None else None,
+        ubicaciones=IndiceUbicaciones(df),
+        nombres=IndiceNombres(tipo, df) if tipo in TIPOS_BUSCABLES else None, huellas=huellas
+    )
+
+def obtener_tesela(dataset, z, x, y):
+    """Tesela MVT de una versión de una capa, desde la cache en disco o generada y guardada"""
+    contenido = cache_teselas.obtener(dataset.tipo, dataset.huella, z, x, y)
+    if contenido is None:
+        contenido = generar_tesela(dataset.tipo, dataset.df, dataset.indice, z, x, y)
+        cache_teselas.guardar(dataset.tipo, dataset.huella, z, x, y, contenido)
+    return contenido
+
+def actualizar_catalogo():
+    """Combinar los catálogos parciales (solo cambia cuando se recarga un tipo)"""
+    catalogos = {tipo: dataset.catalogo for tipo, dataset in datasets_cache.items()}
+    # Mismas claves en cada versión: update no deja el catálogo vacío a medias
+    catalogo_cache.update(combinar_catalogos(catalogos, list(CARGADORES)))
+
+def cargar_educacion(data_path):
+    """Cargar centros educativos"""
     try:
         df_edu = pd.read_csv(data_path / "educacion_procesado.csv")
         # Ya tiene latitud, longitud
         df_edu = df_edu.dropna(subset=['latitud', 'longitud'])
-        datasets_cache['educacion'] = df_edu
         print(f"✅ Educación: {len(df_edu):,} registros")
+        return df_edu
     except Exception as e:
         print(f"❌ Error cargando educación: {e}")
-        datasets_cache['educacion'] = pd.DataFrame()
-    
-    # 2. DATOS DE SALUD  
+        return pd.DataFrame()
+
+def cargar_salud(data_path):
+    """Cargar establecimientos de salud"""
     try:
         df_salud = pd.read_csv(data_path / "salud_procesado.csv")
         print(f"📋 Salud columnas: {list(df_salud.columns)}")
@@ -97,13 +288,14 @@ def load_datasets():
             df_salud = df_salud.drop(['lat_temp', 'lng_temp'], axis=1)
             
         df_salud = df_salud.dropna(subset=['latitud', 'longitud'])
-        datasets_cache['salud'] = df_salud
         print(f"✅ Salud: {len(df_salud):,} registros (coordenadas corregidas)")
+        return df_salud
     except Exception as e:
         print(f"❌ Error cargando salud: {e}")
-        datasets_cache['salud'] = pd.DataFrame()
-    
-        # 3. DATOS DE POBLACIÓN (CENTROS POBLADOS)
+        return pd.DataFrame()
+
+def cargar_poblacion(data_path):
+    """Cargar centros poblados"""
     try:
         df_poblacion = pd.read_csv(data_path / "poblacion_procesado.csv")
         print(f"📋 Población columnas: {list(df_poblacion.columns)}")
@@ -111,111 +303,266 @@ def load_datasets():
         # El dataset tiene longitud, latitud (en ese orden)
         if 'longitud' in df_poblacion.columns and 'latitud' in df_poblacion.columns:
             df_poblacion = df_poblacion.dropna(subset=['longitud', 'latitud'])
-            datasets_cache['poblacion'] = df_poblacion
             print(f"✅ Población: {len(df_poblacion):,} registros")
+            return df_poblacion
         else:
             print(f"⚠️ Población: No se encontraron columnas longitud/latitud")
-            datasets_cache['poblacion'] = pd.DataFrame()
+            return pd.DataFrame()
     except Exception as e:
         print(f"❌ Error cargando población: {e}")
-        datasets_cache['poblacion'] = pd.DataFrame()
-    
-    # 4. DATOS OEFA - Cargar todos los tipos
-    oefa_files = [
-        "oefa_agua_residual_efluentes.csv",
-        "oefa_agua_subterranea.csv", 
-        "oefa_agua_superficial.csv",
-        "oefa_evaluacion_causalidad.csv",
-        "oefa_evaluacion_temprana.csv",
-        "oefa_suelo_sedimento.csv"
-    ]
-    
-    oefa_combined = []
+        return pd.DataFrame()
+
+def cargar_oefa(data_path):
+    """Cargar y combinar los seis datasets OEFA (por bloques, con memoria acotada)"""
+    return ingerir_oefa(data_path, OEFA_FILES, utm_a_latlon_lote)
+
+CARGADORES = {
+    'educacion': cargar_educacion,
+    'salud': cargar_salud,
+    'poblacion': cargar_poblacion,
+    'oefa': cargar_oefa,
+}
+
+def procesar_dataset(tipo, data_path=DATA_PATH):
+    """Ejecutar el pipeline completo (CSV -> DataFrame tipado) de un tipo"""
+    return tipar_columnas(CARGADORES[tipo](data_path))
+
+def leer_dataset(tipo, data_path=DATA_PATH, huella=None):
+    """
+    Leer un tipo desde su snapshot si está vigente, si no desde los CSV
     
-    for file in oefa_files:
+    Args:
+        huella (str): Huella de los CSV con que se publicará el resultado; el
+            snapshot solo sirve si se guardó con ella (por defecto la actual)
+    """
+    if snapshot_vigente(data_path, tipo, FUENTES_DATASETS[tipo], huella):
         try:
-            file_path = data_path / file
-            if file_path.exists():
-                print(f"🔄 Procesando {file}...")
-                df = pd.read_csv(file_path)
-                
-                # Procesar coordenadas UTM a lat/lon
-                if 'ESTE' in df.columns and 'NORTE' in df.columns and 'ZONA' in df.columns:
-                    print(f"   Convirtiendo {len(df)} registros UTM a lat/lon...")
-                    
-                    # Convertir UTM a lat/lon de manera más eficiente
-                    coords_converted = []
-                    conversion_errors = 0
-                    
-                    for i, row in df.iterrows():
-                        try:
-                            este, norte, zona = row['ESTE'], row['NORTE'], row['ZONA']
-                            if pd.notna(este) and pd.notna(norte) and pd.notna(zona):
-                                lat, lon = utm_to_latlon(este, norte, zona)
-                                if lat and lon:
-                                    coords_converted.append({'latitud': lat, 'longitud': lon})
-                                else:
-                                    coords_converted.append({'latitud': None, 'longitud': None})
-                                    conversion_errors += 1
-                            else:
-                                coords_converted.append({'latitud': None, 'longitud': None})
-                                conversion_errors += 1
-                        except Exception as e:
-                            coords_converted.append({'latitud': None, 'longitud': None})
-                            conversion_errors += 1
-                    
-                    coords_df = pd.DataFrame(coords_converted)
-                    df = pd.concat([df, coords_df], axis=1)
-                    
-                    print(f"   ✅ Convertido: {len(df) - conversion_errors} registros exitosos")
-                    if conversion_errors > 0:
-                        print(f"   ⚠️ Errores de conversión: {conversion_errors}")
-                        
-                elif 'latitud' in df.columns and 'longitud' in df.columns:
-                    print(f"   ✅ Ya tiene coordenadas lat/lng: {len(df)} registros")
-                    # Ya tiene coordenadas en formato correcto
-                    pass
-                else:
-                    print(f"   ⚠️ No se encontraron coordenadas válidas en {file}")
-                    continue
-                # Agregar tipo de dataset
-                df['tipo_oefa'] = file.replace('.csv', '').replace('oefa_', '')
-                
-                # Solo agregar registros con coordenadas válidas
-                df_with_coords = df.dropna(subset=['latitud', 'longitud'])
-                if len(df_with_coords) > 0:
-                    oefa_combined.append(df_with_coords)
-                    print(f"   ✅ {file}: {len(df_with_coords):,} registros con coordenadas válidas")
-                else:
-                    print(f"   ⚠️ {file}: Sin registros con coordenadas válidas")
-                
+            df = cargar_snapshot(data_path, tipo)
+            print(f"⚡ {tipo}: {len(df):,} registros desde snapshot")
+            return df
         except Exception as e:
-            print(f"❌ Error cargando {file}: {e}")
-    
-    # Combinar todos los OEFA
-    if oefa_combined:
-        df_oefa = pd.concat(oefa_combined, ignore_index=True)
-        df_oefa = df_oefa.dropna(subset=['latitud', 'longitud'])
-        datasets_cache['oefa'] = df_oefa
-        print(f"✅ OEFA Total: {len(df_oefa):,} registros")
-    else:
-        datasets_cache['oefa'] = pd.DataFrame()
+            print(f"⚠️ Error leyendo snapshot de {tipo}, se usan los CSV: {e}")
+    return procesar_dataset(tipo, data_path)
+
+def cargar_compartido(tipo, data_path=DATA_PATH, huella=None):
+    """
+    Adjuntar un tipo desde memory-map, exportándolo antes si hace falta
+    
+    Args:
+        huella (str): Huella de los CSV con que se publicará el resultado; la
+            exportación solo sirve si se hizo con ella (por defecto la actual)
     
-    # Calcular estadísticas
+    Returns:
+        (df, indice, dias): el índice y los días son None si el dataset quedó vacío
+    """
+    if huella is None:
+        huella = huella_fuentes(data_path, FUENTES_DATASETS[tipo])
+    with bloqueo_exportacion(data_path):
+        if not mmap_vigente(data_path, tipo, FUENTES_DATASETS[tipo], huella):
+            df = leer_dataset(tipo, data_path, huella)
+            if df.empty:
+                return df, None, None
+            dias = dias_epoch(df)
+            indice = construir_indice_espacial(tipo, df, dias)
+            exportar_mmap(data_path, tipo, df, indice, huella, dias)
+            print(f"💾 {tipo}: exportado a memoria compartida")
+    
+    df, indice, dias = adjuntar_mmap(data_path, tipo)
+    compartidos, propios = memoria_dataset(df, indice, dias)
+    print(f"🔗 {tipo}: {len(df):,} registros en memoria compartida (solo lectura): "
+          f"{compartidos / 2**20:.1f} MB compartidos, {propios / 2**20:.1f} MB propios del worker")
+    return df, indice, dias
+
+def leer_tipo(tipo):
+    """
+    Leer un tipo desde memoria compartida, snapshot o CSV
+    
+    Returns:
+        (df, indice, dias, huella, huellas): las huellas de los CSV (en
+        conjunto y por archivo) se toman antes de leer, así un archivo que
+        cambia durante la lectura vuelve a detectarse; índice y días solo
+        vienen ya armados en modo compartido. Snapshot y memory-map se
+        validan contra esa misma huella: una exportación de otra versión
+        nunca se publica con ella
+    """
+    huella = huella_fuentes(DATA_PATH, FUENTES_DATASETS[tipo])
+    huellas = huellas_archivos(DATA_PATH, FUENTES_DATASETS[tipo])
+    if MMAP_HABILITADO:
+        df, indice, dias = cargar_compartido(tipo, huella=huella)
+    else:
+        df, indice, dias = leer_dataset(tipo, huella=huella), None, None
+    return df, indice, dias, huella, huellas
+
+CLAVES_STATS = {
+    'oefa': 'total_puntos_oefa',
+    'educacion': 'total_centros_educacion',
+    'salud': 'total_centros_salud',
+    'poblacion': 'total_centros_poblacion',
+}
+CARGA_HILOS = int(os.getenv("CARGA_HILOS", str(len(CARGADORES))))
+bloqueo_carga = threading.Lock()  # Protege estado_datasets, recargas y las estructuras combinadas
+bloqueo_irf = threading.Lock()  # Un solo cálculo del IRF a la vez (carga inicial o recarga)
+TIPOS_IRF = {'oefa', *TIPOS_EXPUESTOS}  # Tipos cuya recarga cambia el IRF
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Lo exige POST /api/admin/recargar (sin él, la ruta responde 403)
+
+def dataset_listo(tipo):
+    """El tipo terminó de cargarse y tiene todos sus índices"""
+    return estado_datasets.get(tipo) == 'listo'
+
+def actualizar_stats():
+    """Estadísticas de los tipos ya cargados"""
+    global stats_cache
     stats_cache = {
-        'total_puntos_oefa': len(datasets_cache['oefa']),
-        'total_centros_educacion': len(datasets_cache['educacion']),
-        'total_centros_salud': len(datasets_cache['salud']),
-        'total_centros_poblacion': len(datasets_cache['poblacion']),
+        **{CLAVES_STATS[tipo]: len(datasets_cache[tipo].df) for tipo in CARGADORES if tipo in datasets_cache},
         'ultimo_update': datetime.now().isoformat()
     }
+
+def publicar_dataset(dataset):
+    """Reemplazar la versión publicada de un tipo (una sola asignación)"""
+    with bloqueo_carga:
+        datasets_cache[dataset.tipo] = dataset
+        estado_datasets[dataset.tipo] = 'listo'
+        actualizar_catalogo()
+        actualizar_stats()
+    # Las claves de las caches incluyen la versión: las entradas anteriores ya
+    # no se pueden pedir y solo ocuparían memoria hasta ser desalojadas
+    cache_mapa.invalidar()
+    cache_exposicion.invalidar()
+    # Las teselas de la versión anterior ya no se piden con su huella
+    cache_teselas.limpiar(dataset.tipo, dataset.huella)
+
+def construir_tipo(tipo):
+    """Leer un tipo y construir sus estructuras, midiendo cada etapa"""
+    with etapa('carga', 'lectura', tipo) as tramo:
+        df, indice, dias, huella, huellas = leer_tipo(tipo)
+        tramo.filas = len(df)
+    with etapa('carga', 'indices', tipo) as tramo:
+        tramo.filas = len(df)
+        return construir_dataset(tipo, df, indice, huella, dias, huellas)
+
+def cargar_tipo(tipo):
+    """Cargar un tipo con sus índices y publicarlo como listo"""
+    estado_datasets[tipo] = 'cargando'
+    try:
+        dataset = construir_tipo(tipo)
+    except Exception as e:
+        estado_datasets[tipo] = 'error'
+        print(f"❌ Error cargando {tipo}: {e}")
+        return False
+    
+    with etapa('carga', 'publicacion', tipo):
+        publicar_dataset(dataset)
+    print(f"✅ {tipo} listo para consultas")
+    return True
+
+def load_datasets():
+    """Cargar y procesar todos los datasets (un hilo por fuente)"""
+    with bloqueo_carga:
+        pendientes = [tipo for tipo in CARGADORES if estado_datasets.get(tipo, 'pendiente') == 'pendiente']
+        for tipo in pendientes:
+            estado_datasets[tipo] = 'cargando'
+    
+    if not pendientes:  # Ya están cargados (o cargándose); los cambios van por recargar_datasets
+        return
+    
+    print("🔄 Cargando datasets...")
+    
+    # Lectura de CSV, Parquet y proyección UTM liberan el GIL: cada fuente en su hilo
+    with etapa('carga', 'total'), ThreadPoolExecutor(max_workers=max(CARGA_HILOS, 1)) as pool:
+        list(pool.map(cargar_tipo, pendientes))
     
     print("🎯 Datasets cargados correctamente!")
 
+def recargar_tipo(tipo):
+    """
+    Reconstruir un tipo y reemplazar la versión publicada
+    
+    Mientras tanto las consultas siguen usando la versión anterior; ambas
+    conviven en memoria hasta que terminan las consultas en curso. Si la
+    lectura falla se mantiene la versión anterior.
+    """
+    with bloqueo_carga:
+        if tipo in recargas_en_curso or estado_datasets.get(tipo) in ('pendiente', 'cargando'):
+            return False
+        recargas_en_curso.add(tipo)
+    try:
+        if tipo not in datasets_cache:  # La carga inicial había fallado
+            return cargar_tipo(tipo)
+        try:
+            dataset = construir_tipo(tipo)
+        except Exception as e:
+            print(f"❌ Error recargando {tipo}, se mantiene la versión {datasets_cache[tipo].version}: {e}")
+            return False
+        with etapa('carga', 'publicacion', tipo):
+            publicar_dataset(dataset)
+        print(f"♻️ {tipo} recargado: versión {dataset.version}, {len(dataset.df):,} registros")
+        return True
+    finally:
+        with bloqueo_carga:
+            recargas_en_curso.discard(tipo)
+
+def tipos_modificados():
+    """Tipos cuyos CSV cambiaron respecto de la versión publicada"""
+    return [
+        tipo for tipo, dataset in list(datasets_cache.items())
+        if huella_fuentes(DATA_PATH, FUENTES_DATASETS[tipo]) != dataset.huella
+    ]
+
+def recargar_datasets(tipos):
+    """Recargar varios tipos en paralelo y recalcular el IRF si alguno lo afecta"""
+    with ThreadPoolExecutor(max_workers=max(CARGA_HILOS, 1)) as pool:
+        recargados = [tipo for tipo, ok in zip(tipos, pool.map(recargar_tipo, tipos)) if ok]
+    if TIPOS_IRF.intersection(recargados):
+        actualizar_irf()
+    return recargados
+
+vigilante_fuentes = VigilanteFuentes(
+    DATA_PATH, FUENTES_DATASETS,
+    huella_publicada=lambda tipo: datasets_cache[tipo].huella if tipo in datasets_cache else None,
+    recargar=recargar_datasets
+)
+
+def cargar_en_segundo_plano():
+    """Carga inicial sin bloquear el event loop; el IRF se calcula al final"""
+    load_datasets()
+    actualizar_irf()
+    vigilante_fuentes.iniciar()
+
+def calcular_irf(vista):
+    """Tabla IRF con la exposición al radio por defecto (solo se recalculan los parciales cambiados)"""
+    oefa = vista['oefa']
+    exposiciones = {
+        tipo: exposicion_tipo(oefa, vista[tipo], RADIO_EXPOSICION_KM)
+        for tipo in TIPOS_EXPUESTOS if tipo in vista
+    }
+    return materializar_irf(parciales_irf, oefa.df, oefa.huellas, puntos_muestreo_oefa(oefa), exposiciones)
+
+def actualizar_irf():
+    """Materializar el IRF en segundo plano y publicarlo para la API"""
+    with bloqueo_irf:
+        vista = dict(datasets_cache)  # Versión fija de cada tipo durante el cálculo
+        if 'oefa' not in vista or vista['oefa'].df.empty:
+            return
+        try:
+            tabla, recalculados = calcular_irf(vista)
+            irf_cache['tabla'] = tabla
+            tabla.guardar(DATA_PATH)
+            print(f"🚨 IRF listo: {len(tabla.puntos):,} puntos, {len(tabla.distritos):,} distritos "
+                  f"(parciales recalculados: {', '.join(recalculados) or 'ninguno'})")
+        except Exception as e:
+            print(f"❌ Error calculando IRF: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    """Cargar datos al iniciar la API"""
-    load_datasets()
+    """Cargar datos al iniciar la API (la API responde mientras tanto)"""
+    for tipo in CARGADORES:
+        estado_datasets.setdefault(tipo, 'pendiente')
+    threading.Thread(target=cargar_en_segundo_plano, daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    vigilante_fuentes.detener()
+    await cerrar_cliente_reportes()
 
 @app.get("/")
 async def root():
@@ -224,16 +571,49 @@ async def root():
         "message": "🚀 Radar de Riesgo Hídrico API",
         "version": "1.0.0",
         "status": "online",
-        "datasets_loaded": len(datasets_cache) > 0
+        "datasets": {tipo: estado_datasets.get(tipo, 'pendiente') for tipo in CARGADORES},
+        "recargando": sorted(recargas_en_curso),
+        "datasets_loaded": all(dataset_listo(tipo) for tipo in CARGADORES)
     }
 
+def ventana_fechas(fecha_desde, fecha_hasta):
+    """(desde, hasta) en días desde 1970 a partir de fechas AAAA-MM-DD, o None sin filtro"""
+    if not fecha_desde and not fecha_hasta:
+        return None
+    try:
+        desde, hasta = (dia_de_fecha(fecha) if fecha else None for fecha in (fecha_desde, fecha_hasta))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Fecha no válida (formato AAAA-MM-DD)")
+    if desde is not None and hasta is not None and desde > hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde es posterior a fecha_hasta")
+    return desde, hasta
+
 @app.get("/api/stats")
-async def get_stats():
-    """Obtener estadísticas generales"""
-    if not stats_cache:
+async def get_stats(
+    fecha_desde: Optional[str] = Query(None, description="Fecha de muestreo inicial (AAAA-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Fecha de muestreo final (AAAA-MM-DD)")
+):
+    """Obtener estadísticas generales (los tipos con fechas se cuentan en la ventana pedida)"""
+    if not any(dataset_listo(tipo) for tipo in CARGADORES):
         raise HTTPException(status_code=503, detail="Datasets no cargados")
     
-    return stats_cache
+    ventana = ventana_fechas(fecha_desde, fecha_hasta)
+    if ventana is None:
+        return stats_cache
+    
+    # Dos búsquedas binarias por tipo sobre las fechas ordenadas
+    return {
+        **stats_cache,
+        **{CLAVES_STATS[tipo]: dataset.temporal.contar(*ventana)
+           for tipo, dataset in list(datasets_cache.items()) if dataset.temporal is not None},
+        "fechas": {"desde": fecha_de_dia(ventana[0]), "hasta": fecha_de_dia(ventana[1])}
+    }
+
+def normalizar_tipos(tipos):
+    """Tipos sin repetir y en orden fijo (mismo conjunto -> misma consulta)"""
+    orden = list(CARGADORES)
+    solicitados = {t.strip() for t in tipos.split(",")}
+    return sorted(solicitados, key=lambda t: (orden.index(t) if t in orden else len(orden), t))
 
 @app.get("/api/mapa/puntos")
 async def get_puntos_mapa(
@@ -242,203 +622,725 @@ async def get_puntos_mapa(
     radio_km: int = Query(20, description="Radio en kilómetros"),
     tipos: str = Query("oefa,educacion,salud,poblacion", description="Tipos separados por coma"),
     ubicacion: Optional[str] = Query(None, description="Filtro por ubicación"),
-    limit: int = Query(1000, description="Límite de resultados")
+    limit: int = Query(1000, description="Límite de resultados"),
+    formato: str = Query("puntos", description="Formato de respuesta: puntos | columnar"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa (activa la agregación en clusters)"),
+    umbral_cluster: int = Query(500, description="Puntos a partir de los cuales se agrupa en clusters"),
+    fecha_desde: Optional[str] = Query(None, description="Fecha de muestreo inicial (AAAA-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Fecha de muestreo final (AAAA-MM-DD)"),
+    profile: bool = Query(False, description="Incluir el desglose de tiempos por etapa (sin usar la cache)")
 ):
     """
     🎯 ENDPOINT PRINCIPAL: Obtener puntos dentro de un radio
     
-    Este es el endpoint que tu slider va a llamar en tiempo real
+    Este es el endpoint que tu slider va a llamar en tiempo real.
+    Las respuestas se guardan en una cache LRU con el centro redondeado
+    a la grilla CACHE_MAPA_PASO. Si se envía `zoom` (menor a ZOOM_PUNTOS) y
+    hay más de `umbral_cluster` puntos en el radio, se devuelven clusters
+    con conteo por tipo en lugar de puntos individuales. `fecha_desde` y
+    `fecha_hasta` filtran los tipos con fecha de muestreo (OEFA).
+    Con `profile=1` la respuesta se recalcula e incluye la clave "perfil".
     """
-    if not datasets_cache:
+    if not any(dataset_listo(tipo) for tipo in CARGADORES):
         raise HTTPException(status_code=503, detail="Datasets no cargados")
     
-    tipos_lista = [t.strip() for t in tipos.split(",")]
+    if formato not in ("puntos", "columnar"):
+        raise HTTPException(status_code=400, detail="Formato no válido")
+    
+    tipos_lista = normalizar_tipos(tipos)
+    centro_lat = cuantizar(centro_lat)
+    centro_lng = cuantizar(centro_lng)
+    if ubicacion:
+        ubicacion = normalizar_texto(ubicacion) or None  # Sin tildes ni mayúsculas
+    ventana = ventana_fechas(fecha_desde, fecha_hasta)
+    
+    vista = dict(datasets_cache)  # Versión fija de cada tipo durante toda la consulta
+    clave = (
+        tuple((tipo, vista[tipo].version if tipo in vista else None) for tipo in tipos_lista),
+        centro_lat, centro_lng, radio_km, ubicacion, limit, formato, zoom, umbral_cluster, ventana
+    )
+    with etapa('mapa', 'cache'):
+        contenido = None if profile else cache_mapa.obtener(clave)
+    estado_cache = "HIT"
+    if contenido is None:
+        resultado = calcular_puntos_mapa(
+            vista, centro_lat, centro_lng, radio_km, tipos_lista, ubicacion, limit, formato,
+            zoom, umbral_cluster, ventana
+        )
+        with etapa('mapa', 'json'):
+            contenido = JSONResponse(content=resultado).body
+        cache_mapa.guardar(clave, contenido)
+        estado_cache = "BYPASS" if profile else "MISS"
+    
+    return Response(content=contenido, media_type="application/json",
+                    headers={"X-Cache": estado_cache})
+
+def calcular_puntos_mapa(vista, centro_lat, centro_lng, radio_km, tipos_lista, ubicacion, limit, formato,
+                         zoom=None, umbral_cluster=500, ventana=None):
+    """Filtrar, limitar y serializar los puntos de cada tipo dentro del radio"""
     puntos_resultado = []
+    columnas_resultado = {}
+    total_puntos = 0
     conteos = {}
+    seleccion = {}  # tipo -> (posiciones, distancias) en el radio
+    
+    filtros_aplicados = {
+        "centro": {"lat": centro_lat, "lng": centro_lng},
+        "radio_km": radio_km,
+        "tipos": tipos_lista,
+        "ubicacion": ubicacion,
+        "fechas": {"desde": fecha_de_dia(ventana[0]), "hasta": fecha_de_dia(ventana[1])} if ventana else None,
+        "tipos_cargando": [t for t in tipos_lista if t in CARGADORES and t not in vista]
+    }
     
     # Procesar cada tipo de dato solicitado
     for tipo in tipos_lista:
-        if tipo not in datasets_cache:
+        if tipo not in vista:
             continue
             
-        df = datasets_cache[tipo]
+        df = vista[tipo].df
         if df.empty:
             conteos[tipo] = 0
             continue
         
-        # Calcular distancias usando haversine (vectorizado para mejor performance)
-        if len(df) > 0:
-            # Usar numpy para cálculos vectorizados más rápidos
-            lats = df['latitud'].values
-            lngs = df['longitud'].values
-            
-            # Convertir a radianes
-            lat1_rad = np.radians(centro_lat)
-            lng1_rad = np.radians(centro_lng)
-            lat2_rad = np.radians(lats)
-            lng2_rad = np.radians(lngs)
-            
-            # Fórmula haversine vectorizada
-            dlat = lat2_rad - lat1_rad
-            dlng = lng2_rad - lng1_rad
-            a = np.sin(dlat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng/2)**2
-            c = 2 * np.arcsin(np.sqrt(a))
-            distancias = c * 6371  # Radio de la Tierra en km
-            
-            df_copy = df.copy()
-            df_copy['distancia_km'] = distancias
-        else:
-            df_copy = df.copy()
-            df_copy['distancia_km'] = []
-        
-        # Filtrar por radio
-        df_filtrado = df_copy[df_copy['distancia_km'] <= radio_km]
+        # Consultar solo las celdas candidatas del índice espacial (y, si hay
+        # ventana y el tipo tiene fechas, solo su tramo de días en cada celda)
+        with etapa('mapa', 'radio', tipo) as tramo:
+            posiciones, distancias = vista[tipo].indice.consultar_radio(
+                centro_lat, centro_lng, radio_km, ventana if vista[tipo].temporal is not None else None
+            )
+            tramo.filas = len(posiciones)
         
-        # Filtro adicional por ubicación (si se especifica)
+        # Filtro adicional por ubicación (departamento, provincia o distrito),
+        # resuelto sobre los códigos categóricos antes de materializar filas
         if ubicacion:
-            columnas_ubicacion = ['departamento', 'provincia', 'distrito']
-            for col in columnas_ubicacion:
-                if col in df_filtrado.columns:
-                    df_filtrado = df_filtrado[
-                        df_filtrado[col].str.contains(ubicacion, case=False, na=False)
-                    ]
-                    break
+            with etapa('mapa', 'ubicacion', tipo) as tramo:
+                coinciden = vista[tipo].ubicaciones.mascara(ubicacion, posiciones)
+                posiciones, distancias = posiciones[coinciden], distancias[coinciden]
+                tramo.filas = len(posiciones)
+        
+        seleccion[tipo] = (posiciones, distancias)
+    
+    # Zoom bajo con muchos puntos: agregar en clusters en lugar de truncar
+    # (se decide por las posiciones, antes de materializar filas)
+    total_en_radio = sum(len(posiciones) for posiciones, _ in seleccion.values())
+    if zoom is not None and zoom < ZOOM_PUNTOS and total_en_radio > umbral_cluster:
+        with etapa('mapa', 'clusters') as tramo:
+            tramo.filas = total_en_radio
+            return respuesta_clusters(vista, seleccion, zoom, total_en_radio, filtros_aplicados)
+    
+    for tipo, (posiciones, distancias) in seleccion.items():
+        with etapa('mapa', 'filas', tipo) as tramo:
+            df_filtrado = vista[tipo].df.iloc[posiciones].assign(distancia_km=distancias)
+            tramo.filas = len(df_filtrado)
         
         # Limitar resultados por tipo
-        df_filtrado = df_filtrado.nsmallest(limit//len(tipos_lista), 'distancia_km')
+        with etapa('mapa', 'limite', tipo) as tramo:
+            df_filtrado = df_filtrado.nsmallest(limit//len(tipos_lista), 'distancia_km')
+            tramo.filas = len(df_filtrado)
         conteos[tipo] = len(df_filtrado)
         
-        # Convertir a formato estándar
-        for _, row in df_filtrado.iterrows():
-            # Obtener nombre según el tipo de dataset
-            if tipo == 'educacion':
-                nombre = str(row.get('nombre_institucion', 'Centro Educativo'))
-            elif tipo == 'salud':
-                nombre = str(row.get('nombre_establecimiento', 'Centro de Salud'))
-            elif tipo == 'poblacion':
-                nombre = str(row.get('nombre_centro_poblado', 'Centro Poblado'))
-            elif tipo == 'oefa':
-                nombre = f"Punto OEFA - {str(row.get('PUNTO_MUESTREO', 'Monitoreo'))}"
-            else:
-                nombre = f"Punto {tipo}"
-            
-            # Generar ID único según tipo
-            if tipo == 'educacion':
-                punto_id = str(row.get('codigo_modular', f"edu_{len(puntos_resultado)}"))
-            elif tipo == 'salud':
-                punto_id = str(row.get('codigo_unico', f"salud_{len(puntos_resultado)}"))
-            elif tipo == 'poblacion':
-                punto_id = str(row.get('id_centro_poblado', f"pob_{len(puntos_resultado)}"))
-            elif tipo == 'oefa':
-                punto_id = str(row.get('ID_INFORME', f"oefa_{len(puntos_resultado)}"))
+        # Convertir a formato estándar (por columnas, sin recorrer filas)
+        with etapa('mapa', 'serializacion', tipo) as tramo:
+            if formato == "columnar":
+                columnas_resultado[tipo] = columnas_punto(tipo, df_filtrado, total_puntos)
             else:
-                punto_id = f"{tipo}_{len(puntos_resultado)}"
-            
-            punto = {
-                "id": punto_id,
-                "tipo": tipo,
-                "latitud": float(row['latitud']),
-                "longitud": float(row['longitud']),
-                "distancia_km": round(row['distancia_km'], 2),
-                "nombre": nombre,
-                "ubicacion": str(row.get('departamento', '')) + ", " + str(row.get('provincia', ''))
-            }
-            
-            # Información específica por tipo
-            if tipo == 'educacion':
-                punto['info_especifica'] = {
-                    "nivel_modalidad": str(row.get('nivel_modalidad', '')),
-                    "gestion": str(row.get('gestion', '')),
-                    "area_censal": str(row.get('area_censal', ''))
-                }
-            elif tipo == 'salud':
-                punto['info_especifica'] = {
-                    "tipo_establecimiento": str(row.get('tipo_establecimiento', '')),
-                    "categoria": str(row.get('categoria', '')),
-                    "estado": str(row.get('estado', ''))
-                }
-            elif tipo == 'poblacion':
-                punto['info_especifica'] = {
-                    "departamento": str(row.get('departamento', '')),
-                    "provincia": str(row.get('provincia', '')),
-                    "distrito": str(row.get('distrito', ''))
-                }
-            elif tipo == 'oefa':
-                punto['info_especifica'] = {
-                    "tipo_oefa": str(row.get('tipo_oefa', '')),
-                    "fecha_muestra": str(row.get('FECHA_MUESTRA', '')),
-                    "parametro": str(row.get('PARAMETRO', ''))
-                }
-            
-            puntos_resultado.append(punto)
+                puntos_resultado.extend(serializar_puntos(tipo, df_filtrado, total_puntos))
+            tramo.filas = len(df_filtrado)
+        total_puntos += len(df_filtrado)
+    
+    if formato == "columnar":
+        return {
+            "formato": "columnar",
+            "columnas": columnas_resultado,
+            "total": total_puntos,
+            "tipos_count": conteos,
+            "filtros_aplicados": filtros_aplicados
+        }
     
     return {
         "puntos": puntos_resultado,
-        "total": len(puntos_resultado),
+        "total": total_puntos,
         "tipos_count": conteos,
-        "filtros_aplicados": {
-            "centro": {"lat": centro_lat, "lng": centro_lng},
-            "radio_km": radio_km,
-            "tipos": tipos_lista,
-            "ubicacion": ubicacion
+        "filtros_aplicados": filtros_aplicados
+    }
+
+def respuesta_clusters(vista, seleccion, zoom, total_en_radio, filtros_aplicados):
+    """Clusters por celda de zoom con conteo por tipo y centroide, desde las posiciones en el radio"""
+    agregados = {}
+    for tipo, (posiciones, _) in seleccion.items():
+        indice_clusters = vista[tipo].clusters
+        precalculado = indice_clusters.nivel(zoom) if indice_clusters is not None else None
+        if precalculado is not None and len(posiciones) == indice_clusters.total:
+            # El radio cubre todo el dataset: usar los agregados precalculados
+            agregados[tipo] = precalculado
+        else:
+            df = vista[tipo].df
+            agregados[tipo] = agregar(df['latitud'].to_numpy(dtype=np.float64)[posiciones],
+                                      df['longitud'].to_numpy(dtype=np.float64)[posiciones], zoom)
+    
+    clusters = combinar_clusters(agregados)
+    return {
+        "modo": "clusters",
+        "zoom": zoom,
+        "clusters": clusters,
+        "total": len(clusters),
+        "total_puntos": total_en_radio,
+        "tipos_count": {tipo: len(posiciones) for tipo, (posiciones, _) in seleccion.items()},
+        "filtros_aplicados": filtros_aplicados
+    }
+
+def puntos_muestreo_oefa(oefa):
+    """Ubicaciones únicas de muestreo de una versión de OEFA"""
+    clave = ("muestreo", oefa.version)
+    puntos = cache_exposicion.obtener(clave)
+    if puntos is None:
+        puntos = PuntosMuestreo(oefa.df)
+        cache_exposicion.guardar(clave, puntos)
+    return puntos
+
+def exposicion_tipo(oefa, destino, radio_km):
+    """Vecinos de cada ubicación OEFA en un dataset, cacheados por radio y versiones"""
+    clave = ("exposicion", destino.tipo, radio_km, oefa.version, destino.version)
+    exposicion = cache_exposicion.obtener(clave)
+    if exposicion is None:
+        puntos = puntos_muestreo_oefa(oefa)
+        exposicion = calcular_exposicion(destino.indice, puntos.lats, puntos.lngs, radio_km)
+        cache_exposicion.guardar(clave, exposicion)
+    return exposicion
+
+def calcular_riesgo_exposicion(vista, radios, incluir_ids, solo_expuestos, offset, limit):
+    """Conteos (e ids) de poblados, colegios y establecimientos de salud por punto OEFA"""
+    oefa = vista['oefa']
+    puntos = puntos_muestreo_oefa(oefa)
+    exposiciones = {tipo: exposicion_tipo(oefa, vista[tipo], radio) for tipo, radio in radios.items()}
+    conteos = {tipo: exposicion.conteos for tipo, exposicion in exposiciones.items()}
+    total_expuestos = sum(conteos.values())
+    
+    # Ubicaciones ordenadas de mayor a menor exposición total
+    seleccion = np.argsort(-total_expuestos, kind='stable')
+    if solo_expuestos:
+        seleccion = seleccion[total_expuestos[seleccion] > 0]
+    pagina = seleccion[offset:offset + limit]
+    
+    df_oefa = oefa.df
+    filas = df_oefa.iloc[puntos.primeras[pagina]]
+    resultado = {
+        "latitud": puntos.lats[pagina].tolist(),
+        "longitud": puntos.lngs[pagina].tolist(),
+        "punto_muestreo": columna_str(filas, 'PUNTO_MUESTREO'),
+        "id": columna_str(filas, 'ID_INFORME'),
+        "registros": puntos.registros[pagina].tolist(),
+    }
+    
+    ids_por_tipo = {}
+    if incluir_ids:
+        for tipo, exposicion in exposiciones.items():
+            col_id = COLUMNAS_POR_TIPO[tipo]['id'][0]
+            vecinos = [exposicion.vecinos(k)[0] for k in pagina]
+            todas = np.concatenate(vecinos) if vecinos else np.empty(0, dtype=np.int64)
+            ids = columna_str(vista[tipo].df.iloc[todas], col_id) if len(todas) else []
+            cortes = np.cumsum([len(v) for v in vecinos])[:-1]
+            ids_por_tipo[tipo] = [list(grupo) for grupo in np.split(np.array(ids, dtype=object), cortes)]
+    
+    puntos_respuesta = []
+    for i, k in enumerate(pagina.tolist()):
+        punto = {campo: valores[i] for campo, valores in resultado.items()}
+        punto["conteos"] = {tipo: int(conteos[tipo][k]) for tipo in radios}
+        if incluir_ids:
+            punto["ids"] = {tipo: ids_por_tipo[tipo][i] for tipo in radios}
+        puntos_respuesta.append(punto)
+    
+    return {
+        "radios_km": radios,
+        "total_puntos_muestreo": puntos.total,
+        "puntos_expuestos": int((total_expuestos > 0).sum()),
+        "resumen": {
+            tipo: {
+                "pares": int(len(exposicion.posiciones)),
+                "unicos_expuestos": exposicion.destinos_expuestos()
+            }
+            for tipo, exposicion in exposiciones.items()
+        },
+        "total": len(seleccion),
+        "offset": offset,
+        "limit": limit,
+        "puntos": puntos_respuesta
+    }
+
+@app.get("/api/riesgo/exposicion")
+async def get_riesgo_exposicion(
+    radio_km: float = Query(RADIO_EXPOSICION_KM, gt=0, le=100, description="Radio por defecto en km"),
+    radio_poblacion: Optional[float] = Query(None, gt=0, le=100, description="Radio para centros poblados"),
+    radio_educacion: Optional[float] = Query(None, gt=0, le=100, description="Radio para colegios"),
+    radio_salud: Optional[float] = Query(None, gt=0, le=100, description="Radio para establecimientos de salud"),
+    incluir_ids: bool = Query(False, description="Incluir los ids de los puntos expuestos"),
+    solo_expuestos: bool = Query(False, description="Omitir puntos OEFA sin exposición"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    Exposición alrededor de cada punto de muestreo OEFA
+    
+    Cuenta los centros poblados, colegios y establecimientos de salud a
+    menos del radio de cada ubicación de muestreo. El cálculo nacional se
+    hace una vez por (radio, versión de los datasets) y queda en cache.
+    """
+    vista = dict(datasets_cache)
+    if 'oefa' not in vista or vista['oefa'].df.empty:
+        raise HTTPException(status_code=503, detail="Datasets no cargados")
+    
+    especificos = {'poblacion': radio_poblacion, 'educacion': radio_educacion, 'salud': radio_salud}
+    radios = {
+        tipo: round(especificos[tipo] or radio_km, 3)
+        for tipo in TIPOS_EXPUESTOS if tipo in vista
+    }
+    
+    # Cálculo pesado (pool de procesos) fuera del event loop
+    return await run_in_threadpool(
+        calcular_riesgo_exposicion, vista, radios, incluir_ids, solo_expuestos, offset, limit
+    )
+
+@app.get("/api/series")
+async def get_series(
+    periodo: str = Query("mes", description="Agregación temporal: mes | anio"),
+    agrupar: Optional[str] = Query(None, description="Dimensiones separadas por coma: tipo_oefa, departamento, PARAMETRO"),
+    tipo_oefa: Optional[str] = Query(None, description="Filtro por tipo de muestreo OEFA"),
+    departamento: Optional[str] = Query(None, description="Filtro por departamento"),
+    parametro: Optional[str] = Query(None, description="Filtro por PARAMETRO"),
+    fecha_desde: Optional[str] = Query(None, description="Fecha de muestreo inicial (AAAA-MM-DD)"),
+    fecha_hasta: Optional[str] = Query(None, description="Fecha de muestreo final (AAAA-MM-DD)"),
+    limite_series: int = Query(50, ge=1, le=1000, description="Series devueltas (las de más muestras)")
+):
+    """
+    Series de tiempo de las muestras OEFA para los gráficos
+    
+    Conteo de muestras y excedencias y mínimo/media/máximo del resultado por
+    mes o año (excedencias None si ninguna muestra del periodo tiene límite
+    en la tabla ECA/LMP), opcionalmente separadas por tipo_oefa,
+    departamento y/o PARAMETRO. Sale de los cubos precalculados al cargar OEFA. Mínimo,
+    media y máximo solo son comparables dentro de un mismo PARAMETRO.
+    """
+    oefa = datasets_cache.get('oefa')
+    if oefa is None or oefa.series is None:
+        raise HTTPException(status_code=503, detail="Datasets no cargados")
+    
+    if periodo not in PERIODOS:
+        raise HTTPException(status_code=400, detail="Periodo no válido (mes | anio)")
+    dimensiones = [d.strip() for d in agrupar.split(",") if d.strip()] if agrupar else []
+    invalidas = [d for d in dimensiones if d not in DIMENSIONES]
+    if invalidas:
+        raise HTTPException(status_code=400, detail=f"Dimensiones no válidas: {', '.join(invalidas)}")
+    dimensiones = [d for d in DIMENSIONES if d in dimensiones and d in oefa.series.dimensiones]
+    
+    filtros = {
+        dim: valor
+        for dim, valor in (('tipo_oefa', tipo_oefa), ('departamento', departamento), ('PARAMETRO', parametro))
+        if valor and dim in oefa.series.dimensiones
+    }
+    ventana = ventana_fechas(fecha_desde, fecha_hasta)
+    series, total_series = oefa.series.consultar(periodo, dimensiones, filtros, ventana, limite_series)
+    return {
+        "periodo": periodo,
+        "agrupar": dimensiones,
+        "filtros": filtros,
+        "fechas": {"desde": fecha_de_dia(ventana[0]), "hasta": fecha_de_dia(ventana[1])} if ventana else None,
+        "series": series,
+        "total_series": total_series,
+        "version": oefa.version
+    }
+
+def buscar_nombres(vista, texto, tipos, limite, centro):
+    """Mejores coincidencias por nombre entre varios tipos, mezcladas por clase y criterio"""
+    encontrados = []
+    totales = {}
+    for tipo in tipos:
+        dataset = vista.get(tipo)
+        if dataset is None or dataset.nombres is None:
+            continue
+        resultados, totales[tipo] = dataset.nombres.buscar(texto, limite, centro)
+        encontrados.extend((clase, criterio, tipo, fila, distancia)
+                           for clase, criterio, fila, distancia in resultados)
+    encontrados.sort(key=lambda r: (r[0], r[1]))
+    encontrados = encontrados[:limite]
+    
+    # Una sola selección de filas por tipo para armar la respuesta
+    campos = {}
+    for tipo in {r[2] for r in encontrados}:
+        filas = [r[3] for r in encontrados if r[2] == tipo]
+        df = vista[tipo].df.iloc[filas]
+        config = COLUMNAS_POR_TIPO[tipo]
+        col_id, prefijo_id = config['id']
+        ids = columna_str(df, col_id) if col_id in df.columns else [f"{prefijo_id}_{f}" for f in filas]
+        col_nombre, nombre_defecto = config['nombre']
+        campos[tipo] = dict(zip(filas, zip(
+            ids, columna_str(df, col_nombre, nombre_defecto),
+            df['latitud'].tolist(), df['longitud'].tolist(),
+            *(columna_str(df, col) for col in ('departamento', 'provincia', 'distrito'))
+        )))
+    
+    resultados = []
+    for clase, _, tipo, fila, distancia in encontrados:
+        punto_id, nombre, lat, lng, departamento, provincia, distrito = campos[tipo][fila]
+        resultado = {
+            "tipo": tipo,
+            "id": punto_id,
+            "nombre": nombre,
+            "latitud": float(lat),
+            "longitud": float(lng),
+            "ubicacion": {"departamento": departamento, "provincia": provincia, "distrito": distrito},
+            "coincidencia": NOMBRES_COINCIDENCIA[clase],
         }
+        if distancia is not None:
+            resultado["distancia_km"] = round(distancia, 3)
+        resultados.append(resultado)
+    return resultados, totales
+
+@app.get("/api/buscar")
+async def get_buscar(
+    q: str = Query(..., min_length=1, description="Texto a buscar (nombre o parte de él)"),
+    tipos: str = Query(",".join(TIPOS_BUSCABLES), description="Tipos separados por coma"),
+    limit: int = Query(10, ge=1, le=100),
+    centro_lat: Optional[float] = Query(None, description="Latitud para priorizar lo cercano"),
+    centro_lng: Optional[float] = Query(None, description="Longitud para priorizar lo cercano")
+):
+    """
+    Autocompletado de centros poblados, colegios y establecimientos de salud
+    
+    Cada palabra del texto se busca como prefijo de las palabras del nombre,
+    sin tildes ni mayúsculas. Primero van los nombres iguales al texto,
+    luego los que empiezan con él y luego el resto; dentro de cada grupo,
+    los más cercanos al centro (si se envía) o los nombres más cortos.
+    """
+    texto = normalizar_texto(q)
+    tipos_lista = [tipo for tipo in normalizar_tipos(tipos) if tipo in TIPOS_BUSCABLES]
+    if not tipos_lista:
+        raise HTTPException(status_code=400, detail="Tipos no válidos")
+    
+    vista = dict(datasets_cache)
+    if not any(tipo in vista for tipo in tipos_lista):
+        raise HTTPException(status_code=503, detail="Datasets no cargados")
+    
+    centro = (centro_lat, centro_lng) if centro_lat is not None and centro_lng is not None else None
+    resultados, totales = buscar_nombres(vista, texto, tipos_lista, limit, centro)
+    return {
+        "q": q,
+        "resultados": resultados,
+        "total": len(resultados),
+        "coincidencias_por_tipo": totales,
+        "tipos_cargando": [tipo for tipo in tipos_lista if tipo not in vista]
+    }
+
+def tabla_irf():
+    if 'tabla' not in irf_cache:
+        raise HTTPException(status_code=503, detail="IRF en cálculo")
+    return irf_cache['tabla']
+
+@app.get("/api/irf/distritos")
+async def get_irf_distritos(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=5000)):
+    """Ranking de distritos por Índice de Riesgo de Fiscalización"""
+    tabla = tabla_irf()
+    return {
+        "distritos": tabla.ranking('distritos', offset, limit),
+        "total": len(tabla.distritos),
+        "calculado": tabla.calculado
+    }
+
+@app.get("/api/irf/distrito/{ubigeo}")
+async def get_irf_distrito(ubigeo: str):
+    """IRF de un distrito por ubigeo"""
+    distrito = tabla_irf().distrito(ubigeo)
+    if distrito is None:
+        raise HTTPException(status_code=404, detail="Distrito no encontrado")
+    return distrito
+
+@app.get("/api/irf/puntos")
+async def get_irf_puntos(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=5000)):
+    """Ranking de ubicaciones de muestreo OEFA por IRF"""
+    tabla = tabla_irf()
+    return {
+        "puntos": tabla.ranking('puntos', offset, limit),
+        "total": len(tabla.puntos),
+        "calculado": tabla.calculado
+    }
+
+@app.get("/api/irf/punto")
+async def get_irf_punto(latitud: float = Query(...), longitud: float = Query(...)):
+    """IRF de una ubicación de muestreo OEFA (coordenadas con 6 decimales)"""
+    punto = tabla_irf().punto(latitud, longitud)
+    if punto is None:
+        raise HTTPException(status_code=404, detail="Punto no encontrado")
+    return punto
+
+class SolicitudDetalleLote(BaseModel):
+    tipo: str
+    ids: List[str]
+
+def detalle_punto(dataset, punto_id, posicion):
+    """Armar la respuesta de detalle a partir de la posición de la fila"""
+    row = dataset.df.iloc[posicion]
+    
+    return {
+        "id": punto_id,
+        "tipo": dataset.tipo,
+        "nombre": str(row.get('nombre_institucion', row.get('nombre_establecimiento',
+                       row.get('nombre_centro_poblado', 'Punto OEFA')))),
+        "coordenadas": {
+            "latitud": float(row['latitud']),
+            "longitud": float(row['longitud'])
+        },
+        "info_completa": row.to_dict()
+    }
+
+@app.get("/tiles/{capa}/{z}/{x}/{y}.pbf")
+async def get_tesela(capa: str, z: int, x: int, y: int):
+    """
+    Tesela vectorial (MVT) de una capa: oefa, educacion, salud o poblacion
+    
+    Las teselas se sirven desde la cache en disco; el navegador puede
+    guardarlas mientras no cambien los datos de origen.
+    """
+    if capa not in CARGADORES:
+        raise HTTPException(status_code=404, detail="Capa no encontrada")
+    
+    if not dataset_listo(capa):
+        raise HTTPException(status_code=503, detail=f"Capa {capa} cargando")
+    
+    if not tesela_valida(z, x, y):
+        raise HTTPException(status_code=400, detail="Tesela no válida")
+    
+    dataset = datasets_cache[capa]
+    contenido = obtener_tesela(dataset, z, x, y)
+    return Response(content=contenido, media_type="application/vnd.mapbox-vector-tile",
+                    headers={"ETag": f'"{dataset.huella}"',
+                             "Cache-Control": "public, max-age=3600"})
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Estadísticas de la cache de consultas del mapa"""
+    return {
+        **cache_mapa.estadisticas(),
+        "paso_centro_grados": CACHE_MAPA_PASO,
+        "versiones_datasets": {tipo: dataset.version for tipo, dataset in datasets_cache.items()},
+        "exposicion": cache_exposicion.estadisticas()
+    }
+
+def estadisticas_caches():
+    """{(cache, métrica): valor} de las caches LRU"""
+    return {
+        (nombre, clave): valor
+        for nombre, cache in (("mapa", cache_mapa), ("exposicion", cache_exposicion))
+        for clave, valor in cache.estadisticas().items()
+        if clave in ("entradas", "hits", "misses", "expiradas", "desalojadas")
+    }
+
+registro.agregar(Indicador("dataset_registros", "Registros de la versión publicada de cada tipo", ("tipo",),
+                           lambda: {(tipo,): len(d.df) for tipo, d in list(datasets_cache.items())}))
+registro.agregar(Indicador("dataset_version", "Versión publicada de cada tipo", ("tipo",),
+                           lambda: {(tipo,): d.version for tipo, d in list(datasets_cache.items())}))
+registro.agregar(Indicador("cache", "Estado de las caches de respuestas", ("cache", "metrica"), estadisticas_caches))
+registro.agregar(Indicador(
+    "ia", "Llamadas, errores, tokens y costo (USD) de los reportes IA", ("modelo", "tipo_reporte", "metrica"),
+    lambda: {
+        (fila["modelo"], fila["tipo_reporte"], metrica): fila[metrica] or 0
+        for fila in metricas_reportes().resumen()
+        for metrica in ("llamadas", "errores", "aciertos_cache", "total_tokens", "costo_usd")
+    }
+))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Histogramas de tiempos por ruta y etapa en formato de texto de Prometheus"""
+    return Response(content=registro.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/admin/recargar", status_code=202)
+async def post_recargar(
+    tipos: Optional[str] = Query(None, description="Tipos separados por coma (por defecto, los modificados)"),
+    forzar: bool = Query(False, description="Recargar aunque los CSV no hayan cambiado"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Recargar datasets desde DATAFINAL sin reiniciar la API
+    
+    La recarga corre en segundo plano: mientras tanto se siguen sirviendo
+    las versiones publicadas, que se reemplazan al terminar cada tipo.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Recarga deshabilitada: defina ADMIN_TOKEN")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de administración no válido")
+    
+    if tipos:
+        solicitados = normalizar_tipos(tipos)
+        desconocidos = [tipo for tipo in solicitados if tipo not in CARGADORES]
+        if desconocidos:
+            raise HTTPException(status_code=404, detail=f"Tipos no encontrados: {', '.join(desconocidos)}")
+    else:
+        solicitados = list(CARGADORES)
+    
+    modificados = set(tipos_modificados())
+    seleccion = [
+        tipo for tipo in solicitados
+        if forzar or tipo in modificados or estado_datasets.get(tipo) == 'error'
+    ]
+    if seleccion:
+        threading.Thread(target=recargar_datasets, args=(seleccion,), daemon=True).start()
+    
+    return {
+        "recargando": seleccion,
+        "sin_cambios": [tipo for tipo in solicitados if tipo not in seleccion],
+        "versiones_datasets": {tipo: dataset.version for tipo, dataset in datasets_cache.items()}
     }
 
 @app.get("/api/punto/{tipo}/{punto_id}")
 async def get_detalle_punto(tipo: str, punto_id: str):
     """Obtener detalles específicos de un punto"""
-    if not datasets_cache or tipo not in datasets_cache:
+    if tipo not in CARGADORES:
         raise HTTPException(status_code=404, detail="Tipo de dato no encontrado")
     
-    df = datasets_cache[tipo]
+    if not dataset_listo(tipo):
+        raise HTTPException(status_code=503, detail=f"Dataset {tipo} cargando")
     
-    # Buscar el punto según el tipo
-    if tipo == 'educacion':
-        punto = df[df['codigo_modular'].astype(str) == punto_id]
-    elif tipo == 'salud':
-        punto = df[df['codigo_unico'].astype(str) == punto_id]
-    elif tipo == 'oefa':
-        punto = df[df['ID_INFORME'].astype(str) == punto_id]
-    else:
+    if tipo not in COLUMNAS_POR_TIPO:
         raise HTTPException(status_code=400, detail="Tipo no válido")
     
-    if punto.empty:
+    # Búsqueda O(1) en el índice de ids
+    dataset = datasets_cache[tipo]
+    with etapa('detalle', 'id', tipo):
+        posicion = dataset.ids.get(punto_id)
+    if posicion is None:
         raise HTTPException(status_code=404, detail="Punto no encontrado")
     
-    row = punto.iloc[0]
+    with etapa('detalle', 'fila', tipo) as tramo:
+        tramo.filas = 1
+        return detalle_punto(dataset, punto_id, posicion)
+
+def filas_punto(dataset, posicion):
+    """Filas en las mismas coordenadas que la fila pedida (todas sus muestras), empezando por ella"""
+    lats = dataset.df['latitud'].to_numpy(dtype=np.float64)
+    lngs = dataset.df['longitud'].to_numpy(dtype=np.float64)
+    if dataset.indice is None:
+        return np.array([posicion])
+    cercanas, _ = dataset.indice.consultar_radio(lats[posicion], lngs[posicion], 0.001)
+    cercanas = np.sort(cercanas[(lats[cercanas] == lats[posicion]) & (lngs[cercanas] == lngs[posicion])])
+    return np.concatenate(([posicion], cercanas[cercanas != posicion]))
+
+@app.get("/api/reporte/{tipo}/{punto_id}")
+async def get_reporte_stream(
+    tipo: str,
+    punto_id: str,
+    max_tokens: int = Query(2000, ge=100, le=4000, description="Máximo de tokens del reporte")
+):
+    """
+    Reporte IA de un punto OEFA transmitido por Server-Sent Events
+    
+    Eventos: "inicio" (report_data usado), "delta" (fragmento de texto),
+    "fin" (modelo, tokens, tiempos y si vino de la cache) o "error". Un
+    punto sin resultados medidos responde 422 sin llamar a OpenAI.
+    """
+    if tipo != 'oefa':
+        raise HTTPException(status_code=400, detail="Los reportes IA están disponibles solo para puntos OEFA")
+    
+    if not dataset_listo(tipo):
+        raise HTTPException(status_code=503, detail=f"Dataset {tipo} cargando")
+    
+    dataset = datasets_cache[tipo]
+    posicion = dataset.ids.get(punto_id)
+    if posicion is None:
+        raise HTTPException(status_code=404, detail="Punto no encontrado")
+    
+    try:
+        report_data = datos_reporte(dataset.df.iloc[filas_punto(dataset, posicion)])
+    except SinMediciones as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    cliente, motivo = cliente_reportes()
+    if cliente is None:
+        raise HTTPException(status_code=503, detail=f"Reportes IA no disponibles ({motivo})")
+    
+    return StreamingResponse(
+        eventos_reporte(cliente, tipo, punto_id, report_data, max_tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/reportes/metricas")
+async def get_metricas_reportes(
+    formato: str = Query("json", description="Formato de respuesta: json | csv"),
+    modelo: Optional[str] = Query(None, description="Solo este modelo"),
+    tipo_reporte: Optional[str] = Query(None, description="Solo este tipo de reporte (oefa, quiz, chat...)")
+):
+    """
+    Tokens, latencia (percentiles), errores y costo estimado de las llamadas
+    a OpenAI por modelo y tipo de reporte, desde que arrancó la API
+    """
+    metricas = metricas_reportes()
+    if formato == "csv":
+        return Response(
+            content=metricas.csv(modelo, tipo_reporte), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="metricas_reportes_ia.csv"'}
+        )
+    if formato != "json":
+        raise HTTPException(status_code=400, detail="Formato no válido")
+    
+    return {
+        "totales": metricas.totales(),
+        "series": metricas.resumen(modelo, tipo_reporte),
+        "cache": cache_reportes()
+    }
+
+@app.post("/api/puntos/detalle")
+async def get_detalle_puntos_lote(solicitud: SolicitudDetalleLote):
+    """Obtener detalles de varios puntos de un mismo tipo en una sola llamada"""
+    tipo = solicitud.tipo
+    if tipo not in CARGADORES:
+        raise HTTPException(status_code=404, detail="Tipo de dato no encontrado")
+    
+    if not dataset_listo(tipo):
+        raise HTTPException(status_code=503, detail=f"Dataset {tipo} cargando")
+    
+    if tipo not in COLUMNAS_POR_TIPO:
+        raise HTTPException(status_code=400, detail="Tipo no válido")
+    
+    dataset = datasets_cache[tipo]
+    puntos = []
+    no_encontrados = []
+    for punto_id in solicitud.ids:
+        posicion = dataset.ids.get(punto_id)
+        if posicion is None:
+            no_encontrados.append(punto_id)
+        else:
+            puntos.append(detalle_punto(dataset, punto_id, posicion))
     
     return {
-        "id": punto_id,
         "tipo": tipo,
-        "nombre": str(row.get('nombre_institucion', row.get('nombre_establecimiento', 'Punto OEFA'))),
-        "coordenadas": {
-            "latitud": float(row['latitud']),
-            "longitud": float(row['longitud'])
-        },
-        "info_completa": row.to_dict()
+        "puntos": puntos,
+        "total": len(puntos),
+        "no_encontrados": no_encontrados
     }
 
 @app.get("/api/filtros/opciones")
-async def get_opciones_filtros():
-    """Obtener opciones disponibles para filtros"""
-    if not datasets_cache:
+async def get_opciones_filtros(request: Request):
+    """Obtener opciones disponibles para filtros (catálogo precalculado)"""
+    if not catalogo_cache:
         raise HTTPException(status_code=503, detail="Datasets no cargados")
     
-    opciones = {
-        "ubicaciones": [],
-        "tipos": ["oefa", "educacion", "salud", "poblacion"],
-        "total_registros": sum(len(df) for df in datasets_cache.values())
+    headers = {
+        "ETag": catalogo_cache["etag"],
+        "Last-Modified": catalogo_cache["last_modified"],
+        "Cache-Control": "no-cache"
     }
     
-    # Recopilar ubicaciones únicas
-    ubicaciones_set = set()
-    for df in datasets_cache.values():
-        if 'departamento' in df.columns:
-            ubicaciones_set.update(df['departamento'].dropna().unique())
-    
-    opciones["ubicaciones"] = sorted(list(ubicaciones_set))
+    # Revalidación: el cliente ya tiene esta versión del catálogo
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if catalogo_cache["etag"] in [e.strip() for e in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since") is not None:
+        if no_modificado_desde(catalogo_cache["last_modified"], request.headers["if-modified-since"]):
+            return Response(status_code=304, headers=headers)
     
-    return opciones
+    return JSONResponse(content=catalogo_cache["contenido"], headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
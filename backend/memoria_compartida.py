@@ -0,0 +1,199 @@
+"""
+Datasets compartidos entre workers de uvicorn mediante memory-map.
+
+Con DATASETS_MMAP=1, el primer worker que arranca exporta cada tipo a
+DATAFINAL/snapshot/mmap/<tipo>/: las columnas numéricas y los códigos de las
+categóricas como .npy, y los arreglos del índice espacial. Todos los workers
+abren esos archivos en modo solo lectura (np.load(mmap_mode='r')), así el
+sistema operativo comparte las mismas páginas entre procesos. Las columnas
+de texto libre se leen de un Parquet aparte en cada worker.
+
+Las categóricas se rearman con Categorical.from_codes sobre el arreglo
+mapeado, con el mismo dtype de códigos que eligió pandas al exportar y sin
+validar, de modo que no se copian ni se recorren. También se comparten los
+días de muestreo por fila. Cada worker sigue construyendo sus estructuras
+derivadas (ids, clusters, catálogo, cubo de series, ubicaciones, nombres) y
+las categorías y el texto libre; memoria_dataset() mide cuánto queda en
+páginas compartidas y cuánto es propio del worker.
+
+meta.json guarda la huella de los CSV de origen con que se exportó: la
+exportación solo se usa si coincide exactamente con la esperada.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from indice_espacial import ARREGLOS_FECHA, ARREGLOS_INDICE, IndiceEspacial
+from snapshot import SNAPSHOT_DIR, _normalizar_objetos, huella_fuentes
+
+MMAP_HABILITADO = os.getenv("DATASETS_MMAP", "0") == "1"
+MMAP_DIR = "mmap"
+
+
+def directorio_mmap(data_path, tipo):
+    return Path(data_path) / SNAPSHOT_DIR / MMAP_DIR / tipo
+
+
+def mmap_vigente(data_path, tipo, fuentes, huella=None):
+    """La exportación existe y se hizo con la huella esperada de los CSV (por defecto la actual)"""
+    try:
+        meta = json.loads((directorio_mmap(data_path, tipo) / "meta.json").read_text())
+    except (OSError, ValueError):
+        return False
+    if huella is None:
+        huella = huella_fuentes(data_path, fuentes)
+    return meta.get('huella') == huella
+
+
+@contextmanager
+def bloqueo_exportacion(data_path):
+    """Lock de archivo para que un solo worker exporte a la vez"""
+    directorio = Path(data_path) / SNAPSHOT_DIR / MMAP_DIR
+    directorio.mkdir(parents=True, exist_ok=True)
+    with open(directorio / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def exportar_mmap(data_path, tipo, df, indice, huella, dias=None):
+    """
+    Escribir un tipo en formato memory-map (se reemplaza la exportación previa)
+
+    Args:
+        huella: huella de los CSV tomada antes de leerlos
+        dias: día de muestreo de cada fila (se comparte entre workers)
+    """
+    destino = directorio_mmap(data_path, tipo)
+    temporal = destino.with_name(f".{tipo}.tmp")
+    if temporal.exists():
+        shutil.rmtree(temporal)
+    temporal.mkdir(parents=True)
+
+    columnas = []
+    texto = []
+    for i, col in enumerate(df.columns):
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            np.save(temporal / f"col_{i}.npy", serie.cat.codes.to_numpy())
+            columnas.append({'nombre': col, 'clase': 'categorica',
+                             'categorias': [str(c) for c in serie.cat.categories]})
+        elif serie.dtype.kind in 'biuf':
+            np.save(temporal / f"col_{i}.npy", serie.to_numpy())
+            columnas.append({'nombre': col, 'clase': 'numerica'})
+        else:
+            texto.append(col)
+            columnas.append({'nombre': col, 'clase': 'texto'})
+
+    if texto:
+        _normalizar_objetos(df[texto].copy()).to_parquet(temporal / "texto.parquet", index=False)
+    indice.guardar(temporal / "indice")
+    if dias is not None:
+        np.save(temporal / "dias.npy", np.asarray(dias, dtype=np.int64))
+
+    meta = {'registros': len(df), 'columnas': columnas, 'huella': huella, 'dias': dias is not None}
+    (temporal / "meta.json").write_text(json.dumps(meta, ensure_ascii=False))
+
+    if destino.exists():
+        shutil.rmtree(destino)
+    temporal.rename(destino)
+
+
+def adjuntar_mmap(data_path, tipo):
+    """
+    Abrir un tipo exportado en modo solo lectura
+
+    Returns:
+        (df, indice, dias): DataFrame cuyas columnas numéricas y categóricas
+        apuntan a los archivos memory-map, el índice espacial y los días de
+        muestreo también mapeados (dias es None en exportaciones sin fechas)
+    """
+    directorio = directorio_mmap(data_path, tipo)
+    meta = json.loads((directorio / "meta.json").read_text())
+
+    texto = None
+    if any(info['clase'] == 'texto' for info in meta['columnas']):
+        texto = pd.read_parquet(directorio / "texto.parquet")
+
+    datos = {}
+    for i, info in enumerate(meta['columnas']):
+        if info['clase'] == 'texto':
+            datos[info['nombre']] = texto[info['nombre']]
+            continue
+        arreglo = np.load(directorio / f"col_{i}.npy", mmap_mode='r')
+        if info['clase'] == 'categorica':
+            # Los códigos ya se validaron al exportar: sin validate no se copian ni se recorren
+            datos[info['nombre']] = pd.Categorical.from_codes(
+                arreglo, categories=info['categorias'], validate=False
+            )
+        else:
+            datos[info['nombre']] = arreglo
+
+    df = pd.DataFrame(datos, copy=False)
+    dias = np.load(directorio / "dias.npy", mmap_mode='r') if meta.get('dias') else None
+    indice = IndiceEspacial.cargar(directorio / "indice")
+    indice.huella = meta.get('huella')  # Versión de la exportación (la verifican los workers de exposición)
+    return df, indice, dias
+
+
+def huella_exportacion(directorio_indice):
+    """Huella de los CSV de la exportación que contiene un índice guardado, o None"""
+    try:
+        meta = json.loads((Path(directorio_indice).parent / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    return meta.get('huella')
+
+
+def _mapeado(arreglo):
+    """El arreglo (o alguna de sus bases) es un memory-map"""
+    while isinstance(arreglo, np.ndarray):
+        if isinstance(arreglo, np.memmap):
+            return True
+        arreglo = arreglo.base
+    return False
+
+
+def memoria_dataset(df, indice=None, dias=None):
+    """
+    Bytes de un dataset en páginas compartidas y propios del proceso
+
+    Args:
+        df: DataFrame adjuntado
+        indice: índice espacial (se cuentan sus arreglos)
+        dias: días de muestreo por fila
+
+    Returns:
+        (compartidos, propios) en bytes
+    """
+    compartidos = propios = 0
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.array.codes
+            total = int(serie.memory_usage(deep=True, index=False))
+            if _mapeado(codigos):
+                compartidos += codigos.nbytes
+                propios += total - codigos.nbytes
+            else:
+                propios += total
+        elif _mapeado(serie.to_numpy()):
+            compartidos += serie.to_numpy().nbytes
+        else:
+            propios += int(serie.memory_usage(deep=True, index=False))
+    arreglos = [getattr(indice, nombre, None) for nombre in ARREGLOS_INDICE + ARREGLOS_FECHA]
+    for arreglo in [*arreglos, dias]:
+        if _mapeado(arreglo):
+            compartidos += arreglo.nbytes
+        elif arreglo is not None:
+            propios += np.asarray(arreglo).nbytes
+    return compartidos, propios
@@ -0,0 +1,225 @@
+"""
+Métricas de la API en formato de texto de Prometheus y perfil por solicitud.
+
+MiddlewareMetricas mide cada solicitud HTTP (por ruta de FastAPI, no por URL,
+para acotar las series). Dentro de los endpoints, `etapa(operacion, nombre)`
+mide un tramo del camino crítico (radio, límite, serialización, JSON...) y
+opcionalmente las filas que procesó; todo queda en histogramas que se
+exponen en /metrics.
+
+Con ?profile=1 la solicitud además guarda sus etapas en un perfil (contextvar
+compartida con los hilos del threadpool): se devuelve en el encabezado
+Server-Timing y, si la respuesta es un objeto JSON, en la clave "perfil".
+Solo las respuestas JSON se retienen hasta el final; las demás (SSE, CSV)
+salen a medida que se generan, con el Server-Timing de las etapas previas al
+primer byte.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PREFIJO = "rrh_"
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LIMITES_FILAS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+perfil_actual = ContextVar("perfil_actual", default=None)  # Lista de etapas o None
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor):
+    return repr(float(valor)) if valor != float("inf") else "+Inf"
+
+
+class Histograma:
+    """Histograma acumulado por combinación de etiquetas (seguro entre hilos)"""
+
+    def __init__(self, nombre, ayuda, etiquetas, limites):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = limites
+        self.series = {}  # valores de etiquetas -> [conteos por cubeta, suma, total]
+        self._bloqueo = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        cubeta = bisect_left(self.limites, valor)
+        with self._bloqueo:
+            serie = self.series.get(etiquetas)
+            if serie is None:
+                serie = self.series[etiquetas] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][cubeta] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._bloqueo:
+            series = [(clave, list(conteos), suma, total) for clave, (conteos, suma, total) in self.series.items()]
+        for clave, conteos, suma, total in sorted(series):
+            base = ",".join(f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave))
+            separador = "," if base else ""
+            acumulado = 0
+            for limite, conteo in zip((*self.limites, float("inf")), conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{base}{separador}le="{_numero(limite)}"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {suma!r}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {total}")
+        return lineas
+
+
+class Indicador:
+    """Gauge calculado al exportar: funcion() -> {tupla de etiquetas: valor}"""
+
+    def __init__(self, nombre, ayuda, etiquetas, funcion):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.funcion = funcion
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        for clave, valor in sorted(self.funcion().items()):
+            base = ",".join(f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave))
+            lineas.append(f"{self.nombre}{{{base}}} {_numero(valor)}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self.metricas = []
+
+    def agregar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        lineas = []
+        for metrica in self.metricas:
+            lineas.extend(metrica.exportar())
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+SOLICITUDES_SEGUNDOS = registro.agregar(Histograma(
+    "http_solicitud_segundos", "Duración de las solicitudes HTTP", ("metodo", "ruta", "estado"), LIMITES_SEGUNDOS))
+ETAPA_SEGUNDOS = registro.agregar(Histograma(
+    "etapa_segundos", "Duración de cada etapa interna", ("operacion", "etapa"), LIMITES_SEGUNDOS))
+ETAPA_FILAS = registro.agregar(Histograma(
+    "etapa_filas", "Filas procesadas en cada etapa interna", ("operacion", "etapa"), LIMITES_FILAS))
+
+
+class Tramo:
+    """Etapa en curso; el código medido puede informar las filas procesadas"""
+
+    __slots__ = ("filas", "detalle")
+
+    def __init__(self, detalle):
+        self.filas = None
+        self.detalle = detalle
+
+
+@contextmanager
+def etapa(operacion, nombre, detalle=None):
+    """Medir un tramo de código: histogramas siempre, perfil solo con ?profile=1"""
+    tramo = Tramo(detalle)
+    inicio = time.perf_counter()
+    try:
+        yield tramo
+    finally:
+        duracion = time.perf_counter() - inicio
+        ETAPA_SEGUNDOS.observar(duracion, operacion, nombre)
+        if tramo.filas is not None:
+            ETAPA_FILAS.observar(tramo.filas, operacion, nombre)
+        perfil = perfil_actual.get()
+        if perfil is not None:
+            entrada = {"operacion": operacion, "etapa": nombre, "ms": round(duracion * 1000, 3)}
+            if tramo.filas is not None:
+                entrada["filas"] = int(tramo.filas)
+            if tramo.detalle is not None:
+                entrada["detalle"] = tramo.detalle
+            perfil.append(entrada)
+
+
+def _server_timing(perfil, total_ms):
+    partes = [f'{e["etapa"]}{"-" + str(e["detalle"]) if "detalle" in e else ""};dur={e["ms"]}' for e in perfil]
+    partes.append(f"total;dur={total_ms}")
+    return ", ".join(partes)
+
+
+def _es_json(inicio_respuesta):
+    """La respuesta es JSON (solo esas se retienen para agregarles el perfil)"""
+    return any(k.lower() == b"content-type" and v.startswith(b"application/json")
+               for k, v in inicio_respuesta.get("headers", []))
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: tiempo por ruta y, con ?profile=1, el perfil de etapas"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfilar = b"profile=1" in scope.get("query_string", b"").split(b"&")
+        perfil = [] if perfilar else None
+        token = perfil_actual.set(perfil)
+        inicio = time.perf_counter()
+        estado = {"codigo": 500, "inicio": None, "cuerpo": []}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                if perfilar and _es_json(mensaje):
+                    estado["inicio"] = mensaje  # Se envía junto con el cuerpo
+                    return
+                if perfilar:
+                    # Streaming y demás: solo Server-Timing hasta aquí, el cuerpo pasa sin esperar
+                    total_ms = round((time.perf_counter() - inicio) * 1000, 3)
+                    mensaje = {**mensaje, "headers": [*mensaje.get("headers", []),
+                                                      (b"server-timing", _server_timing(perfil, total_ms).encode())]}
+            elif estado["inicio"] is not None and mensaje["type"] == "http.response.body":
+                estado["cuerpo"].append(mensaje.get("body", b""))
+                if mensaje.get("more_body", False):
+                    return
+                await self._enviar_con_perfil(send, estado, perfil, inicio)
+                return
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfil_actual.reset(token)
+            ruta = scope.get("route")
+            SOLICITUDES_SEGUNDOS.observar(time.perf_counter() - inicio, scope["method"],
+                                          getattr(ruta, "path", "sin_ruta"), str(estado["codigo"]))
+
+    @staticmethod
+    async def _enviar_con_perfil(send, estado, perfil, inicio):
+        total_ms = round((time.perf_counter() - inicio) * 1000, 3)
+        inicio_respuesta = estado["inicio"]
+        encabezados = [(k, v) for k, v in inicio_respuesta["headers"] if k.lower() != b"content-length"]
+        cuerpo = b"".join(estado["cuerpo"])
+
+        try:
+            contenido = json.loads(cuerpo)
+            if isinstance(contenido, dict):
+                contenido["perfil"] = {"etapas": perfil, "total_ms": total_ms}
+                cuerpo = json.dumps(contenido, ensure_ascii=False).encode()
+        except ValueError:
+            pass
+
+        encabezados.append((b"content-length", str(len(cuerpo)).encode()))
+        encabezados.append((b"server-timing", _server_timing(perfil, total_ms).encode()))
+        await send({**inicio_respuesta, "headers": encabezados})
+        await send({"type": "http.response.body", "body": cuerpo})
@@ -0,0 +1,73 @@
+"""
+Recarga en caliente de los CSV de DATAFINAL.
+
+VigilanteFuentes revisa cada RECARGA_INTERVALO segundos la huella (nombre,
+tamaño y fecha) de los CSV de cada tipo y la compara con la de la versión
+publicada. Un tipo se recarga cuando su huella cambió y además se mantuvo
+igual en dos revisiones seguidas, así no se lee un archivo que todavía se
+está copiando. Con RECARGA_INTERVALO=0 no se vigila la carpeta y la recarga
+solo se pide con POST /api/admin/recargar.
+"""
+
+import os
+import threading
+
+from snapshot import huella_fuentes
+
+RECARGA_INTERVALO = float(os.getenv("RECARGA_INTERVALO", "10"))
+
+
+class VigilanteFuentes:
+    """Hilo que detecta cambios en los CSV de origen de cada tipo"""
+
+    def __init__(self, data_path, fuentes, huella_publicada, recargar, intervalo=RECARGA_INTERVALO):
+        """
+        Args:
+            data_path (Path): Carpeta DATAFINAL
+            fuentes (dict): {tipo: [CSV de origen]}
+            huella_publicada (callable): tipo -> huella de la versión en memoria (None si no hay)
+            recargar (callable): Recibe la lista de tipos cambiados (se llama desde el hilo)
+            intervalo (float): Segundos entre revisiones (0 = desactivado)
+        """
+        self.data_path = data_path
+        self.fuentes = fuentes
+        self.huella_publicada = huella_publicada
+        self.recargar = recargar
+        self.intervalo = intervalo
+        self._vistas = {}  # tipo -> huella observada en la revisión anterior
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def revisar(self):
+        """Tipos cuyos CSV cambiaron y ya no se están escribiendo"""
+        cambiados = []
+        for tipo, archivos in self.fuentes.items():
+            publicada = self.huella_publicada(tipo)
+            if publicada is None:  # Todavía cargando (o falló): no hay versión que comparar
+                self._vistas.pop(tipo, None)
+                continue
+            actual = huella_fuentes(self.data_path, archivos)
+            if actual != publicada and self._vistas.get(tipo) == actual:
+                cambiados.append(tipo)
+            self._vistas[tipo] = actual
+        return cambiados
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                cambiados = self.revisar()
+                if cambiados:
+                    print(f"👀 Cambios en DATAFINAL: {', '.join(cambiados)}")
+                    self.recargar(cambiados)
+            except Exception as e:
+                print(f"⚠️ Error revisando DATAFINAL: {e}")
+
+    def iniciar(self):
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+        self._hilo = threading.Thread(target=self._ciclo, name="vigilante-datafinal", daemon=True)
+        self._hilo.start()
+        print(f"👀 Vigilando DATAFINAL cada {self.intervalo:g} s")
+
+    def detener(self):
+        self._detener.set()
@@ -0,0 +1,210 @@
+"""
+Cache persistente de completaciones (SQLite) direccionada por contenido
+
+La clave es el SHA-256 de todo lo que determina la respuesta: modelo,
+mensaje del sistema, prompt, temperatura y max_tokens. El mismo
+`report_data` produce el mismo prompt, así un reporte ya generado no se
+vuelve a pagar. Las entradas vencen por antigüedad y, si se supera el máximo,
+se descartan las menos usadas recientemente. Las llamadas simultáneas con la
+misma clave comparten una sola completación.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPORTES_CACHE = os.getenv("REPORTES_CACHE", "1") == "1"
+REPORTES_CACHE_RUTA = Path(os.getenv(
+    "REPORTES_CACHE_RUTA", str(Path(__file__).resolve().parent.parent / "cache_reportes.sqlite3")
+))
+REPORTES_CACHE_MAX_ENTRADAS = int(os.getenv("REPORTES_CACHE_MAX_ENTRADAS", "5000"))
+REPORTES_CACHE_TTL_DIAS = float(os.getenv("REPORTES_CACHE_TTL_DIAS", "30"))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS completaciones (
+    clave TEXT PRIMARY KEY,
+    modelo TEXT NOT NULL,
+    resultado TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    usado REAL NOT NULL,
+    aciertos INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS completaciones_usado ON completaciones (usado);
+CREATE INDEX IF NOT EXISTS completaciones_creado ON completaciones (creado);
+"""
+
+
+def clave_completacion(
+    model: str, system_message: Optional[str], prompt: str, temperature: float, max_tokens: int
+) -> str:
+    """SHA-256 de los parámetros que determinan la respuesta"""
+    contenido = json.dumps(
+        {
+            "model": model,
+            "system_message": system_message,
+            "prompt": prompt,
+            "temperature": float(temperature),
+            "max_tokens": int(max_tokens),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheCompletaciones:
+    """Completaciones guardadas en SQLite con vencimiento y desalojo LRU"""
+
+    def __init__(
+        self,
+        ruta: Path = REPORTES_CACHE_RUTA,
+        max_entradas: int = REPORTES_CACHE_MAX_ENTRADAS,
+        ttl_dias: Optional[float] = REPORTES_CACHE_TTL_DIAS,
+    ):
+        self.ruta = Path(ruta)
+        self.max_entradas = max_entradas
+        self.ttl = ttl_dias * 86400 if ttl_dias else None
+        self.hits = 0
+        self.misses = 0
+        self.tokens_ahorrados = 0  # En este proceso; el histórico sale de la columna aciertos
+        self.desalojadas = 0
+        self._en_curso: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Una conexión compartida entre hilos (asyncio.to_thread), serializada con el lock
+        self._conexion = sqlite3.connect(str(self.ruta), check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(ESQUEMA)
+
+    def _vencida(self, creado: float, ahora: float) -> bool:
+        return self.ttl is not None and ahora - creado > self.ttl
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado para la clave, o None si no existe o venció"""
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT resultado, tokens, creado FROM completaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or self._vencida(fila[2], ahora):
+                if fila is not None:
+                    self._conexion.execute("DELETE FROM completaciones WHERE clave = ?", (clave,))
+                    self.desalojadas += 1
+                self.misses += 1
+                return None
+            self._conexion.execute(
+                "UPDATE completaciones SET usado = ?, aciertos = aciertos + 1 WHERE clave = ?", (ahora, clave)
+            )
+            self.hits += 1
+            self.tokens_ahorrados += fila[1]
+        return json.loads(fila[0])
+
+    def guardar(self, clave: str, resultado: Dict[str, Any]) -> None:
+        """Guardar un resultado y desalojar lo vencido o lo que exceda el máximo"""
+        ahora = time.time()
+        tokens = int(resultado.get("usage", {}).get("total_tokens") or 0)
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO completaciones (clave, modelo, resultado, tokens, creado, usado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (clave, str(resultado.get("model")), json.dumps(resultado, ensure_ascii=False), tokens, ahora, ahora),
+            )
+            self._desalojar(ahora)
+
+    def _desalojar(self, ahora: float) -> None:
+        if self.ttl is not None:
+            self.desalojadas += self._conexion.execute(
+                "DELETE FROM completaciones WHERE creado < ?", (ahora - self.ttl,)
+            ).rowcount
+        total = self._conexion.execute("SELECT COUNT(*) FROM completaciones").fetchone()[0]
+        if total > self.max_entradas:
+            self.desalojadas += self._conexion.execute(
+                "DELETE FROM completaciones WHERE clave IN "
+                "(SELECT clave FROM completaciones ORDER BY usado LIMIT ?)",
+                (total - self.max_entradas,),
+            ).rowcount
+
+    async def resolver(
+        self, clave: str, generar: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Resultado de la cache o generado (y guardado) si falta
+
+        Returns:
+            (resultado, acierto): acierto es True si no hubo que llamar a la API
+        """
+        resultado = await asyncio.to_thread(self.obtener, clave)
+        if resultado is not None:
+            return resultado, True
+
+        # Otra llamada ya genera esta misma clave: esperar su resultado
+        en_curso = self._en_curso.get(clave)
+        if en_curso is not None:
+            try:
+                resultado = await asyncio.shield(en_curso)
+            except asyncio.CancelledError:
+                if not en_curso.cancelled():  # Se canceló esta llamada, no la otra
+                    raise
+                return await self.resolver(clave, generar)
+            with self._lock:
+                self.misses -= 1  # obtener() la contó como fallo
+                self.hits += 1
+                self.tokens_ahorrados += int(resultado.get("usage", {}).get("total_tokens") or 0)
+            return resultado, True
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_curso[clave] = futuro
+        try:
+            resultado = await generar()
+            try:
+                await asyncio.to_thread(self.guardar, clave, resultado)
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo guardar la completación en la cache: {e}")
+            futuro.set_result(resultado)
+            return resultado, False
+        except asyncio.CancelledError:
+            futuro.cancel()  # Quien esperaba esta clave la genera por su cuenta
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            futuro.exception()  # Marcada como consultada si nadie la esperaba
+            raise
+        finally:
+            self._en_curso.pop(clave, None)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas, tokens, ahorrados, aciertos = self._conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0), COALESCE(SUM(tokens * aciertos), 0), "
+                "COALESCE(SUM(aciertos), 0) FROM completaciones"
+            ).fetchone()
+            consultas = self.hits + self.misses
+            return {
+                "ruta": str(self.ruta),
+                "entradas": entradas,
+                "max_entradas": self.max_entradas,
+                "ttl_dias": self.ttl / 86400 if self.ttl else None,
+                "bytes": self.ruta.stat().st_size if self.ruta.exists() else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+                "desalojadas": self.desalojadas,
+                "tokens_ahorrados": self.tokens_ahorrados,
+                "tokens_guardados": tokens,
+                "tokens_ahorrados_historico": ahorrados,
+                "aciertos_historico": aciertos,
+            }
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._conexion.execute("DELETE FROM completaciones")
@@ -0,0 +1,237 @@
+"""
+Contabilidad de tokens, latencia y costo de las llamadas a OpenAI
+
+Cada llamada (completación, streaming, conversación) se registra por modelo
+solicitado y tipo de reporte: llamadas, errores por tipo, aciertos de cache,
+tokens de entrada y salida, costo estimado y una muestra acotada de
+latencias (y tiempo al primer token en streaming) para los percentiles. Sirve
+para dimensionar los lotes de reportes y comparar modelos por costo.
+
+Los precios son USD por millón de tokens (entrada, salida); OPENAI_PRECIOS
+permite reemplazarlos o agregar modelos con un JSON {"modelo": [entrada, salida]}.
+"""
+
+import copy
+import csv
+import io
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# USD por millón de tokens (entrada, salida); se busca el prefijo más largo del modelo
+PRECIOS_MODELOS: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "o3-mini": (1.10, 4.40),
+}
+PRECIOS_MODELOS.update({m: tuple(p) for m, p in json.loads(os.getenv("OPENAI_PRECIOS", "{}")).items()})
+
+METRICAS_IA_MUESTRAS = int(os.getenv("METRICAS_IA_MUESTRAS", "2048"))  # Latencias guardadas por serie
+PERCENTILES = (50, 90, 95, 99)
+
+COLUMNAS_CSV = [
+    "modelo", "tipo_reporte", "llamadas", "exitosas", "errores", "tasa_error", "aciertos_cache",
+    "prompt_tokens", "completion_tokens", "total_tokens", "tokens_por_llamada",
+    "costo_usd", "costo_por_llamada_usd", "costo_ahorrado_usd",
+    *(f"latencia_p{p}_s" for p in PERCENTILES), "latencia_media_s",
+    *(f"primer_token_p{p}_s" for p in PERCENTILES),
+]
+
+
+def precio_modelo(modelo: str) -> Optional[Tuple[float, float]]:
+    """(entrada, salida) en USD por millón de tokens, o None si el modelo no tiene precio"""
+    candidatos = [m for m in PRECIOS_MODELOS if modelo.startswith(m)]
+    return PRECIOS_MODELOS[max(candidatos, key=len)] if candidatos else None
+
+
+def costo_estimado(modelo: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    precio = precio_modelo(modelo)
+    if precio is None:
+        return None
+    return (prompt_tokens * precio[0] + completion_tokens * precio[1]) / 1_000_000
+
+
+def percentil(ordenados: List[float], p: float) -> Optional[float]:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenados:
+        return None
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+class Muestra:
+    """Muestreo de reservorio: como máximo `tamano` valores representativos"""
+
+    def __init__(self, tamano: int):
+        self.tamano = tamano
+        self.valores: List[float] = []
+        self.vistos = 0
+
+    def agregar(self, valor: float) -> None:
+        self.vistos += 1
+        if len(self.valores) < self.tamano:
+            self.valores.append(valor)
+        else:
+            j = random.randrange(self.vistos)
+            if j < self.tamano:
+                self.valores[j] = valor
+
+
+class SerieIA:
+    """Acumulados de un (modelo, tipo de reporte)"""
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores: Counter = Counter()
+        self.aciertos_cache = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.costo = 0.0
+        self.costo_ahorrado = 0.0
+        self.sin_precio = False
+        self.latencia_total = 0.0
+        self.latencias = Muestra(METRICAS_IA_MUESTRAS)
+        self.primer_token = Muestra(METRICAS_IA_MUESTRAS)
+
+
+class MetricasIA:
+    """Registro de llamadas a la API por modelo y tipo de reporte (seguro entre hilos)"""
+
+    def __init__(self):
+        self.series: Dict[Tuple[str, str], SerieIA] = {}
+        self.desde = time.time()
+        self._lock = threading.Lock()
+
+    def _serie(self, modelo: str, tipo_reporte: str) -> SerieIA:
+        clave = (modelo, tipo_reporte)
+        if clave not in self.series:
+            self.series[clave] = SerieIA()
+        return self.series[clave]
+
+    def registrar(
+        self,
+        modelo: str,
+        tipo_reporte: str,
+        latencia: float,
+        usage: Optional[Dict[str, Any]] = None,
+        error: Optional[Exception] = None,
+        cached: bool = False,
+        primer_token: Optional[float] = None,
+    ) -> None:
+        """
+        Registrar una llamada
+
+        Args:
+            modelo (str): Modelo solicitado (agrupa éxitos y errores del mismo modelo)
+            tipo_reporte (str): 'oefa', 'quiz', 'chat', 'completion'...
+            latencia (float): Segundos hasta la respuesta completa (o el error)
+            usage (dict, optional): prompt_tokens / completion_tokens de la respuesta
+            error (Exception, optional): Error de la llamada (cuenta como fallida)
+            cached (bool): La respuesta vino de la cache (sin costo ni latencia de API)
+            primer_token (float, optional): Segundos hasta el primer token (streaming)
+        """
+        usage = usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        costo = costo_estimado(modelo, prompt_tokens, completion_tokens)
+        with self._lock:
+            serie = self._serie(modelo, tipo_reporte)
+            if cached:
+                serie.aciertos_cache += 1
+                serie.costo_ahorrado += costo or 0.0
+                return
+            serie.llamadas += 1
+            if error is not None:
+                serie.errores[type(error).__name__] += 1
+                return
+            # Percentiles solo de respuestas exitosas (un 429 inmediato no es latencia del modelo)
+            serie.latencia_total += latencia
+            serie.latencias.agregar(latencia)
+            if primer_token is not None:
+                serie.primer_token.agregar(primer_token)
+            serie.prompt_tokens += prompt_tokens
+            serie.completion_tokens += completion_tokens
+            serie.costo += costo or 0.0
+            serie.sin_precio |= costo is None
+
+    def resumen(self, modelo: Optional[str] = None, tipo_reporte: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Una fila por (modelo, tipo de reporte) con tokens, costo, errores y percentiles"""
+        with self._lock:
+            copias = [
+                (clave, copy.copy(serie), sorted(serie.latencias.valores), sorted(serie.primer_token.valores),
+                 dict(serie.errores))
+                for clave, serie in sorted(self.series.items())
+                if (modelo is None or clave[0] == modelo) and (tipo_reporte is None or clave[1] == tipo_reporte)
+            ]
+
+        filas = []
+        for (modelo_serie, tipo_serie), serie, latencias, primeros, errores in copias:
+            total_errores = sum(errores.values())
+            exitosas = serie.llamadas - total_errores
+            total_tokens = serie.prompt_tokens + serie.completion_tokens
+            filas.append({
+                "modelo": modelo_serie,
+                "tipo_reporte": tipo_serie,
+                "llamadas": serie.llamadas,
+                "exitosas": exitosas,
+                "errores": total_errores,
+                "errores_por_tipo": errores,
+                "tasa_error": round(total_errores / serie.llamadas, 4) if serie.llamadas else 0.0,
+                "aciertos_cache": serie.aciertos_cache,
+                "prompt_tokens": serie.prompt_tokens,
+                "completion_tokens": serie.completion_tokens,
+                "total_tokens": total_tokens,
+                "tokens_por_llamada": round(total_tokens / exitosas, 1) if exitosas else None,
+                "costo_usd": None if serie.sin_precio and not serie.costo else round(serie.costo, 6),
+                "costo_por_llamada_usd": round(serie.costo / exitosas, 6) if exitosas and serie.costo else None,
+                "costo_ahorrado_usd": round(serie.costo_ahorrado, 6),
+                **{f"latencia_p{p}_s": _redondear(percentil(latencias, p)) for p in PERCENTILES},
+                "latencia_media_s": round(serie.latencia_total / exitosas, 4) if exitosas else None,
+                **{f"primer_token_p{p}_s": _redondear(percentil(primeros, p)) for p in PERCENTILES},
+            })
+        return filas
+
+    def totales(self) -> Dict[str, Any]:
+        filas = self.resumen()
+        llamadas = sum(f["llamadas"] for f in filas)
+        errores = sum(f["errores"] for f in filas)
+        return {
+            "desde": self.desde,
+            "llamadas": llamadas,
+            "errores": errores,
+            "tasa_error": round(errores / llamadas, 4) if llamadas else 0.0,
+            "aciertos_cache": sum(f["aciertos_cache"] for f in filas),
+            "total_tokens": sum(f["total_tokens"] for f in filas),
+            "costo_usd": round(sum(f["costo_usd"] or 0.0 for f in filas), 6),
+            "costo_ahorrado_usd": round(sum(f["costo_ahorrado_usd"] for f in filas), 6),
+        }
+
+    def csv(self, modelo: Optional[str] = None, tipo_reporte: Optional[str] = None) -> str:
+        """Resumen en CSV (una fila por modelo y tipo de reporte)"""
+        salida = io.StringIO()
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS_CSV, extrasaction="ignore")
+        escritor.writeheader()
+        escritor.writerows(self.resumen(modelo, tipo_reporte))
+        return salida.getvalue()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.series.clear()
+            self.desde = time.time()
+
+
+def _redondear(valor: Optional[float]) -> Optional[float]:
+    return None if valor is None else round(valor, 4)
+
+
+# Registro global del proceso (compartido por todas las instancias del cliente)
+metricas_ia = MetricasIA()
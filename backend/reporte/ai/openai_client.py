@@ -1,18 +1,85 @@
 """
 Cliente mejorado para OpenAI con soporte para modelos avanzados
+
+Los reportes en lote (`generate_oefa_reports`) corren con un máximo de
+llamadas simultáneas y reintentan con espera exponencial los errores de
+límite de tasa y los transitorios. Para probarlos sin gastar tokens basta
+apuntar OPENAI_BASE_URL a un servidor local compatible con la API de OpenAI.
+
+Importar este módulo no hace trabajo: el SDK de OpenAI, `config` y el
+cliente se cargan en el primer uso de `openai_client` (o get_openai_client).
+Las llamadas asíncronas de un mismo event loop comparten un pool HTTP con
+límites de conexiones y timeouts configurables (OPENAI_*).
 """
 
 import asyncio
 import logging
+import os
+import random
+import threading
 import time
-from typing import Dict, List, Optional, Any
-from openai import OpenAI, AsyncOpenAI
-from config import Config
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from ai.cache_completaciones import REPORTES_CACHE, CacheCompletaciones, clave_completacion
+from ai.metricas_ia import metricas_ia
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Reportes en lote: llamadas simultáneas, intentos por reporte y espera entre intentos (segundos)
+REPORTES_CONCURRENCIA = int(os.getenv("REPORTES_CONCURRENCIA", "8"))
+REPORTES_INTENTOS = int(os.getenv("REPORTES_INTENTOS", "5"))
+REPORTES_ESPERA_BASE = float(os.getenv("REPORTES_ESPERA_BASE", "1.0"))
+REPORTES_ESPERA_MAXIMA = float(os.getenv("REPORTES_ESPERA_MAXIMA", "60.0"))
+
+# Pool HTTP compartido por el cliente asíncrono (conexiones y timeouts en segundos)
+OPENAI_MAX_CONEXIONES = int(os.getenv("OPENAI_MAX_CONEXIONES", "100"))
+OPENAI_MAX_CONEXIONES_LIBRES = int(os.getenv("OPENAI_MAX_CONEXIONES_LIBRES", "20"))
+OPENAI_KEEPALIVE = float(os.getenv("OPENAI_KEEPALIVE", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_TIMEOUT_CONEXION = float(os.getenv("OPENAI_TIMEOUT_CONEXION", "10"))
+
+
+def errores_reintentables() -> Tuple[type, ...]:
+    """Errores que se reintentan: límite de tasa (429) y fallas transitorias del servicio"""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def crear_transporte_async():
+    """Cliente httpx con pool acotado para el SDK (resto de opciones como las del SDK)"""
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultAsyncHttpxClient, Timeout
+
+    # Clases del mismo httpx que usa el SDK
+    Limits = type(DEFAULT_CONNECTION_LIMITS)
+    return DefaultAsyncHttpxClient(
+        limits=Limits(
+            max_connections=OPENAI_MAX_CONEXIONES,
+            max_keepalive_connections=OPENAI_MAX_CONEXIONES_LIBRES,
+            keepalive_expiry=OPENAI_KEEPALIVE,
+        ),
+        timeout=Timeout(OPENAI_TIMEOUT, connect=OPENAI_TIMEOUT_CONEXION),
+    )
+
+
+def espera_reintento(error: Exception, intento: int) -> float:
+    """
+    Segundos a esperar antes del siguiente intento
+
+    Espera exponencial con jitter completo; si la API envía Retry-After
+    (típico en 429) se espera al menos eso.
+    """
+    espera = random.uniform(0, min(REPORTES_ESPERA_MAXIMA, REPORTES_ESPERA_BASE * 2 ** (intento - 1)))
+    respuesta = getattr(error, "response", None)
+    retry_after = respuesta.headers.get("retry-after") if respuesta is not None else None
+    try:
+        if retry_after is not None:
+            espera = max(espera, min(float(retry_after), REPORTES_ESPERA_MAXIMA))
+    except ValueError:
+        pass  # Retry-After como fecha HTTP: se usa la espera exponencial
+    return espera
+
 
 class OpenAIClient:
     """Cliente mejorado para interactuar con la API de OpenAI"""
@@ -20,16 +87,81 @@ class OpenAIClient:
     def __init__(self):
         """Inicializa el cliente de OpenAI con la forma moderna"""
         try:
+            from config import Config
+
             Config.validate()
-            # Cliente síncrono y asíncrono (lee automáticamente OPENAI_API_KEY)
-            self.client = AsyncOpenAI()
-            self.sync_client = OpenAI()
             self.model = Config.OPENAI_MODEL
+            # Los clientes HTTP se crean en el primer uso (lee automáticamente OPENAI_API_KEY)
+            self._clients = {}  # event loop -> AsyncOpenAI con su propio pool
+            self._clients_lock = threading.Lock()
+            self._sync_client = None
+            # Completaciones ya pagadas, por contenido (REPORTES_CACHE=0 la desactiva)
+            self.cache = CacheCompletaciones() if REPORTES_CACHE else None
             logger.info(f"Cliente OpenAI inicializado con modelo: {self.model}")
         except Exception as e:
             logger.error(f"Error al inicializar cliente OpenAI: {e}")
             raise
 
+    @property
+    def client(self):
+        """
+        Cliente asíncrono con el pool HTTP compartido
+
+        Las conexiones del pool pertenecen al event loop que las abrió, así
+        que hay un cliente por loop: la API usa siempre el mismo y un script
+        con varios asyncio.run (o un hilo con su propio loop) tiene el suyo.
+        Los clientes de loops ya cerrados se descartan; el resto se cierra
+        en aclose().
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._clients_lock:
+            # Un loop cerrado ya no puede cerrar sus conexiones: se liberan con el objeto
+            for cerrado in [anterior for anterior in self._clients if anterior is not None and anterior.is_closed()]:
+                del self._clients[cerrado]
+            client = self._clients.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI
+
+                client = self._clients[loop] = AsyncOpenAI(http_client=crear_transporte_async())
+        return client
+
+    @property
+    def sync_client(self):
+        """Cliente síncrono (solo para pruebas de conexión)"""
+        if self._sync_client is None:
+            from openai import OpenAI
+
+            self._sync_client = OpenAI()
+        return self._sync_client
+
+    async def aclose(self) -> None:
+        """
+        Cerrar los pools HTTP de todos los loops (al apagar la API)
+
+        El del loop actual se cierra aquí; el de un loop que corre en otro
+        hilo se cierra en ese loop.
+        """
+        with self._clients_lock:
+            clients, self._clients = self._clients, {}
+        loop_actual = asyncio.get_running_loop()
+        for loop, client in clients.items():
+            try:
+                if loop is None or loop is loop_actual:
+                    await client.close()
+                elif loop.is_running():
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.close(), loop))
+            except Exception as e:
+                logger.warning(f"No se pudo cerrar un cliente OpenAI: {e}")
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos y tokens ahorrados por la cache de completaciones"""
+        if self.cache is None:
+            return {"habilitada": False}
+        return {"habilitada": True, **self.cache.estadisticas()}
+
     async def test_connection(self) -> bool:
         """Prueba la conexión con OpenAI usando la forma moderna"""
         try:
@@ -66,6 +198,9 @@ class OpenAIClient:
         max_tokens: int = 1000,
         temperature: float = 0.7,
         model: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        use_cache: bool = True,
+        report_type: str = "completion",
     ) -> Dict[str, Any]:
         """
         Genera una completación usando ChatGPT
@@ -76,10 +211,47 @@ class OpenAIClient:
             max_tokens (int): Máximo número de tokens
             temperature (float): Creatividad de la respuesta (0-1)
             model (str, optional): Modelo específico a usar
+            max_retries (int, optional): Reintentos internos del SDK (None = los del cliente)
+            use_cache (bool): Reutilizar una completación idéntica ya generada
+            report_type (str): Tipo de reporte para las métricas de tokens y costo
 
         Returns:
-            Dict: Respuesta con contenido, tiempo y metadatos
+            Dict: Respuesta con contenido, tiempo y metadatos; "cached" indica
+            si vino de la cache (con el tiempo original en "execution_time")
         """
+        model = model or self.model
+        start_time = time.time()
+        try:
+            if self.cache is None or not use_cache:
+                result = await self._create_completion(
+                    prompt, system_message, max_tokens, temperature, model, max_retries
+                )
+                hit = False
+            else:
+                key = clave_completacion(model, system_message, prompt, temperature, max_tokens)
+                result, hit = await self.cache.resolver(
+                    key,
+                    lambda: self._create_completion(prompt, system_message, max_tokens, temperature, model, max_retries),
+                )
+        except Exception as e:
+            metricas_ia.registrar(model, report_type, time.time() - start_time, error=e)
+            raise
+
+        metricas_ia.registrar(model, report_type, result["execution_time"], result["usage"], cached=hit)
+        if hit:
+            logger.info(f"Completación obtenida de la cache ({result['usage']['total_tokens']} tokens ahorrados)")
+        return {**result, "cached": hit}
+
+    async def _create_completion(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        model: str,
+        max_retries: Optional[int],
+    ) -> Dict[str, Any]:
+        """Llamada a la API de chat completions (sin cache)"""
         start_time = time.time()
 
         try:
@@ -90,8 +262,9 @@ class OpenAIClient:
 
             messages.append({"role": "user", "content": prompt})
 
-            response = await self.client.chat.completions.create(
-                model=model or self.model,
+            client = self.client if max_retries is None else self.client.with_options(max_retries=max_retries)
+            response = await client.chat.completions.create(
+                model=model,
                 messages=messages,
                 max_tokens=max_tokens,
                 temperature=temperature,
@@ -159,32 +332,12 @@ class OpenAIClient:
             system_message=system_message,
             max_tokens=2000,
             temperature=0.8,
+            report_type="quiz",
         )
 
-    async def generate_oefa_report(
-        self,
-        report_data: Dict[str, Any],
-        model: Optional[str] = None,
-        max_tokens: int = 2000,
-        temperature: float = 0.2,
-    ) -> Dict[str, Any]:
-        """
-        Genera un reporte ejecutivo para OEFA a partir de los datos en `report_data`.
-
-        report_data: diccionario con claves esperadas:
-          - 'Pesticidas.organoclorados'
-          - 'Pesticidas.Organofosforados'
-          - 'PARAMETRO'
-          - 'TXUBIGEO'
-          - 'TXZONA'
-          - 'COORD_ESTE'
-          - 'COORD_NORTE'
-
-        La función construye el prompt institucional (texto en español, sin tablas),
-        pide la comparación con el límite OMS (0.1 mg/L), solicita clasificación de
-        riesgo (Bajo/Medio/Alto según factor de exceso) y recomendaciones prácticas.
-        """
-
+    @staticmethod
+    def _oefa_report_messages(report_data: Dict[str, Any]) -> Tuple[str, str]:
+        """(mensaje del sistema, prompt) del reporte OEFA para `report_data`"""
         # Normalizar y extraer valores del input
         p_oc = report_data.get("Pesticidas.organoclorados") or report_data.get(
             "Pesticidas.Organoclorados"
@@ -197,6 +350,7 @@ class OpenAIClient:
         txzona = report_data.get("TXZONA", "No especificado")
         coord_este = report_data.get("COORD_ESTE")
         coord_norte = report_data.get("COORD_NORTE")
+        mediciones = report_data.get("mediciones") or []
 
         system_message = (
             "Eres un redactor técnico experto en evaluación ambiental y normativas peruanas. "
@@ -219,6 +373,22 @@ class OpenAIClient:
             f"Ubicación (TXUBIGEO): {txubigeo}.",
             f"Zona UTM: {txzona}.",
             f"Coordenadas UTM - Este: {coord_este if coord_este is not None else 'No proporcionado'}, Norte: {coord_norte if coord_norte is not None else 'No proporcionado'}.",
+        ]
+        if mediciones:
+            prompt_lines.append("Resultados medidos en el punto (parámetro: valor y unidad, familia de ensayo):")
+            for medicion in mediciones:
+                signo = "" if medicion.get("signo") in (None, "=") else medicion["signo"]
+                linea = f"- {medicion.get('parametro') or 'Sin parámetro'}: {signo}{medicion['valor']:g}"
+                if medicion.get("unidad"):
+                    linea += f" {medicion['unidad']}"
+                if medicion.get("familia"):
+                    linea += f" ({medicion['familia']})"
+                prompt_lines.append(linea + ".")
+            prompt_lines.append(
+                "Compara cada resultado con el ECA o LMP peruano aplicable a su parámetro y matriz; "
+                "un signo '<' indica un valor bajo el límite de detección."
+            )
+        prompt_lines += [
             "Convierte las coordenadas UTM a latitud/longitud y explícitalas en el apartado de información general.",
             "Compara cada valor con el límite OMS de 0.1 mg/L para pesticidas y con las normas peruanas aplicables; indica claramente si excede y por cuánto (factor o diferencia absoluta).",
             "Clasifica el riesgo ambiental por sitio (Bajo, Medio, Alto) en función de la magnitud del exceso: Bajo (<=2×Límite), Medio (>2× y <=10×), Alto (>10×).",
@@ -227,13 +397,245 @@ class OpenAIClient:
 
         prompt = "\n".join(prompt_lines)
 
+        return system_message, prompt
+
+    async def generate_oefa_report(
+        self,
+        report_data: Dict[str, Any],
+        model: Optional[str] = None,
+        max_tokens: int = 2000,
+        temperature: float = 0.2,
+        max_retries: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Genera un reporte ejecutivo para OEFA a partir de los datos en `report_data`.
+
+        report_data: diccionario con claves esperadas:
+          - 'Pesticidas.organoclorados'
+          - 'Pesticidas.Organofosforados'
+          - 'PARAMETRO'
+          - 'TXUBIGEO'
+          - 'TXZONA'
+          - 'COORD_ESTE'
+          - 'COORD_NORTE'
+          - 'mediciones': lista de {'parametro', 'valor', 'unidad', 'signo', 'familia'}
+
+        La función construye el prompt institucional (texto en español, sin tablas),
+        pide la comparación con el límite OMS (0.1 mg/L), solicita clasificación de
+        riesgo (Bajo/Medio/Alto según factor de exceso) y recomendaciones prácticas.
+        """
+
+        system_message, prompt = self._oefa_report_messages(report_data)
+
         return await self.generate_completion(
             prompt=prompt,
             system_message=system_message,
             max_tokens=max_tokens,
             temperature=temperature,
             model=model,
+            max_retries=max_retries,
+            use_cache=use_cache,
+            report_type="oefa",
+        )
+
+    async def _generate_oefa_report_with_retries(
+        self,
+        index: int,
+        report_data: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        max_attempts: int,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Un reporte del lote: reintenta los errores transitorios y captura el error final"""
+        item = {"index": index, "report_data": report_data, "result": None, "error": None, "attempts": 0}
+        async with semaphore:
+            for attempt in range(1, max_attempts + 1):
+                item["attempts"] = attempt
+                try:
+                    # Los reintentos los maneja el lote (el SDK no reintenta por su cuenta)
+                    item["result"] = await self.generate_oefa_report(report_data, max_retries=0, **kwargs)
+                    item["error"] = None
+                    return item
+                except errores_reintentables() as e:
+                    item["error"] = f"{type(e).__name__}: {e}"
+                    if attempt == max_attempts:
+                        break
+                    # La espera se hace con el cupo tomado: ante un 429 baja la presión total
+                    espera = espera_reintento(e, attempt)
+                    logger.warning(
+                        f"Reporte {index}: {type(e).__name__}, reintento {attempt + 1}/{max_attempts} en {espera:.1f}s"
+                    )
+                    await asyncio.sleep(espera)
+                except Exception as e:
+                    item["error"] = f"{type(e).__name__}: {e}"
+                    break
+        logger.error(f"Reporte {index} falló tras {item['attempts']} intento(s): {item['error']}")
+        return item
+
+    async def generate_oefa_reports(
+        self,
+        reports: Iterable[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        model: Optional[str] = None,
+        max_tokens: int = 2000,
+        temperature: float = 0.2,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera reportes OEFA en lote y los entrega a medida que terminan
+
+        Args:
+            reports (Iterable[Dict]): Un `report_data` por punto (ver generate_oefa_report)
+            concurrency (int, optional): Llamadas simultáneas (REPORTES_CONCURRENCIA)
+            max_attempts (int, optional): Intentos por reporte (REPORTES_INTENTOS)
+            model (str, optional): Modelo específico a usar
+            max_tokens (int): Máximo número de tokens por reporte
+            temperature (float): Creatividad de la respuesta (0-1)
+
+        Yields:
+            Dict: {"index", "report_data", "result", "error", "attempts"} en orden
+            de finalización; `result` es None si el reporte falló y `error` trae
+            el motivo. Un reporte fallido no detiene el resto del lote.
+
+        Si el consumidor deja de iterar, los reportes pendientes se cancelan.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency or REPORTES_CONCURRENCIA, 1))
+        tasks = [
+            asyncio.create_task(
+                self._generate_oefa_report_with_retries(
+                    index, report_data, semaphore, max(max_attempts or REPORTES_INTENTOS, 1),
+                    model=model, max_tokens=max_tokens, temperature=temperature,
+                )
+            )
+            for index, report_data in enumerate(reports)
+        ]
+        logger.info(f"Lote de {len(tasks)} reportes OEFA iniciado")
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stream_completion(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+        report_type: str = "completion",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera una completación entregando el texto a medida que llega
+
+        Yields:
+            Dict: {"type": "delta", "content": str} por cada fragmento y al final
+            {"type": "done", "result": Dict} con la misma forma que
+            generate_completion. Si la completación ya estaba en la cache, el
+            texto llega en un solo fragmento. El resultado completo se guarda en
+            la cache al terminar (un corte a mitad no se guarda).
+        """
+        model = model or self.model
+        key = None
+        if self.cache is not None and use_cache:
+            key = clave_completacion(model, system_message, prompt, temperature, max_tokens)
+            cached = await asyncio.to_thread(self.cache.obtener, key)
+            if cached is not None:
+                metricas_ia.registrar(model, report_type, cached["execution_time"], cached["usage"], cached=True)
+                yield {"type": "delta", "content": cached["content"]}
+                yield {"type": "done", "result": {**cached, "cached": True}}
+                return
+
+        start_time = time.time()
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except Exception as e:
+            metricas_ia.registrar(model, report_type, time.time() - start_time, error=e)
+            logger.error(f"Error al iniciar completación en streaming: {e}")
+            raise
+
+        parts: List[str] = []
+        usage = None
+        response_model = model
+        first_token_time = None
+        try:
+            async for chunk in stream:
+                response_model = chunk.model or response_model
+                if chunk.usage is not None:  # Último fragmento (include_usage)
+                    usage = chunk.usage
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        if first_token_time is None:
+                            first_token_time = time.time() - start_time
+                        parts.append(choice.delta.content)
+                        yield {"type": "delta", "content": choice.delta.content}
+        except Exception as e:
+            metricas_ia.registrar(model, report_type, time.time() - start_time, error=e)
+            raise
+        finally:
+            await stream.close()
+
+        execution_time = time.time() - start_time
+        result = {
+            "content": "".join(parts),
+            "model": response_model,
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens if usage else 0,
+                "completion_tokens": usage.completion_tokens if usage else 0,
+                "total_tokens": usage.total_tokens if usage else 0,
+            },
+            "execution_time": execution_time,
+            "time_to_first_token": first_token_time,
+            "timestamp": time.time(),
+        }
+        metricas_ia.registrar(model, report_type, execution_time, result["usage"], primer_token=first_token_time)
+        logger.info(
+            f"Completación en streaming generada en {execution_time:.2f}s "
+            f"(primer token en {first_token_time or 0:.2f}s)"
         )
+        if key is not None:
+            try:
+                await asyncio.to_thread(self.cache.guardar, key, result)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar la completación en la cache: {e}")
+        yield {"type": "done", "result": {**result, "cached": False}}
+
+    async def stream_oefa_report(
+        self,
+        report_data: Dict[str, Any],
+        model: Optional[str] = None,
+        max_tokens: int = 2000,
+        temperature: float = 0.2,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Reporte OEFA en streaming (mismo prompt que generate_oefa_report, ver stream_completion)"""
+        system_message, prompt = self._oefa_report_messages(report_data)
+        async for event in self.stream_completion(
+            prompt=prompt,
+            system_message=system_message,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            model=model,
+            use_cache=use_cache,
+            report_type="oefa",
+        ):
+            yield event
 
     async def chat_conversation(
         self, messages: List[Dict[str, str]], max_tokens: int = 1000
@@ -267,14 +669,48 @@ class OpenAIClient:
                 "execution_time": end_time - start_time,
                 "timestamp": time.time(),
             }
+            metricas_ia.registrar(self.model, "chat", result["execution_time"], result["usage"])
 
             logger.info("Conversación procesada exitosamente")
             return result
 
         except Exception as e:
+            metricas_ia.registrar(self.model, "chat", time.time() - start_time, error=e)
             logger.error(f"Error en conversación: {e}")
             raise
 
 
-# Instancia global del cliente
-openai_client = OpenAIClient()
+_openai_client: Optional[OpenAIClient] = None
+_openai_client_lock = threading.Lock()
+
+
+def get_openai_client() -> OpenAIClient:
+    """Instancia global del cliente, creada en el primer uso (valida la configuración)"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                _openai_client = OpenAIClient()
+    return _openai_client
+
+
+def current_openai_client() -> Optional[OpenAIClient]:
+    """Instancia global si ya se creó (sin crearla)"""
+    return _openai_client
+
+
+async def close_openai_client() -> None:
+    """Cerrar el pool HTTP de la instancia global si llegó a crearse"""
+    if _openai_client is not None:
+        await _openai_client.aclose()
+
+
+class _LazyOpenAIClient:
+    """Acceso diferido a la instancia global: `openai_client.metodo` la crea si falta"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_openai_client(), name)
+
+
+# Instancia global del cliente (se construye en el primer uso)
+openai_client = _LazyOpenAIClient()
@@ -0,0 +1,168 @@
+"""
+Reportes IA de puntos OEFA transmitidos por Server-Sent Events.
+
+El reporte se arma con las muestras del punto (filas en sus mismas
+coordenadas) en la versión publicada del dataset: cada una aporta su
+resultado medido, con unidad, signo y familia de ensayo. Se genera con el
+cliente de reporte/ai en modo streaming: el evento "inicio" sale de
+inmediato y cada fragmento de texto se envía apenas llega, así el dashboard
+muestra el reporte sin esperar la generación completa. El paquete de
+reportes es opcional: si su configuración o sus dependencias faltan, la API
+sigue funcionando sin este endpoint.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingesta import COLUMNAS_SIGNO, COLUMNAS_UNIDAD, texto_coalescido, valores_medidos
+
+RUTA_REPORTE = Path(__file__).parent / "reporte"
+
+# Columnas del dataset para cada clave de report_data (primera que exista);
+# son las claves que lee OpenAIClient._oefa_report_messages
+COLUMNAS_REPORTE = {
+    'PARAMETRO': ['PARAMETRO'],
+    'TXUBIGEO': ['TXUBIGEO'],
+    'TXZONA': ['TXZONA', 'ZONA'],
+    'COORD_ESTE': ['COORD_ESTE', 'ESTE'],
+    'COORD_NORTE': ['COORD_NORTE', 'NORTE'],
+}
+# Claves de pesticidas de report_data: primer resultado del punto en esa familia de ensayo
+FAMILIAS_PESTICIDA = ['Pesticidas.organoclorados', 'Pesticidas.Organofosforados']
+MAX_MEDICIONES_REPORTE = 40  # Resultados del punto que entran en el prompt
+
+
+class SinMediciones(ValueError):
+    """El punto no tiene ningún resultado numérico para el reporte"""
+
+
+def _valor(valor):
+    """Valor de una celda apto para JSON (None si falta)"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def mediciones_reporte(filas):
+    """
+    Resultados medidos de las filas de un punto, en el orden de las filas
+
+    Returns:
+        Lista de {"parametro", "valor", "unidad", "signo", "familia"}; el
+        valor sale de la columna de su familia de ensayo (ingesta.valores_medidos)
+    """
+    valores, familias = valores_medidos(filas)
+    unidades = texto_coalescido(filas, COLUMNAS_UNIDAD).tolist()
+    signos = texto_coalescido(filas, COLUMNAS_SIGNO).tolist()
+    parametros = filas['PARAMETRO'].tolist() if 'PARAMETRO' in filas.columns else [None] * len(filas)
+    return [
+        {
+            "parametro": _valor(parametros[k]),
+            "valor": float(valores[k]),
+            "unidad": unidades[k] or None,
+            "signo": signos[k] or None,
+            "familia": familias[k],
+        }
+        for k in np.flatnonzero(~np.isnan(valores))[:MAX_MEDICIONES_REPORTE]
+    ]
+
+
+def datos_reporte(filas):
+    """
+    report_data de generate_oefa_report para un punto OEFA
+
+    Args:
+        filas (DataFrame): Filas del punto; la primera es la pedida y de ella
+            salen parámetro, ubicación y coordenadas
+
+    Raises:
+        SinMediciones: si ninguna fila trae un resultado numérico
+    """
+    fila = filas.iloc[0]
+    datos = {}
+    for clave, columnas in COLUMNAS_REPORTE.items():
+        for columna in columnas:
+            valor = _valor(fila.get(columna))
+            if valor is not None:
+                datos[clave] = valor
+                break
+
+    if 'TXUBIGEO' not in datos:
+        partes = [str(fila[c]) for c in ('distrito', 'provincia', 'departamento') if _valor(fila.get(c)) is not None]
+        if partes:
+            datos['TXUBIGEO'] = ", ".join(partes)
+
+    datos['mediciones'] = mediciones_reporte(filas)
+    if not datos['mediciones']:
+        raise SinMediciones("El punto no tiene resultados medidos para el reporte")
+    for clave in FAMILIAS_PESTICIDA:
+        valores = [m["valor"] for m in datos['mediciones'] if (m["familia"] or "").lower() == clave.lower()]
+        if valores:
+            datos[clave] = valores[0]
+    return datos
+
+
+def _ruta_reporte():
+    """Hacer importable el paquete ai de backend/reporte"""
+    if str(RUTA_REPORTE) not in sys.path:
+        sys.path.append(str(RUTA_REPORTE))
+
+
+def cliente_reportes():
+    """
+    Cliente OpenAI del paquete reporte, o None si no está disponible
+
+    Returns:
+        (cliente, motivo): motivo explica por qué no hay cliente
+    """
+    _ruta_reporte()
+    try:
+        from ai.openai_client import get_openai_client
+        return get_openai_client(), None  # Se crea una vez y se reutiliza en el event loop de la API
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def metricas_reportes():
+    """Registro de tokens, latencia y costo de las llamadas a OpenAI (sin crear el cliente)"""
+    _ruta_reporte()
+    from ai.metricas_ia import metricas_ia
+    return metricas_ia
+
+
+def cache_reportes():
+    """Estadísticas de la cache de completaciones, o None si el cliente no se creó"""
+    modulo = sys.modules.get("ai.openai_client")
+    cliente = modulo.current_openai_client() if modulo is not None else None
+    return cliente.cache_stats() if cliente is not None else None
+
+
+async def cerrar_cliente_reportes():
+    """Cerrar el pool HTTP del cliente si algún reporte llegó a crearlo"""
+    modulo = sys.modules.get("ai.openai_client")
+    if modulo is not None:
+        await modulo.close_openai_client()
+
+
+def evento_sse(evento, datos):
+    """Mensaje Server-Sent Events con datos JSON"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+async def eventos_reporte(cliente, tipo, punto_id, report_data, max_tokens):
+    """Eventos SSE del reporte: inicio, delta (texto) y fin, o error"""
+    yield evento_sse("inicio", {"tipo": tipo, "id": punto_id, "report_data": report_data})
+    try:
+        async for evento in cliente.stream_oefa_report(report_data, max_tokens=max_tokens):
+            if evento["type"] == "delta":
+                yield evento_sse("delta", {"texto": evento["content"]})
+            else:
+                resultado = evento["result"]
+                yield evento_sse("fin", {clave: valor for clave, valor in resultado.items() if clave != "content"})
+    except Exception as e:
+        print(f"❌ Error generando reporte {tipo}/{punto_id}: {e}")
+        yield evento_sse("error", {"detalle": f"{type(e).__name__}: {e}"})
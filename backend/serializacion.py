@@ -0,0 +1,136 @@
+"""
+Serialización vectorizada de puntos del mapa.
+
+Las columnas de cada tipo de dataset se declaran una sola vez en
+COLUMNAS_POR_TIPO y la respuesta se arma a partir de arreglos de columna
+completos, sin recorrer el DataFrame fila por fila.
+"""
+
+import numpy as np
+
+# Columnas por tipo: (columna, valor por defecto si la columna no existe)
+COLUMNAS_POR_TIPO = {
+    'educacion': {
+        'id': ('codigo_modular', 'edu'),
+        'nombre': ('nombre_institucion', 'Centro Educativo'),
+        'prefijo_nombre': '',
+        'info_especifica': {
+            'nivel_modalidad': 'nivel_modalidad',
+            'gestion': 'gestion',
+            'area_censal': 'area_censal',
+        },
+    },
+    'salud': {
+        'id': ('codigo_unico', 'salud'),
+        'nombre': ('nombre_establecimiento', 'Centro de Salud'),
+        'prefijo_nombre': '',
+        'info_especifica': {
+            'tipo_establecimiento': 'tipo_establecimiento',
+            'categoria': 'categoria',
+            'estado': 'estado',
+        },
+    },
+    'poblacion': {
+        'id': ('id_centro_poblado', 'pob'),
+        'nombre': ('nombre_centro_poblado', 'Centro Poblado'),
+        'prefijo_nombre': '',
+        'info_especifica': {
+            'departamento': 'departamento',
+            'provincia': 'provincia',
+            'distrito': 'distrito',
+        },
+    },
+    'oefa': {
+        'id': ('ID_INFORME', 'oefa'),
+        'nombre': ('PUNTO_MUESTREO', 'Monitoreo'),
+        'prefijo_nombre': 'Punto OEFA - ',
+        'info_especifica': {
+            'tipo_oefa': 'tipo_oefa',
+            'fecha_muestra': 'FECHA_MUESTRA',
+            'parametro': 'PARAMETRO',
+        },
+    },
+}
+
+
+def columna_str(df, columna, defecto=''):
+    """Valores de una columna como lista de str (o el defecto si no existe)"""
+    if columna in df.columns:
+        return [str(v) for v in df[columna].tolist()]
+    return [str(defecto)] * len(df)
+
+
+def columnas_punto(tipo, df, offset=0):
+    """
+    Arreglos paralelos con los campos de cada punto
+
+    Args:
+        tipo (str): Tipo de dataset
+        df (DataFrame): Filas a serializar, con columna distancia_km
+        offset (int): Puntos ya serializados (para IDs de respaldo)
+
+    Returns:
+        Dict: Listas por campo, más info_especifica como dict de listas
+    """
+    n = len(df)
+    config = COLUMNAS_POR_TIPO.get(tipo)
+
+    if config is None:
+        ids = [f"{tipo}_{offset + i}" for i in range(n)]
+        nombres = [f"Punto {tipo}"] * n
+        info = {}
+    else:
+        col_id, prefijo_id = config['id']
+        if col_id in df.columns:
+            ids = columna_str(df, col_id)
+        else:
+            ids = [f"{prefijo_id}_{offset + i}" for i in range(n)]
+
+        col_nombre, nombre_defecto = config['nombre']
+        nombres = columna_str(df, col_nombre, nombre_defecto)
+        if config['prefijo_nombre']:
+            nombres = [config['prefijo_nombre'] + nombre for nombre in nombres]
+
+        info = {
+            campo: columna_str(df, columna)
+            for campo, columna in config['info_especifica'].items()
+        }
+
+    departamentos = columna_str(df, 'departamento')
+    provincias = columna_str(df, 'provincia')
+
+    return {
+        "id": ids,
+        "latitud": df['latitud'].to_numpy(dtype=np.float64).tolist(),
+        "longitud": df['longitud'].to_numpy(dtype=np.float64).tolist(),
+        "distancia_km": np.round(df['distancia_km'].to_numpy(dtype=np.float64), 2).tolist(),
+        "nombre": nombres,
+        "ubicacion": [f"{d}, {p}" for d, p in zip(departamentos, provincias)],
+        "info_especifica": info,
+    }
+
+
+def serializar_puntos(tipo, df, offset=0):
+    """Lista de puntos (dicts) a partir de los arreglos de columna"""
+    columnas = columnas_punto(tipo, df, offset)
+    info = columnas['info_especifica']
+    campos_info = list(info.keys())
+    filas_info = zip(*info.values()) if campos_info else ([] for _ in range(len(df)))
+
+    return [
+        {
+            "id": punto_id,
+            "tipo": tipo,
+            "latitud": lat,
+            "longitud": lng,
+            "distancia_km": dist,
+            "nombre": nombre,
+            "ubicacion": ubic,
+            "info_especifica": dict(zip(campos_info, valores)),
+        }
+        for punto_id, lat, lng, dist, nombre, ubic, valores in zip(
+            columnas['id'], columnas['latitud'], columnas['longitud'],
+            columnas['distancia_km'], columnas['nombre'], columnas['ubicacion'],
+            filas_info,
+        )
+    ]
@@ -0,0 +1,144 @@
+"""
+Series de tiempo de las muestras OEFA para los gráficos del dashboard.
+
+Al cargar OEFA se arma un cubo con una fila por (mes, tipo_oefa,
+departamento, PARAMETRO) y sus agregados combinables: muestras, valores
+numéricos, suma, mínimo, máximo, evaluadas y excedencias; el cubo anual se obtiene
+sumando el mensual. Cada consulta de /api/series filtra y reagrupa solo el
+cubo (miles de filas), nunca las muestras crudas.
+
+El valor de cada muestra sale de la columna de su familia de ensayo
+(ingesta.valores_medidos) y la excedencia usa la tabla de límites del IRF
+(irf.leer_limites). Una muestra cuyo parámetro no tiene límite no está
+evaluada: un periodo sin muestras evaluadas devuelve excedencias None, no 0.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indice_temporal import SIN_FECHA
+from ingesta import valores_medidos
+from irf import excesos
+
+DIMENSIONES = ['tipo_oefa', 'departamento', 'PARAMETRO']
+PERIODOS = ('mes', 'anio')
+AGREGADOS = {'muestras': 'sum', 'valores': 'sum', 'suma': 'sum', 'minimo': 'min', 'maximo': 'max',
+             'evaluadas': 'sum', 'excedencias': 'sum'}
+
+
+def _etiqueta_grupo(valor):
+    return None if pd.isna(valor) else str(valor)
+
+
+def _categorias(serie, seleccion):
+    """Valores de una columna en las filas seleccionadas, como categórica"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(serie.cat.codes.to_numpy()[seleccion], categories=serie.cat.categories)
+    return pd.Categorical(serie.to_numpy()[seleccion])
+
+
+class CuboSeries:
+    """Agregados por periodo y dimensiones, precalculados desde las muestras"""
+
+    def __init__(self, df, dias, limites=None):
+        """
+        Args:
+            df (DataFrame): Muestras OEFA
+            dias: Día de muestreo de cada fila (int64, SIN_FECHA si falta)
+            limites (dict): Tabla de límites de irf.leer_limites (None = sin evaluar)
+        """
+        self.dimensiones = [dim for dim in DIMENSIONES if dim in df.columns]
+        con_fecha = dias != SIN_FECHA
+
+        datos = {'periodo': dias[con_fecha].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)}
+        for dim in self.dimensiones:
+            datos[dim] = _categorias(df[dim], con_fecha)
+        datos['valor'] = valores_medidos(df)[0][con_fecha]
+        evaluada, excede, _ = excesos(df, limites)
+        datos['evaluada'] = evaluada[con_fecha]
+        datos['excede'] = excede[con_fecha]
+
+        # dropna=False: una muestra sin departamento (o sin PARAMETRO) igual se cuenta
+        mensual = pd.DataFrame(datos).groupby(['periodo', *self.dimensiones], observed=True, sort=True,
+                                              dropna=False).agg(
+            muestras=('excede', 'size'), valores=('valor', 'count'), suma=('valor', 'sum'),
+            minimo=('valor', 'min'), maximo=('valor', 'max'), evaluadas=('evaluada', 'sum'),
+            excedencias=('excede', 'sum')
+        ).reset_index()
+        anual = mensual.assign(periodo=mensual['periodo'] // 12 + 1970)
+        anual = anual.groupby(['periodo', *self.dimensiones], observed=True, sort=True,
+                              dropna=False).agg(AGREGADOS).reset_index()
+        self.cubos = {'mes': mensual, 'anio': anual}
+
+    @staticmethod
+    def etiqueta(periodo, valor):
+        return str(np.datetime64(int(valor), 'M')) if periodo == 'mes' else str(int(valor))
+
+    @staticmethod
+    def periodo_de_dia(periodo, dia):
+        """Mes (desde 1970-01) o año de un día desde 1970"""
+        mes = np.datetime64(int(dia), 'D').astype('datetime64[M]').astype(np.int64)
+        return int(mes) if periodo == 'mes' else int(mes // 12 + 1970)
+
+    def consultar(self, periodo='mes', agrupar=(), filtros=None, ventana=None, limite_series=50):
+        """
+        Series agregadas por periodo
+
+        Args:
+            periodo (str): 'mes' o 'anio'
+            agrupar (list): Dimensiones que separan las series (subconjunto de DIMENSIONES)
+            filtros (dict): {dimensión: valor}, sin distinguir mayúsculas
+            ventana (tuple): (desde, hasta) en días desde 1970, None = sin límite
+            limite_series (int): Series devueltas, de mayor a menor cantidad de muestras
+
+        Returns:
+            (series, total_series)
+        """
+        cubo = self.cubos[periodo]
+        seleccion = np.ones(len(cubo), dtype=bool)
+        for dim, valor in (filtros or {}).items():
+            categorias = cubo[dim].cat.categories
+            coinciden = np.flatnonzero(categorias.astype(str).str.upper() == str(valor).upper())
+            seleccion &= np.isin(cubo[dim].cat.codes.to_numpy(), coinciden)
+        if ventana is not None:
+            desde, hasta = ventana
+            if desde is not None:
+                seleccion &= cubo['periodo'].to_numpy() >= self.periodo_de_dia(periodo, desde)
+            if hasta is not None:
+                seleccion &= cubo['periodo'].to_numpy() <= self.periodo_de_dia(periodo, hasta)
+
+        agrupar = list(agrupar)
+        filas = cubo[seleccion].groupby([*agrupar, 'periodo'], observed=True, sort=True,
+                                        dropna=False).agg(AGREGADOS)
+        filas['media'] = filas['suma'] / filas['valores'].where(filas['valores'] > 0)
+        filas = filas.reset_index()
+
+        if agrupar:
+            partes = [
+                (dict(zip(agrupar, map(_etiqueta_grupo, clave if isinstance(clave, tuple) else (clave,)))), datos)
+                for clave, datos in filas.groupby(agrupar, observed=True, sort=False, dropna=False)
+            ]
+            partes.sort(key=lambda parte: -parte[1]['muestras'].sum())
+        else:
+            partes = [({}, filas)] if len(filas) else []
+        total_series = len(partes)
+
+        series = []
+        for grupo, datos in partes[:limite_series]:
+            series.append({
+                "grupo": grupo,
+                "muestras": int(datos['muestras'].sum()),
+                "datos": [
+                    {
+                        "periodo": self.etiqueta(periodo, fila.periodo),
+                        "muestras": int(fila.muestras),
+                        "evaluadas": int(fila.evaluadas),
+                        "excedencias": int(fila.excedencias) if fila.evaluadas else None,
+                        "minimo": None if pd.isna(fila.minimo) else float(fila.minimo),
+                        "media": None if pd.isna(fila.media) else float(fila.media),
+                        "maximo": None if pd.isna(fila.maximo) else float(fila.maximo),
+                    }
+                    for fila in datos.itertuples(index=False)
+                ]
+            })
+        return series, total_series
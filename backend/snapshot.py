@@ -0,0 +1,177 @@
+"""
+Snapshot binario (Parquet) de los datasets ya procesados.
+
+El pipeline de load_datasets (lectura de CSV, corrección de coordenadas de
+salud, proyección UTM de OEFA) se ejecuta una sola vez con:
+
+    cd backend
+    python snapshot.py
+
+y deja un archivo Parquet por tipo en DATAFINAL/snapshot/. metadata.json
+guarda la huella (nombre, tamaño y mtime) de los CSV leídos; al iniciar, la
+API usa el snapshot de un tipo solo si esa huella coincide exactamente con la
+de sus CSV actuales, así un CSV reemplazado por otro con mtime anterior
+(`cp -p`, rsync, extracción de un zip) también invalida el snapshot.
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+SNAPSHOT_DIR = "snapshot"
+METADATA_FILE = "metadata.json"
+
+# Columnas de baja cardinalidad que se guardan como categóricas (diccionario)
+COLUMNAS_CATEGORICAS = [
+    'departamento',
+    'provincia',
+    'distrito',
+    'tipo_oefa',
+    'PARAMETRO',
+    'nivel_modalidad',
+    'gestion',
+    'area_censal',
+    'tipo_establecimiento',
+    'categoria',
+    'estado',
+]
+
+
+def tipar_columnas(df):
+    """Convertir las columnas de texto repetitivas a categóricas"""
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and (df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype)):
+            valores = df[col]
+            df[col] = valores.where(valores.isna(), valores.astype(str)).astype('category')
+    return df
+
+
+def _normalizar_objetos(df):
+    """Pasar a str las columnas object con tipos mezclados (Parquet no las acepta)"""
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) != 'string':
+            valores = df[col]
+            df[col] = valores.where(valores.isna(), valores.astype(str))
+    return df
+
+
+def ruta_snapshot(data_path, tipo):
+    return Path(data_path) / SNAPSHOT_DIR / f"{tipo}.parquet"
+
+
+def huella_fuentes(data_path, fuentes):
+    """Identificador corto de los CSV de origen (nombre, tamaño y fecha)"""
+    partes = []
+    for archivo in fuentes:
+        ruta = Path(data_path) / archivo
+        if ruta.exists():
+            info = ruta.stat()
+            partes.append(f"{archivo}:{info.st_size}:{info.st_mtime_ns}")
+    return hashlib.sha1("|".join(partes).encode()).hexdigest()[:12]
+
+
+def huellas_archivos(data_path, fuentes):
+    """Huella de cada CSV de origen que existe ({archivo: huella})"""
+    return {
+        archivo: huella_fuentes(data_path, [archivo])
+        for archivo in fuentes
+        if (Path(data_path) / archivo).exists()
+    }
+
+
+def leer_metadata(data_path):
+    ruta = Path(data_path) / SNAPSHOT_DIR / METADATA_FILE
+    try:
+        return json.loads(ruta.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def snapshot_vigente(data_path, tipo, fuentes, huella=None):
+    """
+    El snapshot existe y se generó a partir de los mismos CSV de origen
+
+    Args:
+        huella: huella esperada de las fuentes (por defecto la actual);
+            quien ya tomó la huella antes de leer la pasa para no aceptar
+            un snapshot de otra versión de los CSV
+    """
+    if not ruta_snapshot(data_path, tipo).exists():
+        return False
+    if huella is None:
+        huella = huella_fuentes(data_path, fuentes)
+    return leer_metadata(data_path).get(tipo, {}).get('huella') == huella
+
+
+def cargar_snapshot(data_path, tipo):
+    """Leer el snapshot de un tipo (las categóricas se conservan)"""
+    return pd.read_parquet(ruta_snapshot(data_path, tipo))
+
+
+def guardar_snapshot(data_path, tipo, df, fuentes, huella=None):
+    """
+    Escribir el snapshot de un tipo y registrar sus metadatos
+
+    Args:
+        huella: huella de las fuentes tomada antes de leerlas; si se omite
+            se toma ahora (un CSV cambiado durante la lectura quedaría
+            registrado con la huella nueva)
+    """
+    if huella is None:
+        huella = huella_fuentes(data_path, fuentes)
+    directorio = Path(data_path) / SNAPSHOT_DIR
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    df = _normalizar_objetos(tipar_columnas(df.copy()))
+    ruta = ruta_snapshot(data_path, tipo)
+    temporal = ruta.with_suffix('.parquet.tmp')
+    df.to_parquet(temporal, index=False)
+    temporal.replace(ruta)
+
+    metadata = leer_metadata(data_path)
+    metadata[tipo] = {
+        'huella': huella,
+        'registros': len(df),
+        'columnas': list(df.columns),
+        'categoricas': [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)],
+        'fuentes': {
+            fuente: datetime.fromtimestamp((Path(data_path) / fuente).stat().st_mtime).isoformat()
+            for fuente in fuentes
+            if (Path(data_path) / fuente).exists()
+        },
+        'creado': datetime.now().isoformat(),
+    }
+    (directorio / METADATA_FILE).write_text(json.dumps(metadata, indent=2, ensure_ascii=False))
+    return ruta
+
+
+def main():
+    # Importar aquí: main.py importa este módulo al cargar la API
+    from main import DATA_PATH, FUENTES_DATASETS, procesar_dataset
+
+    parser = argparse.ArgumentParser(description="Generar snapshot Parquet de los datasets")
+    parser.add_argument("--data-path", default=str(DATA_PATH), help="Carpeta DATAFINAL")
+    parser.add_argument("--tipos", default=",".join(FUENTES_DATASETS), help="Tipos separados por coma")
+    args = parser.parse_args()
+
+    for tipo in [t.strip() for t in args.tipos.split(",")]:
+        if tipo not in FUENTES_DATASETS:
+            print(f"⚠️ Tipo desconocido: {tipo}")
+            continue
+        # La huella se toma antes de leer: si un CSV cambia durante el
+        # proceso, el snapshot queda con la huella anterior y no se usa
+        huella = huella_fuentes(args.data_path, FUENTES_DATASETS[tipo])
+        df = procesar_dataset(tipo, Path(args.data_path))
+        if df.empty:
+            print(f"⚠️ {tipo}: sin registros, no se genera snapshot")
+            continue
+        ruta = guardar_snapshot(args.data_path, tipo, df, FUENTES_DATASETS[tipo], huella)
+        print(f"💾 {tipo}: {len(df):,} registros -> {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Teselas vectoriales (Mapbox Vector Tile) de los datasets en memoria.
+
+Cada capa (oefa, educacion, salud, poblacion) se sirve como
+/tiles/{capa}/{z}/{x}/{y}.pbf en la grilla XYZ de Web Mercator. Los puntos
+de la tesela salen del índice espacial del dataset y se codifican con un
+codificador protobuf mínimo (solo geometrías de punto), sin dependencias
+extra. Los atributos se reducen según el zoom: en zoom bajo los puntos que
+caen en el mismo píxel se fusionan y solo llevan id y conteo.
+
+Las teselas generadas se guardan en DATAFINAL/snapshot/teselas/<capa>/<huella>/,
+donde la huella identifica los CSV de origen; al cambiar los datos se usa
+otra carpeta. Para precalcular los zoom 0-10 sobre Perú:
+
+    cd backend
+    python teselas.py
+"""
+
+import argparse
+import math
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from serializacion import COLUMNAS_POR_TIPO, columna_str
+from snapshot import SNAPSHOT_DIR
+
+TESELAS_DIR = "teselas"
+EXTENSION = 4096  # Resolución interna de la tesela
+BUFFER = 64  # Margen (en unidades de tesela) para no cortar símbolos en los bordes
+LAT_MAX_MERCATOR = 85.05112878
+
+# Atributos por zoom: hasta ZOOM_SOLO_ID solo id (y puntos fusionados por
+# píxel), hasta ZOOM_NOMBRE id y nombre, desde ahí también info_especifica
+ZOOM_SOLO_ID = 8
+ZOOM_NOMBRE = 12
+CELDA_FUSION = 16  # Tamaño (unidades de tesela) de la celda de fusión en zoom bajo
+
+# Rectángulo de Perú (lat_min, lat_max, lng_min, lng_max) para el precalculo
+LIMITES_PERU = (-18.4, -0.03, -81.4, -68.6)
+ZOOM_MAX_PRECALCULO = 10
+
+
+# --- Codificación protobuf ---------------------------------------------------
+
+def _varint(valor):
+    partes = bytearray()
+    while True:
+        byte = valor & 0x7F
+        valor >>= 7
+        if valor:
+            partes.append(byte | 0x80)
+        else:
+            partes.append(byte)
+            return bytes(partes)
+
+
+def _zigzag(valor):
+    return (valor << 1) ^ (valor >> 63)
+
+
+def _campo_varint(numero, valor):
+    return _varint(numero << 3) + _varint(valor)
+
+
+def _campo_bytes(numero, datos):
+    return _varint((numero << 3) | 2) + _varint(len(datos)) + datos
+
+
+def _campo_empaquetado(numero, valores):
+    return _campo_bytes(numero, b"".join(_varint(v) for v in valores))
+
+
+def _valor(valor):
+    """Mensaje Value: enteros no negativos como uint, el resto como string"""
+    if isinstance(valor, int) and valor >= 0:
+        return _campo_varint(5, valor)
+    return _campo_bytes(1, str(valor).encode())
+
+
+def codificar_capa(nombre, ids, xs, ys, atributos):
+    """
+    Mensaje Layer (versión 2) con una feature de tipo punto por elemento
+
+    Args:
+        nombre (str): Nombre de la capa
+        ids, xs, ys: Listas paralelas de id de feature y coordenadas de tesela
+        atributos (dict): {clave: lista de valores paralela a ids}
+    """
+    claves = list(atributos)
+    valores = {}  # valor -> índice en la tabla de valores de la capa
+    columnas = [atributos[clave] for clave in claves]
+
+    features = []
+    for i, (fid, x, y) in enumerate(zip(ids, xs, ys)):
+        tags = []
+        for k, columna in enumerate(columnas):
+            valor = columna[i]
+            if valor is None or valor == '':
+                continue
+            tags.append(k)
+            tags.append(valores.setdefault(valor, len(valores)))
+        geometria = (9, _zigzag(x), _zigzag(y))  # MoveTo(1) + dx, dy
+        feature = (
+            _campo_varint(1, fid)
+            + (_campo_empaquetado(2, tags) if tags else b"")
+            + _campo_varint(3, 1)
+            + _campo_empaquetado(4, geometria)
+        )
+        features.append(_campo_bytes(2, feature))
+
+    capa = [_campo_varint(15, 2), _campo_bytes(1, nombre.encode())]
+    capa.extend(features)
+    capa.extend(_campo_bytes(3, clave.encode()) for clave in claves)
+    capa.extend(_campo_bytes(4, _valor(valor)) for valor in valores)
+    capa.append(_campo_varint(5, EXTENSION))
+    return _campo_bytes(3, b"".join(capa))
+
+
+# --- Geometría de la grilla XYZ ------------------------------------------------
+
+def limites_tesela(z, x, y):
+    """(lat_min, lat_max, lng_min, lng_max) de una tesela XYZ"""
+    n = 2 ** z
+    lng_min = x / n * 360.0 - 180.0
+    lng_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return lat_min, lat_max, lng_min, lng_max
+
+
+def tesela_de(lat, lng, z):
+    """Tesela (x, y) que contiene un punto"""
+    n = 2 ** z
+    lat = max(min(lat, LAT_MAX_MERCATOR), -LAT_MAX_MERCATOR)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def proyectar(lats, lngs, z, x, y):
+    """Coordenadas enteras dentro de la tesela (origen arriba a la izquierda)"""
+    n = 2 ** z
+    lat_rad = np.radians(np.clip(lats, -LAT_MAX_MERCATOR, LAT_MAX_MERCATOR))
+    px = ((np.asarray(lngs) + 180.0) / 360.0 * n - x) * EXTENSION
+    py = ((1 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2 * n - y) * EXTENSION
+    return np.round(px).astype(np.int64), np.round(py).astype(np.int64)
+
+
+def tesela_valida(z, x, y):
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+# --- Generación ----------------------------------------------------------------
+
+def atributos_zoom(tipo, df, z):
+    """Atributos de las features según el zoom (menos atributos en zoom bajo)"""
+    config = COLUMNAS_POR_TIPO[tipo]
+    col_id, prefijo_id = config['id']
+    if col_id in df.columns:
+        atributos = {'id': columna_str(df, col_id)}
+    else:
+        atributos = {'id': [f"{prefijo_id}_{p}" for p in df.index.tolist()]}
+    if z < ZOOM_SOLO_ID:
+        return atributos
+
+    col_nombre, nombre_defecto = config['nombre']
+    atributos['nombre'] = [config['prefijo_nombre'] + nombre
+                           for nombre in columna_str(df, col_nombre, nombre_defecto)]
+    if z >= ZOOM_NOMBRE:
+        for campo, columna in config['info_especifica'].items():
+            if columna in df.columns:
+                atributos[campo] = columna_str(df, columna)
+    return atributos
+
+
+def generar_tesela(tipo, df, indice, z, x, y):
+    """Bytes MVT de una capa en la tesela z/x/y (b'' si no hay puntos)"""
+    if df is None or df.empty or indice is None:
+        return b""
+
+    lat_min, lat_max, lng_min, lng_max = limites_tesela(z, x, y)
+    margen_lng = (lng_max - lng_min) * BUFFER / EXTENSION
+    margen_lat = (lat_max - lat_min) * BUFFER / EXTENSION
+    posiciones = indice.consultar_caja(lat_min - margen_lat, lat_max + margen_lat,
+                                       lng_min - margen_lng, lng_max + margen_lng)
+    if len(posiciones) == 0:
+        return b""
+
+    posiciones = np.sort(posiciones)
+    px, py = proyectar(df['latitud'].to_numpy(dtype=np.float64)[posiciones],
+                       df['longitud'].to_numpy(dtype=np.float64)[posiciones], z, x, y)
+
+    conteos = None
+    if z < ZOOM_SOLO_ID:
+        # Un solo punto por celda de fusión, con el conteo de los que representa
+        celdas = (py // CELDA_FUSION) * (EXTENSION * 4) + (px // CELDA_FUSION)
+        _, primeros, conteos = np.unique(celdas, return_index=True, return_counts=True)
+        posiciones, px, py = posiciones[primeros], px[primeros], py[primeros]
+
+    filas = df.iloc[posiciones]
+    atributos = atributos_zoom(tipo, filas, z)
+    if conteos is not None:
+        atributos['n'] = conteos.tolist()
+
+    return codificar_capa(tipo, posiciones.tolist(), px.tolist(), py.tolist(), atributos)
+
+
+# --- Cache en disco -------------------------------------------------------------
+
+class CacheTeselas:
+    """Teselas ya codificadas en disco, por capa y huella de los datos"""
+
+    def __init__(self, data_path):
+        self.directorio = Path(os.getenv("TESELAS_DIR", Path(data_path) / SNAPSHOT_DIR / TESELAS_DIR))
+
+    def ruta(self, capa, huella, z, x, y):
+        return self.directorio / capa / huella / str(z) / str(x) / f"{y}.pbf"
+
+    def obtener(self, capa, huella, z, x, y):
+        ruta = self.ruta(capa, huella, z, x, y)
+        try:
+            return ruta.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, capa, huella, z, x, y, contenido):
+        ruta = self.ruta(capa, huella, z, x, y)
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal = ruta.with_name(f".{y}.{os.getpid()}.tmp")
+            temporal.write_bytes(contenido)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la tesela {capa}/{z}/{x}/{y}: {e}")
+
+    def limpiar(self, capa, huella):
+        """Borrar las teselas de versiones anteriores de una capa"""
+        directorio = self.directorio / capa
+        if not directorio.is_dir():
+            return
+        for anterior in directorio.iterdir():
+            if anterior.is_dir() and anterior.name != huella:
+                shutil.rmtree(anterior, ignore_errors=True)
+
+
+def teselas_region(limites, z):
+    """Teselas (x, y) que cubren un rectángulo (lat_min, lat_max, lng_min, lng_max)"""
+    lat_min, lat_max, lng_min, lng_max = limites
+    x_desde, y_desde = tesela_de(lat_max, lng_min, z)
+    x_hasta, y_hasta = tesela_de(lat_min, lng_max, z)
+    for x in range(x_desde, x_hasta + 1):
+        for y in range(y_desde, y_hasta + 1):
+            yield x, y
+
+
+def main():
+    # Importar aquí: main.py importa este módulo al cargar la API
+    import main as api
+
+    parser = argparse.ArgumentParser(description="Precalcular teselas vectoriales sobre Perú")
+    parser.add_argument("--capas", default=",".join(api.CARGADORES), help="Capas separadas por coma")
+    parser.add_argument("--zoom-min", type=int, default=0)
+    parser.add_argument("--zoom-max", type=int, default=ZOOM_MAX_PRECALCULO)
+    args = parser.parse_args()
+
+    api.load_datasets()
+    for capa in [c.strip() for c in args.capas.split(",")]:
+        if capa not in api.datasets_cache:
+            print(f"⚠️ Capa desconocida: {capa}")
+            continue
+        generadas = con_datos = 0
+        for z in range(args.zoom_min, args.zoom_max + 1):
+            for x, y in teselas_region(LIMITES_PERU, z):
+                contenido = api.obtener_tesela(api.datasets_cache[capa], z, x, y)
+                generadas += 1
+                con_datos += bool(contenido)
+        print(f"🧱 {capa}: {generadas:,} teselas (z{args.zoom_min}-{args.zoom_max}), {con_datos:,} con puntos")
+
+
+if __name__ == "__main__":
+    main()
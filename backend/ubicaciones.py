@@ -0,0 +1,112 @@
+"""
+Filtro de ubicación (departamento, provincia, distrito) sobre códigos.
+
+Los nombres de las tres columnas se normalizan una sola vez por valor
+distinto (sin tildes, en mayúsculas, espacios simples) y se indexan por
+trigramas. Un texto de búsqueda se resuelve contra ese vocabulario (pocos
+miles de nombres) en una tabla booleana por código de cada nivel; filtrar
+las filas candidatas es indexar esa tabla con los códigos categóricos, sin
+comparar texto fila por fila. Coincide si el texto aparece dentro del
+nombre de cualquiera de los tres niveles.
+"""
+
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from catalogo import COLUMNAS_UBICACION
+
+MAX_CONSULTAS_CACHEADAS = 1024
+
+
+def normalizar_texto(texto):
+    """Texto sin tildes, en mayúsculas y con espacios simples ('Junín ' -> 'JUNIN')"""
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.upper().split())
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def codigos_categoricos(serie):
+    """(códigos int32 con -1 para faltantes, valores distintos) de una columna"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.int32, copy=False), list(serie.cat.categories)
+    codigos, valores = pd.factorize(serie)
+    return codigos.astype(np.int32), list(valores)
+
+
+class IndiceUbicaciones:
+    """Vocabulario normalizado de ubicaciones con índice de trigramas"""
+
+    def __init__(self, df):
+        self.codigos = {}  # nivel -> código de cada fila
+        self.totales = {}  # nivel -> cantidad de códigos del nivel
+        self.etiquetas = []  # nombres normalizados distintos (de los tres niveles)
+        self.codigos_etiqueta = []  # etiqueta -> {nivel: [códigos]}
+        ids = {}
+
+        for nivel in COLUMNAS_UBICACION:
+            if nivel not in df.columns:
+                continue
+            codigos, valores = codigos_categoricos(df[nivel])
+            self.codigos[nivel] = codigos
+            self.totales[nivel] = len(valores)
+            for codigo, valor in enumerate(valores):
+                etiqueta = normalizar_texto(valor)
+                if etiqueta not in ids:
+                    ids[etiqueta] = len(self.etiquetas)
+                    self.etiquetas.append(etiqueta)
+                    self.codigos_etiqueta.append({})
+                self.codigos_etiqueta[ids[etiqueta]].setdefault(nivel, []).append(codigo)
+
+        publicaciones = defaultdict(list)
+        for k, etiqueta in enumerate(self.etiquetas):
+            for trigrama in trigramas(etiqueta):
+                publicaciones[trigrama].append(k)
+        self.trigramas = {t: np.array(ks, dtype=np.int32) for t, ks in publicaciones.items()}
+        self._consultas = {}  # texto normalizado -> tablas por nivel
+
+    def etiquetas_coincidentes(self, texto):
+        """Etiquetas que contienen el texto (ya normalizado)"""
+        if len(texto) >= 3:
+            listas = [self.trigramas.get(t) for t in trigramas(texto)]
+            if any(lista is None for lista in listas):
+                return []
+            listas.sort(key=len)
+            candidatas = listas[0]
+            for lista in listas[1:]:
+                candidatas = np.intersect1d(candidatas, lista, assume_unique=True)
+            candidatas = candidatas.tolist()
+        else:
+            candidatas = range(len(self.etiquetas))  # Texto corto: el vocabulario es chico
+        return [k for k in candidatas if texto in self.etiquetas[k]]
+
+    def tablas(self, texto):
+        """{nivel: tabla booleana por código (+1 para el -1 de faltantes)} del texto"""
+        texto = normalizar_texto(texto)
+        if texto in self._consultas:
+            return self._consultas[texto]
+
+        tablas = {}
+        for k in self.etiquetas_coincidentes(texto):
+            for nivel, codigos in self.codigos_etiqueta[k].items():
+                if nivel not in tablas:
+                    tablas[nivel] = np.zeros(self.totales[nivel] + 1, dtype=bool)
+                tablas[nivel][codigos] = True
+
+        if len(self._consultas) >= MAX_CONSULTAS_CACHEADAS:
+            self._consultas.clear()
+        self._consultas[texto] = tablas
+        return tablas
+
+    def mascara(self, texto, posiciones):
+        """Filas (de posiciones) cuya ubicación en algún nivel contiene el texto"""
+        mascara = np.zeros(len(posiciones), dtype=bool)
+        for nivel, tabla in self.tablas(texto).items():
+            mascara |= tabla[self.codigos[nivel][posiciones]]
+        return mascara
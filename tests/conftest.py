@@ -0,0 +1,63 @@
+"""
+Configuración común de las pruebas del backend.
+
+Los módulos de backend/ se importan como en la API (`cd backend`), y el
+paquete ai de backend/reporte como lo importa reportes_ia.py. Las variables
+de entorno desactivan lo que depende de la máquina (vigilante de DATAFINAL,
+memory-map, cache SQLite de completaciones) antes de importar nada.
+"""
+
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+BACKEND = RAIZ / "backend"
+
+os.environ.setdefault("RECARGA_INTERVALO", "0")
+os.environ.setdefault("DATASETS_MMAP", "0")
+os.environ.setdefault("REPORTES_CACHE", "0")
+os.environ.setdefault("TESELAS_DIR", tempfile.mkdtemp(prefix="teselas-"))
+
+for ruta in (BACKEND, BACKEND / "reporte"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+
+@pytest.fixture
+def publicar():
+    """Publicar datasets de prueba en la API y dejar el estado global limpio al terminar"""
+    import main
+
+    def _publicar(tipo, df, huella="prueba"):
+        dataset = main.construir_dataset(tipo, df, None, huella)
+        main.publicar_dataset(dataset)
+        return dataset
+
+    yield _publicar
+    with main.bloqueo_carga:
+        main.datasets_cache.clear()
+        main.estado_datasets.clear()
+        main.actualizar_catalogo()
+    main.cache_mapa.invalidar()
+
+
+@pytest.fixture
+def cliente_ia(monkeypatch):
+    """OpenAIClient con una configuración de prueba (config.py no está en el repositorio)"""
+    from ai.openai_client import OpenAIClient
+
+    class Config:
+        OPENAI_MODEL = "gpt-4o-mini"
+
+        @staticmethod
+        def validate():
+            return True
+
+    monkeypatch.setitem(sys.modules, "config", types.SimpleNamespace(Config=Config))
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-prueba")
+    return OpenAIClient()
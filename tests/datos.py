@@ -0,0 +1,90 @@
+"""
+Encabezados reales de los CSV de DATAFINAL y utilidades para escribir datos
+de prueba con ellos (los CSV completos no están en el repositorio).
+"""
+
+import csv
+
+_INAF = [
+    'TXORIGEN', 'ANHO', 'MES', 'EXPEDIENTE', 'CUC', 'COORDINACION', 'FECHAINI', 'FECHAFIN', 'TXUBIGEO',
+    'TXZONA', 'COORD_ESTE', 'COORD_NORTE', 'PUNTO_MUESTREO', 'TIPO_PUNT', 'FECHA_PTO', 'HORA_PTO',
+    'LABORATORIO_ANONIMIZADO', 'TAREA_TDR', 'MATRIZ', 'PARAMETRO', 'SIGNO_PARAMETRO', 'UNIDAD_MEDIDA_PARAMETRO',
+]
+_VALORES_AGUA = [
+    'RS', 'OTROS', 'BTEX', 'Hidrocarburos.Aromáticos.Policíclicos.PAH', 'Metales.Disueltos',
+    'Metales.Disueltos.por.ICP.MS.incluido.Hg', 'Metales.Totales', 'Metales.Totales.por.ICP.MS.incluido.Hg',
+]
+_EVALUACION = [
+    'ID_INFORME', 'NOMBRE_EVALUACION', 'ETAPA', 'COMPONENTE_AMBIENTAL', 'PROCEDENCIA_MUESTRA',
+    'PROCEDENCIA_ESPECIFICA_MUESTRA', 'NOMBRE_PUNTO', 'FECHA_MUESTRA', 'HORA_MUESTRA', 'ESTE', 'NORTE', 'ALTITUD',
+    'ZONA', 'DATUM', 'DESCRIPCION_UBICACION', 'TIPO_MUESTRA', 'PARAMETRO', 'UNIDAD_MEDIDA', 'SIGNO',
+]
+
+ENCABEZADOS = {
+    'oefa_agua_residual_efluentes.csv': _INAF + _VALORES_AGUA,
+    'oefa_agua_subterranea.csv': [c.replace('LABORATORIO_', 'LABORATORIO.') for c in _INAF] + _VALORES_AGUA,
+    'oefa_agua_superficial.csv': [
+        {'LABORATORIO_ANONIMIZADO': 'LABORATORIO.ANONIMIZADO', 'TIPO_PUNT': 'TIPO_PUNTO'}.get(c, c)
+        for c in _INAF[:10] + ['COORD_NORTE', 'COORD_ESTE'] + _INAF[12:]
+    ] + _VALORES_AGUA,
+    'oefa_evaluacion_causalidad.csv': _EVALUACION + [
+        'Físico.Químicos', 'Ensayo', 'BTEX', 'Hidrocarburos.Aromáticos.Policíclicos..HAP.s.', 'Metales.totales',
+        'Parámetros.analíticos', 'Hidrocarburos.Totales.del.Petróleo...Fracción.Aromática',
+        'Parámetros.Inorgánicos', 'Hidrocarburos.Totales.de.Petróleo', 'Resultados.in.situ', 'Metales.disuelto',
+        'Aniones', 'Alcanilidad', 'Metales...Especiación', 'Ensayos.microbiológicos', 'Parámetros.Orgánicos',
+        'Ensayo.por.cromatografía...HTP', 'OTROS', 'Ensayo.por.cromatografía...PAHS',
+        'Aniones.por.Cromatografía.Iónica', 'PCB..Policloruros.Bifenilos.', 'Ensayos.Tercerizados',
+        'Ensayos.por.Cromatografía...Pesticidas.Organofosforados', 'Ensayos.Microbiológicos',
+        'Ensayos.por.Cromatografía', 'Ensayos.por.Cromatografía...Bifenilos.Policlorados..Pcbs.',
+        'Ensayos.por.Cromatografía...Pesticidas.Organoclorados', 'Formas.Nitrogenadas.Fosforadas', 'Fecha_corte',
+    ],
+    'oefa_evaluacion_temprana.csv': _EVALUACION + [
+        'Aniones.por.Cromatografía.Iónica', 'Ensayo.por.cromatografía...HTP', 'Metales.disueltos',
+        'Metales.totales', 'Físico.Químicos', 'Resultado.in.situ', 'PCB..Policloruros.Bifenilos.',
+        'Pesticidas.organoclorados', 'Pesticidas.Organofosforados', 'Plaguicidas.Carbamatos', 'Fecha_corte',
+    ],
+    'oefa_suelo_sedimento.csv': _INAF[:14] + [
+        'LABORATORIO_ANONIMIZADO', 'TAREA_TDR', 'MATRIZ', 'FECHA_PTO', 'HORA_PTO', 'PARAMETRO', 'SIGNO_PARAMETRO',
+        'UNIDAD_MEDIDA_PARAMETRO', 'RS', 'OTROS', 'ABA', 'Aniones', 'Análisis.granulométrico', 'BTEX',
+        'BTEX..Benceno..Tolueno..Etilbenceno..Xilenos.', 'Hidrocarburos.Aromáticos.Policíclicos.PAH',
+        'Metales.Totales', 'Metales.Totales.y.Mercurio', 'PAHs', 'Shake.Flash.en.aniones..mg.L.',
+        'Shake.Flask.en.metales..mg.L..o.Shake.Flask.Test..Solubity.Testing..SFT.',
+    ],
+}
+
+UBIGEO_ANDOAS = 'LORETO, DATEM DEL MARAÑON, ANDOAS / LORETO, LORETO, TROMPETEROS'
+
+
+def escribir_csv(ruta, filas, encabezados=None):
+    """CSV con los encabezados reales del archivo (columnas no dadas quedan vacías)"""
+    encabezados = encabezados or ENCABEZADOS[ruta.name]
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=encabezados)
+        escritor.writeheader()
+        for fila in filas:
+            faltantes = set(fila) - set(encabezados)
+            assert not faltantes, f"Columnas que {ruta.name} no tiene: {faltantes}"
+            escritor.writerow(fila)
+    return ruta
+
+
+def fila_agua_superficial(**valores):
+    """Una muestra de agua superficial (Andoas, zona 18) con su valor en Metales.Totales"""
+    return {
+        'TXORIGEN': 'INAF', 'ANHO': '2021', 'MES': 'MARZO', 'EXPEDIENTE': '0123-2021-OEFA', 'CUC': '0001-3-2021-402',
+        'TXUBIGEO': UBIGEO_ANDOAS, 'TXZONA': '18', 'COORD_ESTE': '349000', 'COORD_NORTE': '9680000',
+        'PUNTO_MUESTREO': 'ESP-01', 'TIPO_PUNTO': 'AGUA SUPERFICIAL', 'FECHA_PTO': '2021-03-05',
+        'PARAMETRO': 'Plomo', 'SIGNO_PARAMETRO': '=', 'UNIDAD_MEDIDA_PARAMETRO': 'mg/L',
+        'Metales.Totales': '0.05', **valores,
+    }
+
+
+def fila_evaluacion(**valores):
+    """Una muestra de evaluación de causalidad (Tacna, zona 19) con su valor en Metales.totales"""
+    return {
+        'ID_INFORME': '00123-2018-OEFA/DEAM-STEC', 'NOMBRE_EVALUACION': 'Evaluación Locumba', 'ETAPA': 'Ejecución',
+        'COMPONENTE_AMBIENTAL': 'Agua superficial', 'NOMBRE_PUNTO': 'ACA-07', 'FECHA_MUESTRA': '2018-02-21',
+        'ESTE': '340000', 'NORTE': '8040000', 'ALTITUD': '1200', 'ZONA': '19', 'DATUM': 'WGS84',
+        'PARAMETRO': 'Plomo', 'UNIDAD_MEDIDA': 'mg/L', 'SIGNO': '<', 'Metales.totales': '0.002',
+        'Fecha_corte': '2023-06-30', **valores,
+    }
@@ -0,0 +1,61 @@
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from busqueda import EXACTA, PALABRAS, PREFIJO, IndiceNombres, palabras
+
+SALUD = pd.DataFrame({
+    'codigo_unico': [1, 2, 3, 4, 5],
+    'nombre_establecimiento': ['Posta San Juan', 'San Juan', 'Hospital de San Juan de Lurigancho',
+                               'San Juan', 'Posta Belén'],
+    'departamento': ['LIMA', 'PIURA', 'LIMA', 'LORETO', 'LORETO'],
+    'latitud': [-12.0, -5.2, -12.0, -3.7, -3.75],
+    'longitud': [-77.0, -80.6, -76.99, -73.2, -73.25],
+})
+
+
+def _clases(resultados):
+    return [(clase, fila) for clase, _, fila, _ in resultados]
+
+
+def test_palabras_como_prefijo_en_cualquier_orden():
+    indice = IndiceNombres('salud', SALUD)
+    assert palabras('HOSPITAL DE SAN JUAN 2') == ['HOSPITAL', 'DE', 'SAN', 'JUAN', '2']
+    _, total = indice.buscar('JUAN SA', 10)
+    assert total == 3  # Nombres distintos: 'San Juan' aparece dos veces
+    _, total = indice.buscar('LURIG', 10)
+    assert total == 1
+    assert indice.buscar('CUSCO', 10) == ([], 0)
+    assert indice.buscar('', 10) == ([], 0)
+
+
+def test_exacta_luego_prefijo_luego_palabras():
+    indice = IndiceNombres('salud', SALUD)
+    resultados, _ = indice.buscar('SAN JUAN', 10)
+    # Sin centro, dentro de cada clase primero los nombres más cortos
+    assert _clases(resultados) == [(EXACTA, 1), (EXACTA, 3), (PALABRAS, 0), (PALABRAS, 2)]
+    resultados, _ = indice.buscar('HOSPITAL DE SAN', 10)
+    assert _clases(resultados) == [(PREFIJO, 2)]
+    assert len(indice.buscar('SAN', 2)[0]) == 2
+
+
+def test_centro_ordena_por_cercania():
+    indice = IndiceNombres('salud', SALUD)
+    resultados, _ = indice.buscar('SAN JUAN', 10, centro=(-3.7, -73.2))
+    assert _clases(resultados)[:2] == [(EXACTA, 3), (EXACTA, 1)]  # Mismo nombre, el de Iquitos primero
+    assert resultados[0][3] < 1
+
+
+def test_endpoint_buscar(publicar):
+    publicar('salud', SALUD)
+    cliente = TestClient(main.app)
+    datos = cliente.get("/api/buscar", params={"q": "posta belen", "tipos": "salud,educacion"}).json()
+    assert datos["total"] == 1
+    resultado = datos["resultados"][0]
+    assert resultado["id"] == "5" and resultado["nombre"] == "Posta Belén"
+    assert resultado["coincidencia"] == "exacta" and resultado["ubicacion"]["departamento"] == "LORETO"
+    assert datos["tipos_cargando"] == ["educacion"]
+
+    cercanos = cliente.get("/api/buscar", params={"q": "san juan", "centro_lat": -5.2, "centro_lng": -80.6}).json()
+    assert cercanos["resultados"][0]["id"] == "2" and cercanos["resultados"][0]["distancia_km"] == 0
+    assert cliente.get("/api/buscar", params={"q": "x", "tipos": "oefa"}).status_code == 400
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from ai import cache_completaciones as modulo
+from ai.cache_completaciones import CacheCompletaciones, clave_completacion
+
+
+def _resultado(texto, tokens=100):
+    return {"content": texto, "model": "gpt-4o-mini", "usage": {"total_tokens": tokens}, "execution_time": 1.5}
+
+
+class Reloj:
+    def __init__(self, ahora=1_000_000.0):
+        self.ahora = ahora
+
+    def time(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(modulo, "time", reloj)
+    return reloj
+
+
+def test_clave_por_contenido():
+    clave = clave_completacion("gpt-4o-mini", "sistema", "prompt", 0.2, 2000)
+    assert clave == clave_completacion("gpt-4o-mini", "sistema", "prompt", 0.2, 2000.0)
+    assert len(clave) == 64
+    for otra in (("gpt-4o", "sistema", "prompt", 0.2, 2000), ("gpt-4o-mini", None, "prompt", 0.2, 2000),
+                 ("gpt-4o-mini", "sistema", "prompt ", 0.2, 2000), ("gpt-4o-mini", "sistema", "prompt", 0.3, 2000),
+                 ("gpt-4o-mini", "sistema", "prompt", 0.2, 1999)):
+        assert clave_completacion(*otra) != clave
+
+
+def test_acierto_persistente_y_estadisticas(tmp_path, reloj):
+    cache = CacheCompletaciones(tmp_path / "cache.sqlite3")
+    assert cache.obtener("a") is None
+    cache.guardar("a", _resultado("texto", tokens=120))
+    assert cache.obtener("a") == _resultado("texto", tokens=120)
+
+    # Otro proceso (otra conexión) ve lo guardado
+    otra = CacheCompletaciones(tmp_path / "cache.sqlite3")
+    assert otra.obtener("a")["content"] == "texto"
+    estadisticas = otra.estadisticas()
+    assert estadisticas["entradas"] == 1 and estadisticas["aciertos_historico"] == 2
+    assert estadisticas["tokens_ahorrados_historico"] == 240
+    assert cache.estadisticas()["hits"] == 1 and cache.estadisticas()["misses"] == 1
+    assert cache.estadisticas()["hit_ratio"] == 0.5
+
+
+def test_vencimiento(tmp_path, reloj):
+    cache = CacheCompletaciones(tmp_path / "cache.sqlite3", ttl_dias=1)
+    cache.guardar("a", _resultado("viejo"))
+    reloj.ahora += 86400 - 1
+    assert cache.obtener("a") is not None
+    reloj.ahora += 2
+    assert cache.obtener("a") is None
+    assert cache.estadisticas()["entradas"] == 0 and cache.desalojadas == 1
+
+    # Al guardar también se descartan las vencidas, aunque nadie las pida
+    cache.guardar("b", _resultado("b"))
+    reloj.ahora += 86400 + 1
+    cache.guardar("c", _resultado("c"))
+    assert cache.estadisticas()["entradas"] == 1
+
+
+def test_desalojo_de_la_menos_usada(tmp_path, reloj):
+    cache = CacheCompletaciones(tmp_path / "cache.sqlite3", max_entradas=2, ttl_dias=None)
+    cache.guardar("a", _resultado("a"))
+    reloj.ahora += 1
+    cache.guardar("b", _resultado("b"))
+    reloj.ahora += 1
+    assert cache.obtener("a") is not None  # "a" pasa a ser la más reciente
+    reloj.ahora += 1
+    cache.guardar("c", _resultado("c"))
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") is not None and cache.obtener("c") is not None
+    assert cache.desalojadas == 1
+
+
+def test_llamadas_simultaneas_generan_una_vez(tmp_path):
+    cache = CacheCompletaciones(tmp_path / "cache.sqlite3")
+    llamadas = []
+
+    async def generar():
+        llamadas.append(1)
+        await asyncio.sleep(0.05)
+        return _resultado("único", tokens=80)
+
+    async def varias():
+        return await asyncio.gather(*(cache.resolver("k", generar) for _ in range(5)))
+
+    resultados = asyncio.run(varias())
+    assert len(llamadas) == 1
+    assert [acierto for _, acierto in resultados].count(False) == 1
+    assert all(resultado["content"] == "único" for resultado, _ in resultados)
+    assert cache.hits == 4 and cache.misses == 1 and cache.tokens_ahorrados == 320
+    assert asyncio.run(cache.resolver("k", generar)) == (_resultado("único", tokens=80), True)
+
+
+def test_error_se_propaga_y_no_se_guarda(tmp_path):
+    cache = CacheCompletaciones(tmp_path / "cache.sqlite3")
+
+    async def fallar():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("API caída")
+
+    async def varias():
+        return await asyncio.gather(*(cache.resolver("k", fallar) for _ in range(3)), return_exceptions=True)
+
+    errores = asyncio.run(varias())
+    assert all(isinstance(e, RuntimeError) for e in errores)
+    assert cache.obtener("k") is None and not cache._en_curso
+
+
+def test_generate_completion_usa_la_cache(tmp_path, cliente_ia, monkeypatch):
+    cliente_ia.cache = CacheCompletaciones(tmp_path / "cache.sqlite3")
+    llamadas = []
+
+    async def crear(*args):
+        llamadas.append(args)
+        return _resultado("reporte", tokens=150)
+
+    monkeypatch.setattr(cliente_ia, "_create_completion", crear)
+    primera = asyncio.run(cliente_ia.generate_completion("prompt", "sistema", max_tokens=500))
+    segunda = asyncio.run(cliente_ia.generate_completion("prompt", "sistema", max_tokens=500))
+    sin_cache = asyncio.run(cliente_ia.generate_completion("prompt", "sistema", max_tokens=500, use_cache=False))
+    assert (primera["cached"], segunda["cached"], sin_cache["cached"]) == (False, True, False)
+    assert segunda["content"] == "reporte" and len(llamadas) == 2
+    assert cliente_ia.cache_stats()["tokens_ahorrados"] == 150
@@ -0,0 +1,53 @@
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from cache_respuestas import CacheLRU, cuantizar
+
+
+def test_lru_desaloja_la_menos_usada():
+    cache = CacheLRU(tamano_maximo=2, ttl=None)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    assert cache.obtener('a') == 1
+    cache.guardar('c', 3)
+    assert cache.obtener('b') is None
+    assert cache.obtener('a') == 1 and cache.obtener('c') == 3
+    estadisticas = cache.estadisticas()
+    assert estadisticas["desalojadas"] == 1 and estadisticas["hits"] == 3 and estadisticas["misses"] == 1
+
+
+def test_ttl_e_invalidar(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr("cache_respuestas.time.monotonic", lambda: reloj[0])
+    cache = CacheLRU(tamano_maximo=4, ttl=10)
+    cache.guardar('a', 1)
+    reloj[0] += 5
+    assert cache.obtener('a') == 1
+    reloj[0] += 6
+    assert cache.obtener('a') is None
+    assert cache.estadisticas()["expiradas"] == 1
+
+    cache.guardar('b', 2)
+    cache.invalidar()
+    assert cache.obtener('b') is None
+    assert CacheLRU(tamano_maximo=0).guardar('x', 1) is None
+
+
+def test_cuantizar():
+    assert cuantizar(-12.04567, 0.001) == -12.046
+    assert cuantizar(-12.04567, 0) == -12.04567
+
+
+def test_publicar_version_nueva_vacia_la_cache_del_mapa(publicar):
+    df = pd.DataFrame({'codigo_unico': [1], 'latitud': [-12.0], 'longitud': [-77.0]})
+    publicar('salud', df)
+    cliente = TestClient(main.app)
+    parametros = {"centro_lat": -12.0, "centro_lng": -77.0, "radio_km": 5, "tipos": "salud"}
+    assert cliente.get("/api/mapa/puntos", params=parametros).headers["x-cache"] == "MISS"
+    assert cliente.get("/api/mapa/puntos", params=parametros).headers["x-cache"] == "HIT"
+    assert main.cache_mapa.estadisticas()["entradas"] == 1
+
+    publicar('salud', df)
+    assert main.cache_mapa.estadisticas()["entradas"] == 0
+    assert cliente.get("/api/mapa/puntos", params=parametros).headers["x-cache"] == "MISS"
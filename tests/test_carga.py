@@ -0,0 +1,79 @@
+import threading
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _df(tipo):
+    return pd.DataFrame({'latitud': [-12.0, -13.0], 'longitud': [-77.0, -76.0]})
+
+
+def test_tipos_se_leen_en_paralelo(publicar, monkeypatch):
+    # Cada lectura espera a las demás: solo termina si los cuatro tipos se leen a la vez
+    barrera = threading.Barrier(len(main.CARGADORES), timeout=10)
+
+    def leer_tipo(tipo):
+        barrera.wait()
+        return _df(tipo), None, None, f"huella-{tipo}", {}
+
+    monkeypatch.setattr(main, 'leer_tipo', leer_tipo)
+    main.load_datasets()
+
+    assert all(main.dataset_listo(tipo) for tipo in main.CARGADORES)
+    assert {tipo: main.datasets_cache[tipo].huella for tipo in main.CARGADORES} == {
+        tipo: f"huella-{tipo}" for tipo in main.CARGADORES
+    }
+    assert TestClient(main.app).get("/").json()["datasets_loaded"] is True
+
+
+def test_cada_tipo_se_publica_al_terminar(publicar, monkeypatch):
+    liberar_oefa = threading.Event()
+    publicados = threading.Semaphore(0)
+
+    def leer_tipo(tipo):
+        if tipo == 'oefa':
+            assert liberar_oefa.wait(10)
+        return _df(tipo), None, None, "huella", {}
+
+    def publicar_dataset(dataset, original=main.publicar_dataset):
+        original(dataset)
+        publicados.release()
+
+    monkeypatch.setattr(main, 'leer_tipo', leer_tipo)
+    monkeypatch.setattr(main, 'publicar_dataset', publicar_dataset)
+    carga = threading.Thread(target=main.load_datasets)
+    carga.start()
+    try:
+        for _ in range(len(main.CARGADORES) - 1):
+            assert publicados.acquire(timeout=10)
+
+        cliente = TestClient(main.app)
+        estado = cliente.get("/").json()
+        assert estado["datasets"] == {'educacion': 'listo', 'salud': 'listo', 'poblacion': 'listo',
+                                      'oefa': 'cargando'}
+        assert estado["datasets_loaded"] is False
+        assert cliente.get("/api/punto/oefa/OEFA_0").status_code == 503
+        assert cliente.get("/api/punto/educacion/EDU_0").status_code != 503
+    finally:
+        liberar_oefa.set()
+        carga.join(10)
+    assert main.dataset_listo('oefa')
+
+
+def test_error_en_un_tipo_no_frena_a_los_demas(publicar, monkeypatch):
+    def leer_tipo(tipo):
+        if tipo == 'salud':
+            raise OSError("salud_procesado.csv ilegible")
+        return _df(tipo), None, None, "huella", {}
+
+    monkeypatch.setattr(main, 'leer_tipo', leer_tipo)
+    main.load_datasets()
+
+    assert main.estado_datasets['salud'] == 'error'
+    assert 'salud' not in main.datasets_cache
+    assert all(main.dataset_listo(tipo) for tipo in ('educacion', 'poblacion', 'oefa'))
+    # Una segunda carga no repite los tipos ya cargados ni el que falló
+    main.load_datasets()
+    assert main.estado_datasets['salud'] == 'error'
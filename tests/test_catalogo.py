@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from catalogo import _rango_anios, catalogo_dataset, combinar_catalogos, no_modificado_desde
+
+
+def test_rango_anios_combina_anho_y_fecha_por_fila():
+    df = pd.DataFrame({
+        'ANHO': [2015, None, None],
+        'FECHA_MUESTRA': [None, '2019-02-26', '21/02/2018'],
+    })
+    # La fecha que no es ISO se descarta en lugar de interpretarse a ciegas
+    assert _rango_anios(df) == {"desde": 2015, "hasta": 2019}
+    assert _rango_anios(pd.DataFrame({'FECHA_MUESTRA': ['2018-02-21']})) == {"desde": 2018, "hasta": 2018}
+    assert _rango_anios(pd.DataFrame({'otro': [1]})) is None
+
+
+def test_combinar_catalogos():
+    parciales = {
+        'oefa': catalogo_dataset(pd.DataFrame({
+            'departamento': ['LIMA', 'LIMA'], 'provincia': ['LIMA', 'HUARAL'], 'distrito': ['ATE', None],
+            'PARAMETRO': ['Plomo', 'Zinc'], 'ANHO': [2016, 2020],
+        })),
+        'salud': catalogo_dataset(pd.DataFrame({'departamento': ['CUSCO'], 'provincia': ['CUSCO']})),
+    }
+    catalogo = combinar_catalogos(parciales, ['oefa', 'salud'])
+    contenido = catalogo["contenido"]
+    assert contenido["jerarquia"] == {"CUSCO": {"CUSCO": []}, "LIMA": {"HUARAL": [], "LIMA": ["ATE"]}}
+    assert contenido["anios"] == {"desde": 2016, "hasta": 2020}
+    assert contenido["total_registros"] == 3
+    assert combinar_catalogos(parciales, ['oefa', 'salud'])["etag"] == catalogo["etag"]
+
+
+def test_no_modificado_desde_compara_fechas():
+    ultima = "Sat, 17 Oct 2026 10:00:00 GMT"
+    assert no_modificado_desde(ultima, ultima)
+    assert no_modificado_desde(ultima, "Sat, 17 Oct 2026 11:30:00 GMT")
+    assert no_modificado_desde(ultima, "Sat, 17 Oct 2026 05:00:00 -0500")  # Misma hora en otra zona
+    assert not no_modificado_desde(ultima, "Sat, 17 Oct 2026 09:59:59 GMT")
+    assert not no_modificado_desde(ultima, "ayer")
+
+
+def test_endpoint_revalida_con_304(publicar):
+    publicar('salud', pd.DataFrame({
+        'codigo_unico': [1], 'departamento': ['LIMA'], 'latitud': [-12.0], 'longitud': [-77.0],
+    }))
+    cliente = TestClient(main.app)
+    respuesta = cliente.get("/api/filtros/opciones")
+    assert respuesta.status_code == 200
+    etag, ultima = respuesta.headers["etag"], respuesta.headers["last-modified"]
+
+    assert cliente.get("/api/filtros/opciones", headers={"If-None-Match": etag}).status_code == 304
+    despues = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+    assert cliente.get("/api/filtros/opciones", headers={"If-Modified-Since": despues}).status_code == 304
+    antes = "Mon, 01 Jan 2001 00:00:00 GMT"
+    assert cliente.get("/api/filtros/opciones", headers={"If-Modified-Since": antes}).status_code == 200
+    assert cliente.get("/api/filtros/opciones", headers={"If-Modified-Since": ultima}).status_code == 304
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from ai import openai_client as modulo
+
+
+def test_un_cliente_por_loop(cliente_ia):
+    async def dos_veces():
+        return cliente_ia.client, cliente_ia.client
+
+    primero, repetido = asyncio.run(dos_veces())
+    assert primero is repetido
+    segundo, _ = asyncio.run(dos_veces())
+    assert segundo is not primero
+    # El loop del primer asyncio.run ya cerró: su cliente no queda retenido
+    assert list(cliente_ia._clients.values()) == [segundo]
+
+
+def test_aclose_cierra_los_clientes_de_cada_loop(cliente_ia):
+    listo = threading.Event()
+    ajeno = {}
+
+    def otro_hilo():
+        loop = asyncio.new_event_loop()
+
+        async def usar():
+            ajeno["cliente"] = cliente_ia.client
+            ajeno["fin"] = asyncio.Event()
+            listo.set()
+            await ajeno["fin"].wait()
+
+        ajeno["loop"] = loop
+        loop.run_until_complete(usar())
+        loop.close()
+
+    hilo = threading.Thread(target=otro_hilo)
+    hilo.start()
+    assert listo.wait(5)
+
+    async def cerrar():
+        propio = cliente_ia.client
+        await cliente_ia.aclose()
+        return propio
+
+    propio = asyncio.run(cerrar())
+    assert propio.is_closed() and ajeno["cliente"].is_closed()
+    assert cliente_ia._clients == {}
+    ajeno["loop"].call_soon_threadsafe(ajeno["fin"].set)
+    hilo.join(5)
+
+
+def test_cerrar_el_global_sin_crearlo(monkeypatch):
+    monkeypatch.setattr(modulo, "_openai_client", None)
+    asyncio.run(modulo.close_openai_client())
+    assert modulo.current_openai_client() is None
+
+
+def test_global_se_crea_una_vez(cliente_ia, monkeypatch):
+    creados = []
+
+    def crear():
+        creados.append(1)
+        return cliente_ia
+
+    monkeypatch.setattr(modulo, "_openai_client", None)
+    monkeypatch.setattr(modulo, "OpenAIClient", crear)
+    hilos = [threading.Thread(target=modulo.get_openai_client) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert creados == [1] and modulo.openai_client.model == "gpt-4o-mini"
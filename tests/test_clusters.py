@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from clusters import IndiceClusters, agregar, claves_celda, combinar_clusters
+
+
+def test_agregar_cuenta_y_centroides():
+    lats = np.array([-12.0, -12.001, -5.0])
+    lngs = np.array([-77.0, -77.001, -80.0])
+    claves, conteos, suma_lat, suma_lng = agregar(lats, lngs, 6)
+    assert conteos.sum() == 3 and sorted(conteos.tolist()) == [1, 2]
+    doble = conteos == 2
+    assert np.isclose(suma_lat[doble][0] / 2, -12.0005)
+    assert (np.diff(claves) > 0).all()
+    assert len(agregar([], [], 6)[0]) == 0
+
+
+def test_niveles_precalculados_iguales_a_agregar():
+    rng = np.random.default_rng(5)
+    lats, lngs = rng.uniform(-18, -3, 500), rng.uniform(-81, -69, 500)
+    indice = IndiceClusters(lats, lngs, zoom_max=4)
+    for zoom in range(5):
+        esperado = agregar(lats, lngs, zoom)
+        for obtenido, referencia in zip(indice.nivel(zoom), esperado):
+            np.testing.assert_array_equal(obtenido, referencia)
+        assert indice.nivel(zoom)[1].sum() == 500
+    assert indice.nivel(5) is None and indice.nivel(-1) is None
+
+
+def test_combinar_tipos_en_la_misma_celda():
+    zoom = 8
+    oefa = agregar([-12.0, -12.0], [-77.0, -77.0], zoom)
+    salud = agregar([-12.0, -3.5], [-77.0, -73.0], zoom)
+    clusters = combinar_clusters({'oefa': oefa, 'salud': salud, 'educacion': agregar([], [], zoom)})
+    assert sum(c["total"] for c in clusters) == 4
+    lima = next(c for c in clusters if c["total"] == 3)
+    assert lima["tipos_count"] == {"oefa": 2, "salud": 1}
+    assert (lima["latitud"], lima["longitud"]) == (-12.0, -77.0)
+    assert combinar_clusters({'oefa': agregar([], [], zoom)}) == []
+    assert claves_celda([-12.0], [-77.0], zoom)[0] in agregar([-12.0], [-77.0], zoom)[0]
+
+
+def _puntos_salud(publicar):
+    rng = np.random.default_rng(3)
+    lats = np.append(rng.uniform(-12.05, -11.95, 600), -5.0)  # Uno fuera del radio de Lima
+    lngs = np.append(rng.uniform(-77.05, -76.95, 600), -80.0)
+    publicar('salud', pd.DataFrame({'codigo_unico': np.arange(601), 'latitud': lats, 'longitud': lngs}))
+    return lats, lngs
+
+
+def test_mapa_en_clusters_sin_materializar_filas(publicar, monkeypatch):
+    lats, lngs = _puntos_salud(publicar)
+    cliente = TestClient(main.app)
+    parametros = {"centro_lat": -12.0, "centro_lng": -77.0, "tipos": "salud", "zoom": 6, "profile": 1}
+
+    # Radio que cubre todo el dataset: niveles precalculados, sin agregar en la consulta
+    def sin_agregar(*args):
+        raise AssertionError("debió usar el nivel precalculado")
+
+    with monkeypatch.context() as parche:
+        parche.setattr(main, 'agregar', sin_agregar)
+        datos = cliente.get("/api/mapa/puntos", params={**parametros, "radio_km": 2000}).json()
+    assert datos["modo"] == "clusters" and datos["tipos_count"] == {"salud": 601}
+    assert sum(c["total"] for c in datos["clusters"]) == 601
+    assert "filas" not in [e["etapa"] for e in datos["perfil"]["etapas"]]
+
+    # Vista parcial: se agrega desde las coordenadas de las posiciones en el radio
+    datos = cliente.get("/api/mapa/puntos", params={**parametros, "radio_km": 50}).json()
+    assert datos["tipos_count"] == {"salud": 600}
+    esperado = combinar_clusters({'salud': agregar(lats[:600], lngs[:600], 6)})
+    assert sorted((c["total"], c["latitud"], c["longitud"]) for c in datos["clusters"]) == \
+        sorted((c["total"], c["latitud"], c["longitud"]) for c in esperado)
+    assert "filas" not in [e["etapa"] for e in datos["perfil"]["etapas"]]
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+import exposicion
+from exposicion import Exposicion, PuntosMuestreo, calcular_exposicion
+from indice_espacial import IndiceEspacial, haversine_vectorizado
+from memoria_compartida import adjuntar_mmap, exportar_mmap
+
+
+def _destino(n=4000, semilla=2):
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(-13, -11, n), rng.uniform(-78, -76, n)
+
+
+def _esperado(lats, lngs, lat, lng, radio):
+    distancias = haversine_vectorizado(lat, lng, lats, lngs)
+    return set(np.flatnonzero(distancias <= radio).tolist())
+
+
+def test_puntos_muestreo_agrupa_filas_por_ubicacion():
+    df = pd.DataFrame({'latitud': [-12.0, -12.5, -12.0], 'longitud': [-77.0, -76.5, -77.0]})
+    puntos = PuntosMuestreo(df)
+    assert puntos.total == 2
+    assert puntos.registros.tolist() == [1, 2]  # Ordenadas por (lat, lng)
+    assert puntos.ubicacion_fila.tolist() == [1, 0, 1]
+    assert (puntos.lats[puntos.ubicacion_fila] == df['latitud'].to_numpy()).all()
+
+
+def test_exposicion_csr():
+    exp = Exposicion(3, np.array([0, 0, 2]), np.array([5, 9, 1]), np.array([0.5, 1.5, 2.0]))
+    assert exp.conteos.tolist() == [2, 0, 1]
+    assert exp.vecinos(0)[0].tolist() == [5, 9] and len(exp.vecinos(1)[0]) == 0
+    assert exp.destinos_expuestos() == 3
+
+
+def test_calcular_exposicion_igual_al_recorrido_completo():
+    lats, lngs = _destino()
+    indice = IndiceEspacial(lats, lngs)
+    origen_lats, origen_lngs = _destino(300, semilla=9)
+    exp = calcular_exposicion(indice, origen_lats, origen_lngs, 5, procesos=1)
+    for k in range(len(origen_lats)):
+        posiciones, distancias = exp.vecinos(k)
+        assert set(posiciones.tolist()) == _esperado(lats, lngs, origen_lats[k], origen_lngs[k], 5)
+        assert (np.diff(distancias) >= 0).all()
+    assert calcular_exposicion(None, origen_lats, origen_lngs, 5).conteos.sum() == 0
+
+
+def _exportar(data_path, lats, lngs, huella):
+    df = pd.DataFrame({'latitud': lats, 'longitud': lngs})
+    exportar_mmap(data_path, 'salud', df, IndiceEspacial(lats, lngs), huella)
+
+
+def test_pool_spawn_reabre_el_indice_mapeado(tmp_path, monkeypatch):
+    monkeypatch.setattr(exposicion, "EXPOSICION_MIN_PARALELO", 100)
+    monkeypatch.setattr(exposicion, "EXPOSICION_BLOQUE", 150)
+    lats, lngs = _destino()
+    _exportar(tmp_path, lats, lngs, "v1")
+    _, mapeado, _ = adjuntar_mmap(tmp_path, 'salud')
+    origen_lats, origen_lngs = _destino(400, semilla=4)
+
+    en_proceso = calcular_exposicion(IndiceEspacial(lats, lngs), origen_lats, origen_lngs, 5, procesos=1)
+    con_pool = calcular_exposicion(mapeado, origen_lats, origen_lngs, 5, procesos=2)
+    np.testing.assert_array_equal(con_pool.inicios, en_proceso.inicios)
+    np.testing.assert_array_equal(con_pool.posiciones, en_proceso.posiciones)
+    np.testing.assert_allclose(con_pool.distancias, en_proceso.distancias)
+
+
+def test_indice_en_memoria_no_usa_pool(monkeypatch):
+    monkeypatch.setattr(exposicion, "EXPOSICION_MIN_PARALELO", 10)
+
+    def sin_pool(*args, **kwargs):
+        raise AssertionError("no debe crear un pool")
+
+    monkeypatch.setattr(exposicion, "ProcessPoolExecutor", sin_pool)
+    lats, lngs = _destino(500)
+    exp = calcular_exposicion(IndiceEspacial(lats, lngs), lats[:50], lngs[:50], 2, procesos=4)
+    assert (exp.conteos >= 1).all()  # Cada punto está a 0 km de sí mismo
+
+
+def test_pool_descarta_una_exportacion_con_otra_huella(tmp_path, monkeypatch):
+    monkeypatch.setattr(exposicion, "EXPOSICION_MIN_PARALELO", 100)
+    monkeypatch.setattr(exposicion, "EXPOSICION_BLOQUE", 150)
+    lats, lngs = _destino()
+    _exportar(tmp_path, lats, lngs, "v1")
+    _, mapeado, _ = adjuntar_mmap(tmp_path, 'salud')
+    # Recarga con los mismos puntos en otro orden: mismo total y mismos límites
+    _exportar(tmp_path, lats[::-1].copy(), lngs[::-1].copy(), "v2")
+    _, recargado, _ = adjuntar_mmap(tmp_path, 'salud')
+    assert (recargado.total, recargado.lat_min, recargado.lng_min, recargado.filas, recargado.columnas) == \
+        (mapeado.total, mapeado.lat_min, mapeado.lng_min, mapeado.filas, mapeado.columnas)
+
+    origen_lats, origen_lngs = _destino(400, semilla=4)
+    en_proceso = calcular_exposicion(IndiceEspacial(lats, lngs), origen_lats, origen_lngs, 5, procesos=1)
+    con_pool = calcular_exposicion(mapeado, origen_lats, origen_lngs, 5, procesos=2)
+    np.testing.assert_array_equal(con_pool.inicios, en_proceso.inicios)
+    np.testing.assert_array_equal(con_pool.posiciones, en_proceso.posiciones)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from indice_espacial import IndiceEspacial, haversine_vectorizado
+
+
+def _puntos(n=3000, semilla=1):
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(-18, -3, n), rng.uniform(-81, -69, n)
+
+
+def _radio_exhaustivo(lats, lngs, lat, lng, radio_km):
+    distancias = haversine_vectorizado(lat, lng, lats, lngs)
+    return set(np.flatnonzero(distancias <= radio_km).tolist())
+
+
+def test_consultar_radio_igual_al_recorrido_completo():
+    lats, lngs = _puntos()
+    indice = IndiceEspacial(lats, lngs)
+    for lat, lng, radio in [(-12.0, -77.0, 20), (-9.5, -75.2, 150), (-3.0, -81.0, 5), (-15.0, -70.0, 800)]:
+        posiciones, distancias = indice.consultar_radio(lat, lng, radio)
+        assert set(posiciones.tolist()) == _radio_exhaustivo(lats, lngs, lat, lng, radio)
+        np.testing.assert_allclose(distancias, haversine_vectorizado(lat, lng, lats[posiciones], lngs[posiciones]))
+        assert (distancias <= radio).all()
+
+
+def test_consultar_radio_fuera_de_la_grilla_y_vacio():
+    lats, lngs = _puntos(200)
+    indice = IndiceEspacial(lats, lngs)
+    posiciones, distancias = indice.consultar_radio(40.0, 10.0, 50)
+    assert len(posiciones) == 0 and len(distancias) == 0
+
+    vacio = IndiceEspacial(np.empty(0), np.empty(0))
+    assert len(vacio.consultar_radio(-12.0, -77.0, 100)[0]) == 0
+
+
+def test_consultar_caja():
+    lats, lngs = _puntos(1000)
+    indice = IndiceEspacial(lats, lngs)
+    posiciones = indice.consultar_caja(-12.0, -10.0, -78.0, -75.0)
+    esperadas = np.flatnonzero((lats >= -12.0) & (lats <= -10.0) & (lngs >= -78.0) & (lngs <= -75.0))
+    assert sorted(posiciones.tolist()) == esperadas.tolist()
+
+
+def test_consultar_radio_lote_igual_a_consultas_individuales():
+    lats, lngs = _puntos(2000)
+    indice = IndiceEspacial(lats, lngs)
+    centros_lat, centros_lng = _puntos(40, semilla=7)
+    fuentes, posiciones, distancias = indice.consultar_radio_lote(centros_lat, centros_lng, 30)
+    for k in range(len(centros_lat)):
+        esperadas = _radio_exhaustivo(lats, lngs, centros_lat[k], centros_lng[k], 30)
+        assert set(posiciones[fuentes == k].tolist()) == esperadas
+    assert (np.diff(fuentes) >= 0).all()
@@ -0,0 +1,32 @@
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from main import construir_indice_ids
+
+
+def test_ids_repetidos_quedan_en_la_primera_fila():
+    df = pd.DataFrame({'codigo_unico': ['10', '20', '10', None]})
+    ids = construir_indice_ids('salud', df)
+    assert ids['10'] == 0 and ids['20'] == 1
+    assert len(ids) == 3  # El nulo también tiene clave, como en columna_str
+
+
+def test_sin_columna_de_id_o_vacio():
+    assert construir_indice_ids('salud', pd.DataFrame({'otro': [1]})) == {}
+    assert construir_indice_ids('salud', pd.DataFrame({'codigo_unico': []})) == {}
+    assert construir_indice_ids('desconocido', pd.DataFrame({'codigo_unico': ['1']})) == {}
+
+
+def test_detalle_por_id(publicar):
+    publicar('salud', pd.DataFrame({
+        'codigo_unico': [7, 8],
+        'nombre_establecimiento': ['Posta A', 'Posta B'],
+        'latitud': [-12.0, -13.0],
+        'longitud': [-77.0, -76.0],
+    }))
+    cliente = TestClient(main.app)
+    respuesta = cliente.get("/api/punto/salud/8")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["nombre"].endswith("Posta B")
+    assert cliente.get("/api/punto/salud/9").status_code == 404
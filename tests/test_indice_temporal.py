@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from indice_temporal import SIN_FECHA, IndiceTemporal, dia_de_fecha, dias_epoch, fecha_de_dia, numero_mes
+
+
+def test_nombres_de_mes_en_espanol():
+    assert [numero_mes(m) for m in ('ENERO', ' abril ', 'SETIEMBRE', 'SEPTIEMBRE', 'DICIEMBRE')] == [1, 4, 9, 9, 12]
+    assert [numero_mes(m) for m in ('3', '03', 11.0, '12.0')] == [3, 3, 11, 12]
+    assert [numero_mes(m) for m in ('13', '0', 'PRIMAVERA', None, float('nan'), '2.5')] == [0] * 6
+
+
+def test_cada_fila_usa_la_primera_fecha_disponible():
+    df = pd.DataFrame({
+        'FECHA_MUESTRA': ['2018-02-21', None, None, 'sin dato', None, None],
+        'FECHA_PTO': [None, '2021-03-05', None, None, None, None],
+        'ANHO': ['2018', '2021', '2020', '2019', '2020', None],
+        'MES': pd.Categorical(['FEBRERO', 'MARZO', 'SETIEMBRE', '7', 'PRIMAVERA', 'MAYO']),
+    })
+    dias = dias_epoch(df)
+    assert [fecha_de_dia(d) if d != SIN_FECHA else None for d in dias] == [
+        '2018-02-21', '2021-03-05', '2020-09-01', '2019-07-01', None, None,
+    ]
+
+
+def test_solo_anio_y_mes():
+    dias = dias_epoch(pd.DataFrame({'ANHO': [2021, 2021], 'MES': ['ABRIL', None]}))
+    assert dias[0] == dia_de_fecha('2021-04-01') and dias[1] == SIN_FECHA
+    assert dias_epoch(pd.DataFrame({'nombre': ['Posta']})) is None
+
+
+def test_ventanas_del_indice():
+    dias = np.array([dia_de_fecha(f) for f in ('2020-01-10', '2019-05-01', '2020-06-30')] + [SIN_FECHA])
+    indice = IndiceTemporal(dias)
+    assert indice.contar() == 3
+    assert sorted(indice.posiciones(dia_de_fecha('2020-01-01')).tolist()) == [0, 2]
+    assert indice.posiciones(hasta=dia_de_fecha('2019-12-31')).tolist() == [1]
+    assert indice.contar(dia_de_fecha('2021-01-01')) == 0
+    assert indice.rango() == (dia_de_fecha('2019-05-01'), dia_de_fecha('2020-06-30'))
+    assert IndiceTemporal(np.array([SIN_FECHA])).rango() is None
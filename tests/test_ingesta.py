@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from datos import ENCABEZADOS, escribir_csv, fila_agua_superficial, fila_evaluacion
+from ingesta import ESQUEMA_OEFA, COLUMNAS_VALOR_OEFA, ingerir_oefa, valores_medidos
+from main import OEFA_FILES, utm_a_latlon_lote
+
+
+def _ingerir(tmp_path, **kwargs):
+    return ingerir_oefa(tmp_path, OEFA_FILES, utm_a_latlon_lote, progreso=None, **kwargs)
+
+
+def test_columnas_reales_sobreviven(tmp_path):
+    escribir_csv(tmp_path / 'oefa_agua_superficial.csv', [
+        fila_agua_superficial(),
+        fila_agua_superficial(PARAMETRO='Zinc', **{'Metales.Totales': '', 'Metales.Disueltos': '1.5'}),
+    ])
+    escribir_csv(tmp_path / 'oefa_evaluacion_causalidad.csv', [fila_evaluacion()])
+    df = _ingerir(tmp_path)
+
+    assert len(df) == 3
+    assert df['tipo_oefa'].tolist() == ['agua_superficial'] * 2 + ['evaluacion_causalidad']
+    valores, familias = valores_medidos(df)
+    assert valores.tolist() == [0.05, 1.5, 0.002]
+    assert familias.tolist() == ['Metales.Totales', 'Metales.Disueltos', 'Metales.totales']
+    # Columnas de metadatos de ambos formatos, incluidas las que no son del esquema de valores
+    for col in ('EXPEDIENTE', 'CUC', 'PUNTO_MUESTREO', 'NOMBRE_PUNTO', 'ID_INFORME', 'SIGNO', 'SIGNO_PARAMETRO',
+                'LABORATORIO.ANONIMIZADO', 'Fecha_corte'):
+        assert col in df.columns
+    assert df['MES'].tolist()[0] == 'MARZO'
+    assert isinstance(df['PARAMETRO'].dtype, pd.CategoricalDtype)
+
+
+def test_coordenadas_inaf_y_ubicacion_desde_txubigeo(tmp_path):
+    escribir_csv(tmp_path / 'oefa_agua_superficial.csv', [fila_agua_superficial()])
+    escribir_csv(tmp_path / 'oefa_evaluacion_causalidad.csv', [fila_evaluacion()])
+    df = _ingerir(tmp_path)
+    # COORD_ESTE/COORD_NORTE/TXZONA (zona 18, Loreto) y ESTE/NORTE/ZONA (zona 19, Tacna)
+    assert -4 < df['latitud'][0] < -2 and -77 < df['longitud'][0] < -75
+    assert -18 < df['latitud'][1] < -17 and -71 < df['longitud'][1] < -70
+    assert df['departamento'].tolist()[0] == 'LORETO' and pd.isna(df['departamento'].tolist()[1])
+    assert df['distrito'].tolist()[0] == 'ANDOAS'
+
+
+def test_columnas_desconocidas_se_conservan(tmp_path):
+    encabezados = ENCABEZADOS['oefa_evaluacion_temprana.csv'] + ['COLUMNA_NUEVA']
+    escribir_csv(tmp_path / 'oefa_evaluacion_temprana.csv',
+                 [fila_evaluacion(COLUMNA_NUEVA='x', **{'Metales.totales': '0.3'})], encabezados)
+    df = _ingerir(tmp_path)
+    assert df['COLUMNA_NUEVA'].tolist() == ['x']
+    assert 'COLUMNA_NUEVA' not in ESQUEMA_OEFA
+
+
+def test_todas_las_columnas_de_valor_son_numericas(tmp_path):
+    for archivo, encabezados in ENCABEZADOS.items():
+        valor = next(c for c in encabezados if c in COLUMNAS_VALOR_OEFA)
+        fila = fila_evaluacion if 'evaluacion' in archivo else fila_agua_superficial
+        base = {k: v for k, v in fila().items() if k in encabezados and k not in COLUMNAS_VALOR_OEFA}
+        escribir_csv(tmp_path / archivo, [{**base, valor: '7.5'}])
+    df = _ingerir(tmp_path, filas_por_bloque=1)
+    assert len(df) == 6
+    assert np.array_equal(valores_medidos(df)[0], np.full(6, 7.5))
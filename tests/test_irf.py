@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from irf import (
+    ParcialesIRF, TablaIRF, claves_distrito, excesos, leer_limites, materializar_irf, puntuar,
+)
+from exposicion import Exposicion, PuntosMuestreo
+
+ARCHIVO = "oefa_agua_superficial.csv"
+
+
+def _muestras():
+    """Filas con las columnas reales de agua superficial (valor en la columna de su familia)"""
+    return pd.DataFrame({
+        'tipo_oefa': 'agua_superficial',
+        'TXUBIGEO': ['LORETO, DATEM DEL MARAÑON, ANDOAS / LORETO, LORETO, TROMPETEROS'] * 3
+                    + ['LIMA, LIMA, ATE'],
+        'FECHA_MUESTRA': ['2020-01-10', '2021-03-05', '2021-03-05', '2019-07-01'],
+        'PARAMETRO': ['Plomo', 'Plomo', 'Zinc', 'Plomo'],
+        'SIGNO_PARAMETRO': [None, '<', None, None],
+        'UNIDAD_MEDIDA_PARAMETRO': ['mg/L', 'mg/L', 'mg/L', 'mg/L'],
+        'Metales.Totales': [0.05, 0.5, None, 0.001],
+        'Metales.Disueltos': [None, None, 3.0, None],
+        'latitud': [-2.9, -2.9, -2.9, -12.0],
+        'longitud': [-76.4, -76.4, -76.4, -76.9],
+    })
+
+
+def _limites(tmp_path):
+    (tmp_path / "limites_eca.csv").write_text("PARAMETRO,UNIDAD,LIMITE\nplomo,MG/L,0.01\n")
+    return leer_limites(tmp_path)
+
+
+def test_excesos_contra_la_tabla_de_limites(tmp_path):
+    evaluada, excede, exceso = excesos(_muestras(), _limites(tmp_path))
+    # Zinc no tiene límite; la muestra '<' se evalúa pero no excede
+    assert evaluada.tolist() == [True, True, False, True]
+    assert excede.tolist() == [True, False, False, False]
+    assert np.isclose(exceso[0], 4.0)
+
+
+def test_sin_tabla_no_se_inventan_excedencias(tmp_path):
+    assert leer_limites(tmp_path) is None
+    evaluada, excede, _ = excesos(_muestras(), None)
+    assert not evaluada.any() and not excede.any()
+
+
+def test_claves_distrito_desde_el_texto_de_txubigeo():
+    df = _muestras()
+    claves = claves_distrito(df)
+    assert claves.tolist() == ['LORETO|DATEM DEL MARANON|ANDOAS'] * 3 + ['LIMA|LIMA|ATE']
+    assert claves_distrito(pd.DataFrame({'TXUBIGEO': [None, '150101']})).tolist() == ['', '150101']
+    # Filas sin TXUBIGEO (evaluaciones) usan las columnas de ubicación
+    mixto = pd.DataFrame({'TXUBIGEO': [None], 'departamento': ['Cusco'], 'provincia': ['Cusco'],
+                          'distrito': ['Wanchaq']})
+    assert claves_distrito(mixto).tolist() == ['CUSCO|CUSCO|WANCHAQ']
+
+
+def test_puntuar_renormaliza_sin_muestras_evaluadas():
+    tabla = pd.DataFrame({
+        'muestras': [4, 2], 'evaluadas': [2, 0], 'excedencias': [1, 0], 'suma_exceso': [9.0, 0.0],
+        'ultima_excedencia': [18000.0, np.nan], 'expuestos': [50, 50],
+    })
+    resultado = puntuar(tabla, 18000.0).set_index('muestras')
+    assert resultado.loc[2, 'magnitud'] is None and resultado.loc[2, 'frecuencia'] is None
+    assert not resultado.loc[2, 'excedencias_evaluadas']
+    assert resultado.loc[2, 'irf'] == 100.0  # Solo exposición, saturada
+    evaluado = resultado.loc[4]
+    esperado = 0.4 * evaluado['magnitud'] + 0.2 * 0.5 + 0.2 * 1.0 + 0.2 * 1.0
+    assert np.isclose(evaluado['irf'], esperado * 100, atol=0.01)
+
+
+def _materializar(tmp_path, parciales, huellas):
+    df = _muestras()
+    puntos = PuntosMuestreo(df)
+    vacio = np.empty(0, dtype=np.int64)
+    exposiciones = {'salud': Exposicion(puntos.total, vacio, vacio, np.empty(0))}
+    return materializar_irf(parciales, df, huellas, puntos, exposiciones)
+
+
+def test_materializar_por_punto_y_distrito(tmp_path):
+    _limites(tmp_path)
+    (tmp_path / ARCHIVO).write_text("x\n")
+    parciales = ParcialesIRF(tmp_path)
+    tabla, recalculados = _materializar(tmp_path, parciales, {ARCHIVO: 'h1'})
+    assert recalculados == [ARCHIVO]
+    andoas = tabla.distrito('Loreto|Datem del Marañón|Andoas')
+    assert andoas['muestras'] == 3 and andoas['evaluadas'] == 2 and andoas['excedencias'] == 1
+    assert andoas['departamento'] == 'LORETO' and andoas['distrito'] == 'ANDOAS'
+    assert andoas['excedencias_evaluadas'] and andoas['ultima_excedencia'] == '2020-01-10'
+    assert tabla.punto(-2.9, -76.4)['excedencias'] == 1
+    assert isinstance(tabla, TablaIRF)
+
+
+def test_solo_se_recalculan_los_archivos_leidos_que_cambiaron(tmp_path, capsys):
+    parciales = ParcialesIRF(tmp_path)
+    _, recalculados = _materializar(tmp_path, parciales, {ARCHIVO: 'h1'})
+    assert recalculados == [ARCHIVO]
+    assert "sin tabla de límites" in capsys.readouterr().out
+
+    # Misma huella: ni en memoria ni desde disco se recalcula
+    assert _materializar(tmp_path, parciales, {ARCHIVO: 'h1'})[1] == []
+    assert _materializar(tmp_path, ParcialesIRF(tmp_path), {ARCHIVO: 'h1'})[1] == []
+    # Huella nueva o tabla de límites nueva: se recalcula solo ese archivo
+    assert _materializar(tmp_path, parciales, {ARCHIVO: 'h2'})[1] == [ARCHIVO]
+    _limites(tmp_path)
+    tabla, recalculados = _materializar(tmp_path, parciales, {ARCHIVO: 'h2'})
+    assert recalculados == [ARCHIVO]
+    assert tabla.distrito('LIMA|LIMA|ATE')['evaluadas'] == 1
+    assert not os.path.exists(tmp_path / "oefa_suelo_sedimento.csv")
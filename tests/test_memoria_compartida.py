@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from indice_espacial import IndiceEspacial
+from memoria_compartida import (
+    adjuntar_mmap, directorio_mmap, exportar_mmap, memoria_dataset, mmap_vigente,
+)
+from snapshot import huella_fuentes
+
+FUENTES = ["salud.csv"]
+
+
+def _exportar(tmp_path):
+    (tmp_path / "salud.csv").write_text("a\n1\n")
+    n = 500
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        'departamento': pd.Categorical(rng.choice(['LIMA', 'CUSCO', 'PUNO'], n)),
+        'nombre': [f"Posta {k}" for k in range(n)],
+        'latitud': rng.uniform(-18, -3, n),
+        'longitud': rng.uniform(-81, -69, n),
+    })
+    dias = rng.integers(15000, 18000, n)
+    indice = IndiceEspacial(df['latitud'], df['longitud'], dias=dias)
+    exportar_mmap(tmp_path, 'salud', df, indice, huella_fuentes(tmp_path, FUENTES), dias)
+    return df, dias
+
+
+def test_ida_y_vuelta(tmp_path):
+    df, dias = _exportar(tmp_path)
+    leido, indice, dias_leidos = adjuntar_mmap(tmp_path, 'salud')
+    assert leido['departamento'].tolist() == df['departamento'].tolist()
+    pd.testing.assert_frame_equal(leido.drop(columns='departamento'), df.drop(columns='departamento'),
+                                  check_dtype=False)
+    np.testing.assert_array_equal(dias_leidos, dias)
+    posiciones, _ = indice.consultar_radio(-12.0, -77.0, 300)
+    esperado, _ = IndiceEspacial(df['latitud'], df['longitud'], dias=dias).consultar_radio(-12.0, -77.0, 300)
+    assert sorted(posiciones.tolist()) == sorted(esperado.tolist())
+
+
+def test_categoricas_y_numericas_sin_copia(tmp_path):
+    _exportar(tmp_path)
+    df, _, dias = adjuntar_mmap(tmp_path, 'salud')
+    directorio = directorio_mmap(tmp_path, 'salud')
+    codigos = np.load(directorio / "col_0.npy", mmap_mode='r')
+    assert df['departamento'].array.codes.dtype == codigos.dtype
+    assert isinstance(df['departamento'].array.codes.base, np.memmap)
+    assert isinstance(dias, np.memmap)
+
+    compartidos, propios = memoria_dataset(df, None, dias)
+    # Códigos, latitud, longitud y días están en páginas compartidas
+    assert compartidos == codigos.nbytes + 2 * 8 * len(df) + dias.nbytes
+    assert propios > 0  # Texto libre y categorías
+
+
+def test_vigente_solo_con_la_misma_huella(tmp_path):
+    _exportar(tmp_path)
+    assert mmap_vigente(tmp_path, 'salud', FUENTES)
+    assert not mmap_vigente(tmp_path, 'salud', FUENTES, huella='otra')
+    (tmp_path / "salud.csv").write_text("a\n1\n2\n")
+    assert not mmap_vigente(tmp_path, 'salud', FUENTES)
+    assert not mmap_vigente(tmp_path, 'educacion', FUENTES)
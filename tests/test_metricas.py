@@ -0,0 +1,115 @@
+import asyncio
+
+import pandas as pd
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+import main
+from metricas import Histograma, Indicador, MiddlewareMetricas, Registro, etapa, perfil_actual
+
+
+def test_histograma_acumulado_por_etiquetas():
+    histograma = Histograma("prueba_segundos", "Prueba", ("ruta",), (0.1, 1))
+    for valor in (0.05, 0.5, 0.5, 3):
+        histograma.observar(valor, "/a")
+    histograma.observar(0.1, '/b"')
+    lineas = histograma.exportar()
+    assert lineas[:2] == ["# HELP rrh_prueba_segundos Prueba", "# TYPE rrh_prueba_segundos histogram"]
+    assert 'rrh_prueba_segundos_bucket{ruta="/a",le="0.1"} 1' in lineas
+    assert 'rrh_prueba_segundos_bucket{ruta="/a",le="1.0"} 3' in lineas
+    assert 'rrh_prueba_segundos_bucket{ruta="/a",le="+Inf"} 4' in lineas
+    assert 'rrh_prueba_segundos_sum{ruta="/a"} 4.05' in lineas
+    assert 'rrh_prueba_segundos_count{ruta="/a"} 4' in lineas
+    assert 'rrh_prueba_segundos_bucket{ruta="/b\\"",le="0.1"} 1' in lineas  # El límite es inclusivo
+
+
+def test_indicador_y_registro():
+    registro = Registro()
+    registro.agregar(Indicador("registros", "Registros por tipo", ("tipo",), lambda: {("salud",): 3, ("oefa",): 10}))
+    assert registro.exportar().splitlines()[2:] == ['rrh_registros{tipo="oefa"} 10.0', 'rrh_registros{tipo="salud"} 3.0']
+
+
+def test_etapa_solo_llena_el_perfil_si_esta_activo():
+    with etapa('prueba', 'sin_perfil'):
+        pass
+    token = perfil_actual.set([])
+    try:
+        with etapa('prueba', 'radio', 'salud') as tramo:
+            tramo.filas = 12
+        with etapa('prueba', 'json'):
+            pass
+        perfil = perfil_actual.get()
+    finally:
+        perfil_actual.reset(token)
+    assert [(e["etapa"], e.get("filas"), e.get("detalle")) for e in perfil] == [("radio", 12, "salud"),
+                                                                                 ("json", None, None)]
+    assert all(e["ms"] >= 0 for e in perfil)
+
+
+def test_metrics_por_ruta_y_etapa(publicar):
+    publicar('salud', pd.DataFrame({'codigo_unico': [7], 'latitud': [-12.0], 'longitud': [-77.0]}))
+    cliente = TestClient(main.app)
+    assert cliente.get("/api/punto/salud/7").status_code == 200
+    assert cliente.get("/api/punto/salud/8").status_code == 404
+
+    respuesta = cliente.get("/metrics")
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = respuesta.text
+    # La ruta es la plantilla de FastAPI, no la URL: una serie por endpoint y estado
+    assert 'metodo="GET",ruta="/api/punto/{tipo}/{punto_id}",estado="200"' in texto
+    assert 'metodo="GET",ruta="/api/punto/{tipo}/{punto_id}",estado="404"' in texto
+    assert "/api/punto/salud/7" not in texto
+    assert 'rrh_etapa_segundos_count{operacion="detalle",etapa="id"}' in texto
+    assert 'rrh_dataset_registros{tipo="salud"} 1.0' in texto
+
+
+def test_profile_agrega_perfil_y_server_timing(publicar):
+    publicar('salud', pd.DataFrame({'codigo_unico': [1, 2], 'latitud': [-12.0, -12.01], 'longitud': [-77.0, -77.0]}))
+    cliente = TestClient(main.app)
+    parametros = {"centro_lat": -12.0, "centro_lng": -77.0, "radio_km": 5, "tipos": "salud"}
+
+    normal = cliente.get("/api/mapa/puntos", params=parametros)
+    assert "perfil" not in normal.json() and "server-timing" not in normal.headers
+
+    perfilada = cliente.get("/api/mapa/puntos", params={**parametros, "profile": 1})
+    datos = perfilada.json()
+    assert perfilada.headers["x-cache"] == "BYPASS"
+    assert datos["total"] == 2
+    etapas = [(e["operacion"], e["etapa"]) for e in datos["perfil"]["etapas"]]
+    assert ("mapa", "radio") in etapas
+    assert next(e for e in datos["perfil"]["etapas"] if e["etapa"] == "radio")["filas"] == 2
+    assert datos["perfil"]["total_ms"] > 0
+    assert "radio-salud;dur=" in perfilada.headers["server-timing"]
+    assert perfilada.headers["server-timing"].endswith(f"total;dur={datos['perfil']['total_ms']}")
+    assert int(perfilada.headers["content-length"]) == len(perfilada.content)
+
+
+def test_profile_no_retiene_un_stream_sse():
+    enviados = []
+    vistos_al_generar = []
+
+    async def eventos():
+        yield b"data: uno\n\n"
+        # El primer evento ya salió al cliente antes de generar el segundo
+        vistos_al_generar.append([m["type"] for m in enviados])
+        yield b"data: dos\n\n"
+
+    async def aplicacion(scope, receive, send):
+        with etapa('reporte', 'datos'):
+            pass
+        await StreamingResponse(eventos(), media_type="text/event-stream")(scope, receive, send)
+
+    async def recibir():
+        return {"type": "http.disconnect"}
+
+    async def enviar(mensaje):
+        enviados.append(mensaje)
+
+    scope = {"type": "http", "method": "GET", "path": "/sse", "query_string": b"profile=1", "headers": []}
+    asyncio.run(MiddlewareMetricas(aplicacion)(scope, recibir, enviar))
+
+    assert vistos_al_generar == [["http.response.start", "http.response.body"]]
+    encabezados = dict(enviados[0]["headers"])
+    assert encabezados[b"content-type"].startswith(b"text/event-stream")
+    assert encabezados[b"server-timing"].startswith(b"datos;dur=")
+    assert b"".join(m.get("body", b"") for m in enviados[1:]) == b"data: uno\n\ndata: dos\n\n"
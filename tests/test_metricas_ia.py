@@ -0,0 +1,99 @@
+import csv
+import io
+
+from fastapi.testclient import TestClient
+
+import main
+from ai.metricas_ia import MetricasIA, Muestra, costo_estimado, percentil, precio_modelo
+
+USO = {"prompt_tokens": 1000, "completion_tokens": 500}
+
+
+def _metricas():
+    metricas = MetricasIA()
+    for latencia in (1.0, 2.0, 3.0, 4.0):
+        metricas.registrar("gpt-4o-mini", "oefa", latencia, USO)
+    metricas.registrar("gpt-4o-mini", "oefa", 0.1, error=TimeoutError())
+    metricas.registrar("gpt-4o-mini", "oefa", 0.0, USO, cached=True)
+    metricas.registrar("modelo-propio", "quiz", 2.0, USO, primer_token=0.5)
+    return metricas
+
+
+def test_precio_por_prefijo_mas_largo():
+    assert precio_modelo("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+    assert precio_modelo("gpt-4o-2024-08-06") == (2.50, 10.00)
+    assert precio_modelo("modelo-propio") is None
+    assert abs(costo_estimado("gpt-4o-mini", 1000, 500) - 0.00045) < 1e-12
+    assert costo_estimado("modelo-propio", 1000, 500) is None
+
+
+def test_percentil_y_muestra_acotada():
+    assert percentil([], 50) is None
+    assert [percentil([1.0, 2.0, 3.0, 4.0], p) for p in (50, 90)] == [2.0, 4.0]
+    muestra = Muestra(3)
+    for valor in range(100):
+        muestra.agregar(float(valor))
+    assert muestra.vistos == 100 and len(muestra.valores) == 3
+
+
+def test_resumen_separa_errores_cache_y_exitosas():
+    fila, sin_precio = _metricas().resumen()
+    assert (fila["modelo"], fila["tipo_reporte"]) == ("gpt-4o-mini", "oefa")
+    assert (fila["llamadas"], fila["exitosas"], fila["errores"]) == (5, 4, 1)
+    assert fila["errores_por_tipo"] == {"TimeoutError": 1}
+    assert fila["tasa_error"] == 0.2
+    # El acierto de cache no suma tokens ni costo, pero sí lo ahorrado
+    assert fila["aciertos_cache"] == 1
+    assert (fila["prompt_tokens"], fila["completion_tokens"], fila["total_tokens"]) == (4000, 2000, 6000)
+    assert fila["tokens_por_llamada"] == 1500.0
+    assert fila["costo_usd"] == 0.0018 and fila["costo_por_llamada_usd"] == 0.00045
+    assert fila["costo_ahorrado_usd"] == 0.00045
+    # La latencia del error no entra en los percentiles
+    assert (fila["latencia_p50_s"], fila["latencia_p99_s"], fila["latencia_media_s"]) == (2.0, 4.0, 2.5)
+    assert fila["primer_token_p50_s"] is None
+
+    assert sin_precio["modelo"] == "modelo-propio"
+    assert sin_precio["costo_usd"] is None and sin_precio["costo_por_llamada_usd"] is None
+    assert sin_precio["primer_token_p50_s"] == 0.5
+
+
+def test_totales_filtros_y_reinicio():
+    metricas = _metricas()
+    totales = metricas.totales()
+    assert (totales["llamadas"], totales["errores"], totales["aciertos_cache"]) == (6, 1, 1)
+    assert totales["total_tokens"] == 7500 and totales["costo_usd"] == 0.0018
+    assert [f["modelo"] for f in metricas.resumen(tipo_reporte="quiz")] == ["modelo-propio"]
+    assert metricas.resumen(modelo="gpt-4o") == []
+    metricas.reiniciar()
+    assert metricas.resumen() == [] and metricas.totales()["llamadas"] == 0
+
+
+def test_endpoint_json_csv_y_filtros(monkeypatch):
+    metricas = _metricas()
+    monkeypatch.setattr(main, 'metricas_reportes', lambda: metricas)
+    cliente = TestClient(main.app)
+
+    respuesta = cliente.get("/api/reportes/metricas", params={"modelo": "gpt-4o-mini"})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["totales"]["llamadas"] == 6
+    assert [(s["modelo"], s["tipo_reporte"]) for s in cuerpo["series"]] == [("gpt-4o-mini", "oefa")]
+
+    respuesta = cliente.get("/api/reportes/metricas", params={"formato": "csv", "tipo_reporte": "quiz"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    assert "metricas_reportes_ia.csv" in respuesta.headers["content-disposition"]
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert [(f["modelo"], f["llamadas"], f["costo_usd"]) for f in filas] == [("modelo-propio", "1", "")]
+
+    assert cliente.get("/api/reportes/metricas", params={"formato": "xml"}).status_code == 400
+
+
+def test_indicador_ia_en_prometheus(monkeypatch):
+    metricas = _metricas()
+    monkeypatch.setattr(main, 'metricas_reportes', lambda: metricas)
+    lineas = TestClient(main.app).get("/metrics").text.splitlines()
+    assert 'rrh_ia{modelo="gpt-4o-mini",tipo_reporte="oefa",metrica="llamadas"} 5.0' in lineas
+    assert 'rrh_ia{modelo="gpt-4o-mini",tipo_reporte="oefa",metrica="total_tokens"} 6000.0' in lineas
+    # Sin precio el costo se exporta como 0
+    assert 'rrh_ia{modelo="modelo-propio",tipo_reporte="quiz",metrica="costo_usd"} 0.0' in lineas
@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from memoria_compartida import mmap_vigente
+from recarga import VigilanteFuentes
+from snapshot import guardar_snapshot, huella_fuentes
+
+FUENTES = main.FUENTES_DATASETS['salud']
+
+
+def _escribir_salud(tmp_path, nombres, mtime):
+    csv = tmp_path / FUENTES[0]
+    filas = "\n".join(f"{k},{nombre},-77.0,-12.0" for k, nombre in enumerate(nombres))
+    csv.write_text(f"codigo_unico,nombre_establecimiento,longitud,latitud\n{filas}\n")
+    os.utime(csv, (mtime, mtime))
+    return huella_fuentes(tmp_path, FUENTES)
+
+
+def test_snapshot_de_otra_version_no_se_publica(tmp_path):
+    vieja = _escribir_salud(tmp_path, ['Posta vieja'], 1_000_000_000)
+    guardar_snapshot(tmp_path, 'salud', pd.DataFrame({'nombre_establecimiento': ['Posta vieja']}), FUENTES, vieja)
+    nueva = _escribir_salud(tmp_path, ['Posta nueva', 'Posta B'], 1_000_000_100)
+
+    # Quien tomó la huella nueva antes de leer no recibe el snapshot viejo
+    df = main.leer_dataset('salud', tmp_path, huella=nueva)
+    assert df['nombre_establecimiento'].tolist() == ['Posta nueva', 'Posta B']
+    # Con la huella vieja el snapshot sí corresponde
+    assert main.leer_dataset('salud', tmp_path, huella=vieja)['nombre_establecimiento'].tolist() == ['Posta vieja']
+
+
+def test_memoria_compartida_se_valida_con_la_huella_esperada(tmp_path):
+    vieja = _escribir_salud(tmp_path, ['Posta vieja'], 1_000_000_000)
+    df, _, _ = main.cargar_compartido('salud', tmp_path, huella=vieja)
+    assert df['nombre_establecimiento'].tolist() == ['Posta vieja']
+    assert mmap_vigente(tmp_path, 'salud', FUENTES, vieja)
+
+    nueva = _escribir_salud(tmp_path, ['Posta nueva'], 1_000_000_100)
+    df, _, _ = main.cargar_compartido('salud', tmp_path, huella=nueva)
+    assert df['nombre_establecimiento'].tolist() == ['Posta nueva']
+    assert mmap_vigente(tmp_path, 'salud', FUENTES, nueva)
+
+
+def test_vigilante_espera_que_el_archivo_quede_quieto(tmp_path):
+    publicada = _escribir_salud(tmp_path, ['A'], 1_000_000_000)
+    vigilante = VigilanteFuentes(tmp_path, {'salud': FUENTES, 'oefa': ['otro.csv']},
+                                 huella_publicada={'salud': publicada}.get, recargar=None, intervalo=0)
+    assert vigilante.revisar() == []
+    _escribir_salud(tmp_path, ['A', 'B'], 1_000_000_100)
+    assert vigilante.revisar() == []  # Primera vez que se ve: puede estar copiándose
+    assert vigilante.revisar() == ['salud']
+    _escribir_salud(tmp_path, ['A', 'B', 'C'], 1_000_000_200)
+    assert vigilante.revisar() == []
+
+
+def test_recarga_fallida_mantiene_la_version_publicada(publicar, monkeypatch):
+    anterior = publicar('salud', pd.DataFrame({'latitud': [-12.0], 'longitud': [-77.0]}))
+
+    def leer_tipo(tipo):
+        raise OSError("CSV truncado")
+
+    monkeypatch.setattr(main, 'leer_tipo', leer_tipo)
+    assert main.recargar_tipo('salud') is False
+    assert main.datasets_cache['salud'] is anterior
+    assert main.dataset_listo('salud') and not main.recargas_en_curso
+
+
+def test_recargar_exige_token(monkeypatch):
+    pedidos = []
+    monkeypatch.setattr(main, 'recargar_datasets', pedidos.append)
+    cliente = TestClient(main.app)
+
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', None)
+    respuesta = cliente.post("/api/admin/recargar?forzar=true")
+    assert respuesta.status_code == 403 and "ADMIN_TOKEN" in respuesta.json()["detail"]
+
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', "secreto")
+    assert cliente.post("/api/admin/recargar?forzar=true").status_code == 403
+    assert cliente.post("/api/admin/recargar?forzar=true", headers={"X-Admin-Token": "otro"}).status_code == 403
+    assert pedidos == []
+
+    respuesta = cliente.post("/api/admin/recargar?tipos=salud&forzar=true", headers={"X-Admin-Token": "secreto"})
+    assert respuesta.status_code == 202
+    assert respuesta.json()["recargando"] == ['salud']
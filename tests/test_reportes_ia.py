@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ai.openai_client import OpenAIClient
+from datos import escribir_csv, fila_evaluacion
+from ingesta import ingerir_oefa
+from reportes_ia import SinMediciones, datos_reporte, evento_sse, eventos_reporte
+
+
+def _oefa(tmp_path):
+    escribir_csv(tmp_path / 'oefa_evaluacion_temprana.csv', [
+        fila_evaluacion(ID_INFORME='INF-1'),  # Plomo < 0.002 mg/L en Metales.totales
+        fila_evaluacion(ID_INFORME='INF-1', PARAMETRO='Endosulfán', SIGNO='=', **{'Metales.totales': '',
+                                                                'Pesticidas.organoclorados': '0.35'}),
+        fila_evaluacion(ID_INFORME='OTRO', ESTE='341000', PARAMETRO='Olor', **{'Metales.totales': ''}),
+    ])
+    return ingerir_oefa(tmp_path, main.OEFA_FILES, main.utm_a_latlon_lote, progreso=None)
+
+
+def _eventos(texto):
+    """[(evento, datos)] de un cuerpo text/event-stream"""
+    eventos = []
+    for bloque in texto.split("\n\n"):
+        if bloque:
+            evento, datos = bloque.split("\n")
+            eventos.append((evento.removeprefix("event: "), json.loads(datos.removeprefix("data: "))))
+    return eventos
+
+
+class ClienteFalso:
+    def __init__(self, fallar=False):
+        self.pedidos = []
+        self.fallar = fallar
+
+    async def stream_oefa_report(self, report_data, max_tokens):
+        self.pedidos.append((report_data, max_tokens))
+        yield {"type": "delta", "content": "Informe "}
+        if self.fallar:
+            raise RuntimeError("conexión cortada")
+        yield {"type": "delta", "content": "técnico"}
+        yield {"type": "done", "result": {"content": "Informe técnico", "model": "gpt-4o-mini",
+                                          "usage": {"total_tokens": 42}, "cached": False}}
+
+
+def test_payload_desde_filas_reales(tmp_path):
+    df = _oefa(tmp_path)
+    datos = datos_reporte(df.iloc[[0, 1]])
+    assert datos['PARAMETRO'] == 'Plomo'
+    assert (datos['TXZONA'], datos['COORD_ESTE'], datos['COORD_NORTE']) == ('19', 340000.0, 8040000.0)
+    assert datos['Pesticidas.organoclorados'] == 0.35 and 'Pesticidas.Organofosforados' not in datos
+    assert datos['mediciones'] == [
+        {"parametro": "Plomo", "valor": 0.002, "unidad": "mg/L", "signo": "<", "familia": "Metales.totales"},
+        {"parametro": "Endosulfán", "valor": 0.35, "unidad": "mg/L", "signo": "=",
+         "familia": "Pesticidas.organoclorados"},
+    ]
+    json.dumps(datos)  # Apto para el evento "inicio"
+
+    _, prompt = OpenAIClient._oefa_report_messages(datos)
+    assert "Parámetro analizado: Plomo." in prompt
+    assert "- Plomo: <0.002 mg/L (Metales.totales)." in prompt
+    assert "- Endosulfán: 0.35 mg/L (Pesticidas.organoclorados)." in prompt
+    assert "Coordenadas UTM - Este: 340000.0, Norte: 8040000.0." in prompt
+    assert "Pesticidas organoclorados (mg/L): 0.35." in prompt
+
+
+def test_punto_sin_resultados(tmp_path):
+    df = _oefa(tmp_path)
+    with pytest.raises(SinMediciones):
+        datos_reporte(df.iloc[[2]])
+
+
+def test_marco_sse():
+    assert evento_sse("delta", {"texto": "línea 1\nlínea 2"}) == \
+        'event: delta\ndata: {"texto": "línea 1\\nlínea 2"}\n\n'
+
+    async def recorrer(cliente):
+        return [e async for e in eventos_reporte(cliente, 'oefa', 'X1', {"PARAMETRO": "Plomo"}, 500)]
+
+    eventos = _eventos("".join(asyncio.run(recorrer(ClienteFalso()))))
+    assert [e for e, _ in eventos] == ["inicio", "delta", "delta", "fin"]
+    assert eventos[0][1] == {"tipo": "oefa", "id": "X1", "report_data": {"PARAMETRO": "Plomo"}}
+    assert "".join(d["texto"] for e, d in eventos if e == "delta") == "Informe técnico"
+    assert eventos[-1][1] == {"model": "gpt-4o-mini", "usage": {"total_tokens": 42}, "cached": False}
+
+    eventos = _eventos("".join(asyncio.run(recorrer(ClienteFalso(fallar=True)))))
+    assert [e for e, _ in eventos] == ["inicio", "delta", "error"]
+    assert eventos[-1][1]["detalle"] == "RuntimeError: conexión cortada"
+
+
+def test_endpoint_reporte(tmp_path, publicar, monkeypatch):
+    publicar('oefa', _oefa(tmp_path))
+    falso = ClienteFalso()
+    monkeypatch.setattr(main, 'cliente_reportes', lambda: (falso, None))
+    cliente = TestClient(main.app)
+
+    respuesta = cliente.get("/api/reporte/oefa/INF-1", params={"max_tokens": 800})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/event-stream")
+    eventos = _eventos(respuesta.text)
+    assert [e for e, _ in eventos] == ["inicio", "delta", "delta", "fin"]
+    report_data, max_tokens = falso.pedidos[0]
+    # Las dos muestras del punto (mismas coordenadas), no solo la fila del id
+    assert max_tokens == 800 and len(report_data["mediciones"]) == 2
+    assert eventos[0][1]["report_data"] == report_data
+
+    respuesta = cliente.get("/api/reporte/oefa/OTRO")
+    assert respuesta.status_code == 422 and len(falso.pedidos) == 1
+    assert cliente.get("/api/reporte/oefa/NO-EXISTE").status_code == 404
+    assert cliente.get("/api/reporte/salud/1").status_code == 400
@@ -0,0 +1,136 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from ai import openai_client as modulo
+
+
+def _error(clase, codigo, **encabezados):
+    respuesta = httpx.Response(codigo, headers=encabezados, request=httpx.Request("POST", "http://prueba/v1"))
+    return clase("error de prueba", response=respuesta, body=None)
+
+
+def _lote(cliente, reportes, **kwargs):
+    async def consumir():
+        return [item async for item in cliente.generate_oefa_reports(reportes, **kwargs)]
+    return asyncio.run(consumir())
+
+
+@pytest.fixture(autouse=True)
+def sin_esperas(monkeypatch):
+    monkeypatch.setattr(modulo, "REPORTES_ESPERA_BASE", 0.001)
+    monkeypatch.setattr(modulo, "REPORTES_ESPERA_MAXIMA", 0.01)
+
+
+def test_concurrencia_acotada_y_todos_los_reportes(cliente_ia, monkeypatch):
+    activos = {"ahora": 0, "maximo": 0}
+    llamadas = []
+
+    async def generar(report_data, **kwargs):
+        llamadas.append(kwargs)
+        activos["ahora"] += 1
+        activos["maximo"] = max(activos["maximo"], activos["ahora"])
+        await asyncio.sleep(0.01 * (report_data["n"] % 3))
+        activos["ahora"] -= 1
+        return {"content": f"reporte {report_data['n']}"}
+
+    monkeypatch.setattr(cliente_ia, "generate_oefa_report", generar)
+    items = _lote(cliente_ia, [{"n": n} for n in range(10)], concurrency=3, max_tokens=500)
+
+    assert activos["maximo"] == 3
+    assert sorted(item["index"] for item in items) == list(range(10))
+    assert all(item["result"]["content"] == f"reporte {item['index']}" and item["error"] is None for item in items)
+    # El lote maneja los reintentos: el SDK no reintenta por su cuenta
+    assert all(k["max_retries"] == 0 and k["max_tokens"] == 500 for k in llamadas)
+
+
+def test_reintenta_429_y_no_los_errores_definitivos(cliente_ia, monkeypatch):
+    intentos = {}
+
+    async def generar(report_data, **kwargs):
+        n = report_data["n"]
+        intentos[n] = intentos.get(n, 0) + 1
+        if n == 0 and intentos[n] < 3:
+            raise _error(RateLimitError, 429, **{"retry-after": "0"})
+        if n == 1:
+            raise _error(BadRequestError, 400)
+        if n == 2:
+            raise _error(RateLimitError, 429)
+        return {"content": "ok"}
+
+    monkeypatch.setattr(cliente_ia, "generate_oefa_report", generar)
+    items = {item["index"]: item for item in _lote(cliente_ia, [{"n": n} for n in range(4)], max_attempts=4)}
+
+    assert items[0]["result"] == {"content": "ok"} and items[0]["attempts"] == 3 and items[0]["error"] is None
+    assert items[1]["result"] is None and items[1]["attempts"] == 1 and items[1]["error"].startswith("BadRequestError")
+    assert items[2]["result"] is None and items[2]["attempts"] == 4 and items[2]["error"].startswith("RateLimitError")
+    assert items[3]["result"] == {"content": "ok"} and items[3]["attempts"] == 1
+
+
+def test_dejar_de_iterar_cancela_los_pendientes(cliente_ia, monkeypatch):
+    iniciados, cancelados = [], []
+
+    async def generar(report_data, **kwargs):
+        iniciados.append(report_data["n"])
+        try:
+            await asyncio.sleep(0 if report_data["n"] == 0 else 10)
+        except asyncio.CancelledError:
+            cancelados.append(report_data["n"])
+            raise
+        return {"content": "ok"}
+
+    monkeypatch.setattr(cliente_ia, "generate_oefa_report", generar)
+
+    async def primero():
+        lote = cliente_ia.generate_oefa_reports([{"n": n} for n in range(5)], concurrency=2)
+        item = await anext(lote)
+        await lote.aclose()
+        return item
+
+    assert asyncio.run(primero())["index"] == 0
+    assert sorted(cancelados) == sorted(n for n in iniciados if n != 0)
+    assert len(iniciados) <= 3  # Los que esperaban cupo nunca llegaron a llamar
+
+
+def test_espera_respeta_retry_after(monkeypatch):
+    monkeypatch.setattr(modulo, "REPORTES_ESPERA_MAXIMA", 60.0)
+    monkeypatch.setattr(modulo, "REPORTES_ESPERA_BASE", 1.0)
+    assert modulo.espera_reintento(_error(RateLimitError, 429, **{"retry-after": "7"}), 1) >= 7
+    assert modulo.espera_reintento(_error(RateLimitError, 429, **{"retry-after": "900"}), 1) == 60.0
+    assert 0 <= modulo.espera_reintento(_error(RateLimitError, 429), 3) <= 4
+
+
+class ChatFalso:
+    """Imitación de AsyncOpenAI().chat.completions con respuestas fijas"""
+
+    def __init__(self):
+        self.pedidos = []
+        self.chat = self.completions = self
+
+    async def create(self, **kwargs):
+        self.pedidos.append(kwargs)
+        await asyncio.sleep(0)
+        mensaje = type("Mensaje", (), {"content": f"Reporte de {kwargs['messages'][-1]['content'][-40:]}"})
+        uso = type("Uso", (), {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150})
+        return type("Respuesta", (), {"choices": [type("Opcion", (), {"message": mensaje})],
+                                      "model": kwargs["model"], "usage": uso})
+
+    def with_options(self, **opciones):
+        self.opciones = opciones
+        return self
+
+
+def test_lote_completo_con_cliente_falso(cliente_ia, monkeypatch):
+    falso = ChatFalso()
+    monkeypatch.setattr(type(cliente_ia), "client", property(lambda self: falso))
+    reportes = [{"PARAMETRO": f"Plomo {n}", "TXZONA": "18"} for n in range(3)]
+    items = _lote(cliente_ia, reportes, concurrency=2)
+
+    assert len(falso.pedidos) == 3 and falso.opciones == {"max_retries": 0}
+    for item in items:
+        assert item["result"]["usage"]["total_tokens"] == 150 and item["result"]["cached"] is False
+        assert item["result"]["model"] == "gpt-4o-mini"
+    prompts = sorted(p["messages"][-1]["content"] for p in falso.pedidos)
+    assert all(f"Parámetro analizado: Plomo {n}." in prompts[n] for n in range(3))
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from serializacion import columnas_punto, serializar_puntos
+
+
+def _oefa():
+    return pd.DataFrame({
+        'ID_INFORME': ['a1', 'b2'],
+        'PUNTO_MUESTREO': ['ACA-07', 'SM-26 (S)'],
+        'tipo_oefa': pd.Categorical(['evaluacion_causalidad', 'evaluacion_temprana']),
+        'FECHA_MUESTRA': ['2018-02-21', '2019-02-26'],
+        'PARAMETRO': ['Plomo', 'Nitritos (NO2-N)'],
+        'departamento': ['TACNA', 'LIMA'],
+        'provincia': ['JORGE BASADRE', 'LIMA'],
+        'latitud': [-17.0, -12.1],
+        'longitud': [-70.5, -77.0],
+        'distancia_km': [1.234, 10.0],
+    })
+
+
+def test_puntos_oefa():
+    puntos = serializar_puntos('oefa', _oefa())
+    assert puntos[0] == {
+        "id": "a1",
+        "tipo": "oefa",
+        "latitud": -17.0,
+        "longitud": -70.5,
+        "distancia_km": 1.23,
+        "nombre": "Punto OEFA - ACA-07",
+        "ubicacion": "TACNA, JORGE BASADRE",
+        "info_especifica": {"tipo_oefa": "evaluacion_causalidad", "fecha_muestra": "2018-02-21",
+                            "parametro": "Plomo"},
+    }
+    assert puntos[1]["info_especifica"]["parametro"] == "Nitritos (NO2-N)"
+
+
+def test_columnar_y_puntos_tienen_los_mismos_valores():
+    df = _oefa()
+    columnas = columnas_punto('oefa', df)
+    puntos = serializar_puntos('oefa', df)
+    for campo in ("id", "latitud", "longitud", "distancia_km", "nombre", "ubicacion"):
+        assert columnas[campo] == [p[campo] for p in puntos]
+    assert columnas["info_especifica"]["tipo_oefa"] == ["evaluacion_causalidad", "evaluacion_temprana"]
+
+
+def test_ids_y_nombres_por_defecto():
+    df = pd.DataFrame({'latitud': [-12.0], 'longitud': [-77.0], 'distancia_km': [0.5]})
+    punto = serializar_puntos('salud', df, offset=7)[0]
+    assert punto["id"] == "salud_7"
+    assert punto["nombre"] == "Centro de Salud"
+    assert punto["info_especifica"] == {"tipo_establecimiento": "", "categoria": "", "estado": ""}
+    assert serializar_puntos('otro', df)[0]["id"] == "otro_0"
@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from datos import escribir_csv, fila_agua_superficial, fila_evaluacion
+from indice_temporal import dias_epoch
+from ingesta import ingerir_oefa
+from irf import leer_limites
+from series import CuboSeries
+
+
+def _muestras(tmp_path):
+    escribir_csv(tmp_path / 'oefa_agua_superficial.csv', [
+        fila_agua_superficial(),  # Plomo 0.05 mg/L, marzo 2021
+        fila_agua_superficial(FECHA_PTO='2021-03-20', **{'Metales.Totales': '0.002'}),
+        fila_agua_superficial(FECHA_PTO='', MES='ABRIL', PARAMETRO='Zinc', **{'Metales.Totales': '3.1'}),
+    ])
+    escribir_csv(tmp_path / 'oefa_evaluacion_causalidad.csv', [
+        fila_evaluacion(FECHA_MUESTRA='2021-03-10', SIGNO='<', **{'Metales.totales': '0.5'}),
+    ])
+    (tmp_path / "limites_eca.csv").write_text("PARAMETRO,UNIDAD,LIMITE\nPlomo,mg/L,0.01\n")
+    return ingerir_oefa(tmp_path, main.OEFA_FILES, main.utm_a_latlon_lote, progreso=None)
+
+
+def test_agregados_desde_columnas_reales(tmp_path):
+    df = _muestras(tmp_path)
+    cubo = CuboSeries(df, dias_epoch(df), leer_limites(tmp_path))
+    series, total = cubo.consultar('mes', ['PARAMETRO'])
+    assert total == 2
+    plomo = next(s for s in series if s["grupo"] == {"PARAMETRO": "Plomo"})
+    marzo, = plomo["datos"]
+    assert marzo == {"periodo": "2021-03", "muestras": 3, "evaluadas": 3, "excedencias": 1,
+                     "minimo": 0.002, "media": (0.05 + 0.002 + 0.5) / 3, "maximo": 0.5}
+    # Zinc no tiene límite: no está evaluado, no es "cero excedencias"
+    zinc = next(s for s in series if s["grupo"] == {"PARAMETRO": "Zinc"})
+    assert zinc["datos"] == [{"periodo": "2021-04", "muestras": 1, "evaluadas": 0, "excedencias": None,
+                              "minimo": 3.1, "media": 3.1, "maximo": 3.1}]
+
+    anual, _ = cubo.consultar('anio')
+    assert anual[0]["datos"][0]["muestras"] == 4 and anual[0]["datos"][0]["excedencias"] == 1
+    # La evaluación (sin TXUBIGEO) queda en el grupo sin departamento, no se pierde
+    por_departamento, _ = cubo.consultar('anio', ['departamento'])
+    assert {s["grupo"]["departamento"]: s["muestras"] for s in por_departamento} == {'LORETO': 3, None: 1}
+
+
+def test_sin_tabla_de_limites_no_hay_excedencias(tmp_path):
+    df = _muestras(tmp_path)
+    series, _ = CuboSeries(df, dias_epoch(df)).consultar('anio')
+    fila, = series[0]["datos"]
+    assert fila["excedencias"] is None and fila["evaluadas"] == 0
+    assert fila["minimo"] == 0.002 and fila["maximo"] == 3.1
+
+
+def test_endpoint_series(tmp_path, publicar, monkeypatch):
+    df = _muestras(tmp_path)
+    monkeypatch.setattr(main, 'leer_limites', lambda data_path: leer_limites(tmp_path))
+    publicar('oefa', df)
+    cliente = TestClient(main.app)
+    datos = cliente.get("/api/series?periodo=mes&parametro=plomo&departamento=loreto").json()
+    assert datos["filtros"] == {"departamento": "loreto", "PARAMETRO": "plomo"}
+    assert datos["series"][0]["datos"] == [{"periodo": "2021-03", "muestras": 2, "evaluadas": 2, "excedencias": 1,
+                                           "minimo": 0.002, "media": pytest.approx(0.026), "maximo": 0.05}]
+    assert cliente.get("/api/series?agrupar=otro").status_code == 400
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pandas as pd
+
+from snapshot import (
+    METADATA_FILE, SNAPSHOT_DIR, cargar_snapshot, guardar_snapshot, huella_fuentes, snapshot_vigente,
+)
+
+FUENTES = ["salud.csv"]
+
+
+def _preparar(tmp_path):
+    (tmp_path / "salud.csv").write_text("a,b\n1,2\n")
+    df = pd.DataFrame({
+        'departamento': ['LIMA', 'CUSCO', 'LIMA'],
+        'estado': ['ACTIVO', None, 'ACTIVO'],
+        'codigo': [1, 'X2', 3],
+        'latitud': [-12.0, -13.5, -12.1],
+    })
+    guardar_snapshot(tmp_path, 'salud', df, FUENTES)
+    return df
+
+
+def test_ida_y_vuelta_conserva_valores_y_categoricas(tmp_path):
+    df = _preparar(tmp_path)
+    leido = cargar_snapshot(tmp_path, 'salud')
+    assert isinstance(leido['departamento'].dtype, pd.CategoricalDtype)
+    assert leido['departamento'].tolist() == df['departamento'].tolist()
+    assert leido['estado'].isna().tolist() == [False, True, False]
+    # Los objetos mezclados se guardan como texto
+    assert leido['codigo'].tolist() == ['1', 'X2', '3']
+    assert leido['latitud'].tolist() == df['latitud'].tolist()
+
+    metadata = json.loads((tmp_path / SNAPSHOT_DIR / METADATA_FILE).read_text())
+    assert metadata['salud']['huella'] == huella_fuentes(tmp_path, FUENTES)
+    assert metadata['salud']['registros'] == 3
+
+
+def test_vigente_solo_con_la_misma_huella(tmp_path):
+    _preparar(tmp_path)
+    assert snapshot_vigente(tmp_path, 'salud', FUENTES)
+    assert not snapshot_vigente(tmp_path, 'salud', FUENTES, huella='otra')
+    assert not snapshot_vigente(tmp_path, 'educacion', FUENTES)
+
+
+def test_csv_reemplazado_con_mtime_anterior_invalida(tmp_path):
+    _preparar(tmp_path)
+    # Como `cp -p`: contenido nuevo con una fecha anterior al snapshot
+    csv = tmp_path / "salud.csv"
+    csv.write_text("a,b\n1,2\n3,4\n")
+    os.utime(csv, (1_000_000_000, 1_000_000_000))
+    assert not snapshot_vigente(tmp_path, 'salud', FUENTES)
+
+
+def test_huella_tomada_antes_de_leer(tmp_path):
+    (tmp_path / "salud.csv").write_text("a\n1\n")
+    huella = huella_fuentes(tmp_path, FUENTES)
+    # El CSV cambia mientras se procesa: el snapshot queda con la huella vieja
+    (tmp_path / "salud.csv").write_text("a\n1\n2\n")
+    guardar_snapshot(tmp_path, 'salud', pd.DataFrame({'a': [1]}), FUENTES, huella)
+    assert not snapshot_vigente(tmp_path, 'salud', FUENTES)
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from indice_espacial import IndiceEspacial
+from teselas import (
+    EXTENSION, CacheTeselas, codificar_capa, generar_tesela, limites_tesela, tesela_de, tesela_valida,
+)
+
+
+def _leer_varint(datos, pos):
+    valor = desplazamiento = 0
+    while True:
+        byte = datos[pos]
+        pos += 1
+        valor |= (byte & 0x7F) << desplazamiento
+        desplazamiento += 7
+        if not byte & 0x80:
+            return valor, pos
+
+
+def _campos(datos):
+    """Decodificador protobuf mínimo: lista de (número, valor) con varints y bytes"""
+    campos, pos = [], 0
+    while pos < len(datos):
+        clave, pos = _leer_varint(datos, pos)
+        numero, tipo = clave >> 3, clave & 7
+        if tipo == 0:
+            valor, pos = _leer_varint(datos, pos)
+        else:
+            largo, pos = _leer_varint(datos, pos)
+            valor, pos = bytes(datos[pos:pos + largo]), pos + largo
+        campos.append((numero, valor))
+    return campos
+
+
+def _empaquetados(datos):
+    valores, pos = [], 0
+    while pos < len(datos):
+        valor, pos = _leer_varint(datos, pos)
+        valores.append(valor)
+    return valores
+
+
+def _decodificar_capa(tesela):
+    [(numero, capa)] = _campos(tesela)
+    assert numero == 3
+    campos = _campos(capa)
+    claves = [v.decode() for n, v in campos if n == 3]
+    valores = []
+    for n, v in campos:
+        if n == 4:
+            [(tipo, valor)] = _campos(v)
+            valores.append(valor.decode() if tipo == 1 else valor)
+    features = []
+    for n, v in campos:
+        if n != 2:
+            continue
+        feature = dict(_campos(v))
+        tags = _empaquetados(feature.get(2, b""))
+        comando, x, y = _empaquetados(feature[4])
+        features.append({
+            "id": feature[1],
+            "tipo": feature[3],
+            "comando": comando,
+            "xy": ((x >> 1) ^ -(x & 1), (y >> 1) ^ -(y & 1)),
+            "atributos": {claves[tags[i]]: valores[tags[i + 1]] for i in range(0, len(tags), 2)},
+        })
+    return {
+        "version": dict(campos)[15], "nombre": dict(campos)[1].decode(),
+        "extension": dict(campos)[5], "features": features,
+    }
+
+
+def test_codificar_capa_se_decodifica_igual():
+    tesela = codificar_capa("salud", [0, 1], [10, -3], [4095, 7],
+                            {"id": ["a", "b"], "nombre": ["Posta", ""], "n": [3, 3]})
+    capa = _decodificar_capa(tesela)
+    assert (capa["version"], capa["nombre"], capa["extension"]) == (2, "salud", EXTENSION)
+    assert capa["features"][0] == {"id": 0, "tipo": 1, "comando": 9, "xy": (10, 4095),
+                                   "atributos": {"id": "a", "nombre": "Posta", "n": 3}}
+    # Los vacíos no se codifican y los valores repetidos comparten entrada
+    assert capa["features"][1]["xy"] == (-3, 7)
+    assert capa["features"][1]["atributos"] == {"id": "b", "n": 3}
+
+
+def test_tesela_valida_y_limites():
+    assert tesela_valida(0, 0, 0) and tesela_valida(10, 1023, 1023)
+    assert not tesela_valida(10, 1024, 0) and not tesela_valida(-1, 0, 0) and not tesela_valida(23, 0, 0)
+    x, y = tesela_de(-12.0, -77.0, 9)
+    lat_min, lat_max, lng_min, lng_max = limites_tesela(9, x, y)
+    assert lat_min <= -12.0 <= lat_max and lng_min <= -77.0 <= lng_max
+
+
+def test_generar_tesela_con_los_puntos_de_la_tesela():
+    df = pd.DataFrame({
+        'codigo_unico': ['10', '20', '30'],
+        'nombre_establecimiento': ['A', 'B', 'C'],
+        'latitud': [-12.0, -12.001, -3.5],
+        'longitud': [-77.0, -77.001, -73.0],
+    })
+    indice = IndiceEspacial(df['latitud'].to_numpy(), df['longitud'].to_numpy())
+    x, y = tesela_de(-12.0, -77.0, 14)
+    capa = _decodificar_capa(generar_tesela('salud', df, indice, 14, x, y))
+    assert sorted(f["atributos"]["id"] for f in capa["features"]) == ['10', '20']
+    assert all(0 <= f["xy"][0] < EXTENSION and 0 <= f["xy"][1] < EXTENSION for f in capa["features"])
+    assert generar_tesela('salud', df, indice, 14, 0, 0) == b""
+
+    # En zoom bajo los puntos cercanos se fusionan y llevan el conteo
+    x, y = tesela_de(-12.0, -77.0, 4)
+    capa = _decodificar_capa(generar_tesela('salud', df, indice, 4, x, y))
+    assert sum(f["atributos"]["n"] for f in capa["features"]) == 3
+    assert set(capa["features"][0]["atributos"]) == {"id", "n"}
+
+
+def test_cache_en_disco_por_huella(tmp_path, monkeypatch):
+    monkeypatch.setenv("TESELAS_DIR", str(tmp_path))
+    cache = CacheTeselas(tmp_path)
+    cache.guardar('salud', 'v1', 3, 2, 4, b"abc")
+    assert cache.obtener('salud', 'v1', 3, 2, 4) == b"abc"
+    assert cache.obtener('salud', 'v2', 3, 2, 4) is None
+    cache.guardar('salud', 'v2', 3, 2, 4, b"def")
+    cache.limpiar('salud', 'v2')
+    assert cache.obtener('salud', 'v1', 3, 2, 4) is None
+    assert cache.obtener('salud', 'v2', 3, 2, 4) == b"def"
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from ubicaciones import IndiceUbicaciones, codigos_categoricos, normalizar_texto
+
+UBICACIONES = pd.DataFrame({
+    'departamento': pd.Categorical(['JUNÍN', 'LIMA', 'JUNÍN', None, 'LORETO']),
+    'provincia': ['HUANCAYO', 'LIMA', 'TARMA', 'LIMA', 'DATEM DEL MARAÑÓN'],
+    'distrito': ['El Tambo', 'Lima', 'Tarma', None, 'Andoas'],
+})
+
+
+def test_normalizar_texto():
+    assert normalizar_texto(' Junín  ') == 'JUNIN'
+    assert normalizar_texto('datem del  marañón') == 'DATEM DEL MARANON'
+
+
+def test_codigos_de_categoricas_y_de_texto():
+    codigos, valores = codigos_categoricos(UBICACIONES['departamento'])
+    assert codigos.dtype == np.int32 and codigos[3] == -1
+    assert valores == ['JUNÍN', 'LIMA', 'LORETO']
+    codigos, valores = codigos_categoricos(UBICACIONES['distrito'])
+    assert codigos.tolist() == [0, 1, 2, -1, 3] and valores == ['El Tambo', 'Lima', 'Tarma', 'Andoas']
+
+
+def test_mascara_en_cualquier_nivel():
+    indice = IndiceUbicaciones(UBICACIONES)
+    todas = np.arange(len(UBICACIONES))
+    assert indice.mascara('junin', todas).tolist() == [True, False, True, False, False]
+    assert indice.mascara('Lima', todas).tolist() == [False, True, False, True, False]  # Provincia sin departamento
+    assert indice.mascara('marañon', todas).tolist() == [False, False, False, False, True]
+    assert indice.mascara('tambo', todas).tolist() == [True, False, False, False, False]
+    assert indice.mascara('ta', todas).tolist() == [True, False, True, False, False]  # Texto corto
+    assert not indice.mascara('CUSCO', todas).any()
+    # Solo las posiciones pedidas, en su orden
+    assert indice.mascara('junin', np.array([2, 1])).tolist() == [True, False]
+
+
+def test_consultas_repetidas_usan_la_cache():
+    indice = IndiceUbicaciones(UBICACIONES)
+    assert indice.tablas('Junín') is indice.tablas('JUNIN')
+
+
+def test_filtro_de_ubicacion_en_el_mapa(publicar):
+    publicar('salud', pd.DataFrame({
+        'codigo_unico': [1, 2, 3],
+        'departamento': ['JUNÍN', 'LIMA', 'JUNÍN'],
+        'latitud': [-12.0, -12.01, -12.02],
+        'longitud': [-75.2, -75.21, -75.22],
+    }))
+    parametros = {"centro_lat": -12.0, "centro_lng": -75.2, "radio_km": 10, "tipos": "salud"}
+    cliente = TestClient(main.app)
+    assert cliente.get("/api/mapa/puntos", params=parametros).json()["total"] == 3
+    respuesta = cliente.get("/api/mapa/puntos", params={**parametros, "ubicacion": " junin"}).json()
+    assert respuesta["total"] == 2
+    assert sorted(p["id"] for p in respuesta["puntos"]) == ["1", "3"]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from main import normalizar_zonas, utm_a_latlon_lote, utm_to_latlon
+
+
+def test_normalizar_zonas():
+    numeros, hemisferios = normalizar_zonas(['18S', '17 N', 18.0, '19', '99', None, 'x'])
+    np.testing.assert_array_equal(numeros, [18, 17, 18, 19, np.nan, np.nan, np.nan])
+    assert list(hemisferios[:4]) == ['S', 'N', 'S', 'S']
+
+    numeros, hemisferios = normalizar_zonas(np.array([17, 18, 0]))
+    np.testing.assert_array_equal(numeros, [17, 18, np.nan])
+    assert list(hemisferios) == ['S', 'S', 'S']
+
+
+def test_lote_igual_a_conversion_por_fila():
+    este = [280000, 500000, 720000, 300000]
+    norte = [8670000, 9000000, 8200000, 8500000]
+    zonas = ['18', '17S', 19, '18']
+    latitudes, longitudes, errores = utm_a_latlon_lote(este, norte, zonas)
+    assert errores == 0
+    for k in range(len(este)):
+        lat, lon = utm_to_latlon(este[k], norte[k], int(str(zonas[k]).rstrip('S')))
+        assert abs(latitudes[k] - lat) < 1e-9 and abs(longitudes[k] - lon) < 1e-9
+    # Lima (zona 18S) queda en su lugar
+    assert abs(latitudes[0] + 12.02) < 0.01 and abs(longitudes[0] + 77.02) < 0.01
+
+
+def test_lote_marca_fallidos_con_nan():
+    latitudes, longitudes, errores = utm_a_latlon_lote(['x', 280000, None], [8670000, 8670000, 1], ['18', 'ZZ', '18'])
+    assert errores == 3
+    assert np.isnan(latitudes).all() and np.isnan(longitudes).all()
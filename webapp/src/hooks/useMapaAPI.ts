@@ -18,6 +18,18 @@ export interface FiltrosMapa {
   radio_km: number;
   tipos: string;
   ubicacion?: string;
+  formato?: 'puntos' | 'columnar';
+  zoom?: number;
+  // Ventana de fechas de muestreo OEFA (AAAA-MM-DD, extremos incluidos)
+  fecha_desde?: string;
+  fecha_hasta?: string;
+}
+
+export interface ClusterMapa {
+  latitud: number;
+  longitud: number;
+  total: number;
+  tipos_count: Record<string, number>;
 }
 
 export interface RespuestaMapa {
@@ -25,6 +37,58 @@ export interface RespuestaMapa {
   total: number;
   tipos_count: Record<string, number>;
   filtros_aplicados: any;
+  // Solo con zoom bajo y muchos puntos: el backend agrupa en clusters
+  modo?: 'clusters';
+  clusters?: ClusterMapa[];
+  total_puntos?: number;
+}
+
+// Formato compacto: arreglos paralelos por tipo en lugar de una lista de objetos
+export interface ColumnasTipo {
+  id: string[];
+  latitud: number[];
+  longitud: number[];
+  distancia_km: number[];
+  nombre: string[];
+  ubicacion: string[];
+  info_especifica: Record<string, string[]>;
+}
+
+export interface RespuestaMapaColumnar {
+  formato: 'columnar';
+  columnas: Record<string, ColumnasTipo>;
+  total: number;
+  tipos_count: Record<string, number>;
+  filtros_aplicados: any;
+}
+
+// Reconstruir la lista de puntos a partir de la respuesta columnar
+export function expandirColumnas(data: RespuestaMapaColumnar): PuntoMapa[] {
+  const puntos: PuntoMapa[] = [];
+
+  for (const [tipo, cols] of Object.entries(data.columnas)) {
+    const camposInfo = Object.keys(cols.info_especifica);
+
+    for (let i = 0; i < cols.id.length; i++) {
+      const info: Record<string, any> = {};
+      for (const campo of camposInfo) {
+        info[campo] = cols.info_especifica[campo][i];
+      }
+
+      puntos.push({
+        id: cols.id[i],
+        tipo: tipo as PuntoMapa['tipo'],
+        latitud: cols.latitud[i],
+        longitud: cols.longitud[i],
+        distancia_km: cols.distancia_km[i],
+        nombre: cols.nombre[i],
+        ubicacion: cols.ubicacion[i],
+        info_especifica: info
+      });
+    }
+  }
+
+  return puntos;
 }
 
 export interface EstadisticasAPI {
@@ -37,6 +101,11 @@ export interface EstadisticasAPI {
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// Plantilla {z}/{x}/{y} de las teselas vectoriales (MVT) de una capa
+export function urlTeselas(capa: 'oefa' | 'educacion' | 'salud' | 'poblacion'): string {
+  return `${API_BASE_URL}/tiles/${capa}/{z}/{x}/{y}.pbf`;
+}
+
 export function useMapaAPI() {
   const [puntos, setPuntos] = useState<PuntoMapa[]>([]);
   const [estadisticas, setEstadisticas] = useState<EstadisticasAPI | null>(null);
@@ -61,13 +130,34 @@ export function useMapaAPI() {
         params.append('ubicacion', filtros.ubicacion);
       }
 
+      if (filtros.formato) {
+        params.append('formato', filtros.formato);
+      }
+
+      if (filtros.zoom !== undefined) {
+        params.append('zoom', Math.round(filtros.zoom).toString());
+      }
+
+      if (filtros.fecha_desde) {
+        params.append('fecha_desde', filtros.fecha_desde);
+      }
+
+      if (filtros.fecha_hasta) {
+        params.append('fecha_hasta', filtros.fecha_hasta);
+      }
+
       const response = await fetch(`${API_BASE_URL}/api/mapa/puntos?${params}`);
       
       if (!response.ok) {
         throw new Error(`Error ${response.status}: ${response.statusText}`);
       }
 
-      const data: RespuestaMapa = await response.json();
+      const json = await response.json();
+      const data: RespuestaMapa = json.formato === 'columnar'
+        ? { ...json, puntos: expandirColumnas(json) }
+        : json.modo === 'clusters'
+          ? { ...json, puntos: [] }
+          : json;
       setPuntos(data.puntos);
       
       return data;
@@ -116,6 +206,26 @@ export function useMapaAPI() {
     }
   }, []);
 
+  // Función para obtener el detalle de varios puntos de un tipo en una sola llamada
+  const obtenerDetallesPuntos = useCallback(async (tipo: string, ids: string[]) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/puntos/detalle`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ tipo, ids })
+      });
+      
+      if (!response.ok) {
+        throw new Error(`Error ${response.status}: ${response.statusText}`);
+      }
+
+      return await response.json();
+    } catch (err) {
+      console.error('Error obteniendo detalles de puntos:', err);
+      return null;
+    }
+  }, []);
+
   // Cargar estadísticas al montar el componente
   useEffect(() => {
     obtenerEstadisticas();
@@ -128,6 +238,7 @@ export function useMapaAPI() {
     error,
     obtenerPuntos,
     obtenerEstadisticas,
-    obtenerDetallePunto
+    obtenerDetallePunto,
+    obtenerDetallesPuntos
   };
 }
\ No newline at end of file